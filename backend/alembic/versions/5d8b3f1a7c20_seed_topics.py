@@ -0,0 +1,55 @@
+"""seed topics
+
+Revision ID: 5d8b3f1a7c20
+Revises: 9e5a3c7d2b14
+Create Date: 2026-10-20 11:37:05.118420
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8b3f1a7c20'
+down_revision: Union[str, Sequence[str], None] = '9e5a3c7d2b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_TOPICS = [
+    ("Should social media platforms censor content?", "technology"),
+    ("Is universal basic income a viable solution to poverty?", "economics"),
+    ("Should animal testing be banned completely?", "ethics"),
+    ("Is artificial intelligence more beneficial or harmful to humanity?", "technology"),
+    ("Should college education be free for everyone?", "education"),
+    ("Is climate change primarily caused by human activity?", "environment"),
+    ("Should voting be mandatory in democratic countries?", "politics"),
+    ("Is homework beneficial for students?", "education"),
+    ("Should plastic production be significantly reduced?", "environment"),
+    ("Does technology make people more isolated?", "technology"),
+    ("Should genetically modified foods be labeled?", "ethics"),
+    ("Is space exploration worth the investment?", "science"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Only a catalog nobody has filled yet (the app used to seed it on first load)
+    if op.get_bind().execute(sa.text("SELECT 1 FROM topics LIMIT 1")).first() is not None:
+        return
+    topics = sa.table('topics',
+        sa.column('text', sa.String()),
+        sa.column('category', sa.String()),
+        sa.column('weight', sa.Float()),
+        sa.column('enabled', sa.Boolean()),
+    )
+    op.bulk_insert(topics, [
+        {'text': text, 'category': category, 'weight': 1.0, 'enabled': True} for text, category in DEFAULT_TOPICS
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Seeded rows are catalog data; operators may have edited them, so they stay
+    pass
@@ -0,0 +1,28 @@
+"""token ledger debate index
+
+Revision ID: 7b2f94c1d3e6
+Revises: c6d1f8a2e945
+Create Date: 2026-10-20 09:14:37.208615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2f94c1d3e6'
+down_revision: Union[str, Sequence[str], None] = 'c6d1f8a2e945'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_token_transactions_debate_id_user_id_reason', 'token_transactions', ['debate_id', 'user_id', 'reason'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_token_transactions_debate_id_user_id_reason', table_name='token_transactions')
@@ -0,0 +1,34 @@
+"""forum pagination
+
+Revision ID: 8c1f2d9a4b6e
+Revises: 3350e3c4d86b
+Create Date: 2026-10-19 09:12:31.104552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1f2d9a4b6e'
+down_revision: Union[str, Sequence[str], None] = '3350e3c4d86b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('threads', sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.add_column('posts', sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_threads_forum_id_id', 'threads', ['forum_id', 'id'], unique=False)
+    op.create_index('ix_posts_thread_id_id', 'posts', ['thread_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_posts_thread_id_id', table_name='posts')
+    op.drop_index('ix_threads_forum_id_id', table_name='threads')
+    op.drop_column('posts', 'created_at')
+    op.drop_column('threads', 'created_at')
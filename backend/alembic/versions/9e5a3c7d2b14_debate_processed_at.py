@@ -0,0 +1,33 @@
+"""debate processed_at
+
+Revision ID: 9e5a3c7d2b14
+Revises: 7b2f94c1d3e6
+Create Date: 2026-10-20 10:02:51.640173
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e5a3c7d2b14'
+down_revision: Union[str, Sequence[str], None] = '7b2f94c1d3e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('debates', sa.Column('processed_at', sa.DateTime(), nullable=True))
+    # Results recorded before this column existed were already counted (live or by backfill)
+    op.execute(
+        "UPDATE debates SET processed_at = CURRENT_TIMESTAMP "
+        "WHERE winner IS NOT NULL AND winner <> 'abandoned' AND player2_id IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('debates', 'processed_at')
@@ -0,0 +1,40 @@
+"""topic catalog
+
+Revision ID: a4c9e2f17b3d
+Revises: f3a8c2d6e1b9
+Create Date: 2026-10-19 16:20:44.501932
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c9e2f17b3d'
+down_revision: Union[str, Sequence[str], None] = 'f3a8c2d6e1b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows are seeded by 5d8b3f1a7c20
+    op.create_table('topics',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('text', sa.String(), nullable=False),
+    sa.Column('category', sa.String(), nullable=False),
+    sa.Column('weight', sa.Float(), nullable=False),
+    sa.Column('enabled', sa.Boolean(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('text')
+    )
+    op.create_index(op.f('ix_topics_id'), 'topics', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_topics_id'), table_name='topics')
+    op.drop_table('topics')
@@ -0,0 +1,58 @@
+"""search index
+
+Revision ID: b7e4a1c93f20
+Revises: 8c1f2d9a4b6e
+Create Date: 2026-10-19 10:02:47.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4a1c93f20'
+down_revision: Union[str, Sequence[str], None] = '8c1f2d9a4b6e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SOURCES = [
+    ('message', 'messages', 'content', 'debate_id'),
+    ('post', 'posts', 'content', 'thread_id'),
+    ('thread', 'threads', 'title', 'forum_id'),
+    ('debate', 'debates', 'topic', 'NULL'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE search_documents USING fts5("
+            "content, kind UNINDEXED, ref_id UNINDEXED, parent_id UNINDEXED, tokenize='porter unicode61')"
+        )
+    else:
+        op.execute(
+            "CREATE TABLE search_documents ("
+            "id BIGSERIAL PRIMARY KEY, "
+            "kind VARCHAR(16) NOT NULL, "
+            "ref_id INTEGER NOT NULL, "
+            "parent_id INTEGER, "
+            "content TEXT NOT NULL, "
+            "tsv tsvector GENERATED ALWAYS AS (to_tsvector('english', content)) STORED)"
+        )
+        op.execute("CREATE INDEX ix_search_documents_tsv ON search_documents USING GIN (tsv)")
+        op.execute("CREATE INDEX ix_search_documents_kind_ref_id ON search_documents (kind, ref_id)")
+
+    # Backfill existing rows; new rows are indexed by app.search on insert
+    for kind, table, text_column, parent_column in SOURCES:
+        op.execute(
+            f"INSERT INTO search_documents (content, kind, ref_id, parent_id) "
+            f"SELECT {text_column}, '{kind}', id, {parent_column} FROM {table}"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TABLE search_documents")
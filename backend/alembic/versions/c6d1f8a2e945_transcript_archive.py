@@ -0,0 +1,39 @@
+"""transcript archive
+
+Revision ID: c6d1f8a2e945
+Revises: a4c9e2f17b3d
+Create Date: 2026-10-19 18:02:13.774510
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6d1f8a2e945'
+down_revision: Union[str, Sequence[str], None] = 'a4c9e2f17b3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('debates', sa.Column('archived_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_debates_archived_at_id', 'debates', ['archived_at', 'id'], unique=False)
+    op.create_table('archived_transcripts',
+    sa.Column('debate_id', sa.Integer(), nullable=False),
+    sa.Column('message_count', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['debate_id'], ['debates.id'], ),
+    sa.PrimaryKeyConstraint('debate_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('archived_transcripts')
+    op.drop_index('ix_debates_archived_at_id', table_name='debates')
+    op.drop_column('debates', 'archived_at')
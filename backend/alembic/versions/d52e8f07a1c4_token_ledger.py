@@ -0,0 +1,42 @@
+"""token ledger
+
+Revision ID: d52e8f07a1c4
+Revises: b7e4a1c93f20
+Create Date: 2026-10-19 11:26:05.773910
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd52e8f07a1c4'
+down_revision: Union[str, Sequence[str], None] = 'b7e4a1c93f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('token_transactions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.String(), nullable=False),
+    sa.Column('debate_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['debate_id'], ['debates.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_token_transactions_id'), 'token_transactions', ['id'], unique=False)
+    op.create_index('ix_token_transactions_user_id_id', 'token_transactions', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_token_transactions_user_id_id', table_name='token_transactions')
+    op.drop_index(op.f('ix_token_transactions_id'), table_name='token_transactions')
+    op.drop_table('token_transactions')
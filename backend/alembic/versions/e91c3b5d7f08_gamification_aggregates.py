@@ -0,0 +1,32 @@
+"""gamification aggregates
+
+Revision ID: e91c3b5d7f08
+Revises: d52e8f07a1c4
+Create Date: 2026-10-19 12:41:19.305827
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e91c3b5d7f08'
+down_revision: Union[str, Sequence[str], None] = 'd52e8f07a1c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('streaks', sa.Column('debates_played', sa.Integer(), nullable=True))
+    op.add_column('streaks', sa.Column('debates_won', sa.Integer(), nullable=True))
+    op.create_index('ix_user_badges_user_id_badge_id', 'user_badges', ['user_id', 'badge_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_badges_user_id_badge_id', table_name='user_badges')
+    op.drop_column('streaks', 'debates_won')
+    op.drop_column('streaks', 'debates_played')
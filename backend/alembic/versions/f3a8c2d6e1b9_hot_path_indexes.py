@@ -0,0 +1,37 @@
+"""hot path indexes
+
+Revision ID: f3a8c2d6e1b9
+Revises: e91c3b5d7f08
+Create Date: 2026-10-19 14:05:37.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8c2d6e1b9'
+down_revision: Union[str, Sequence[str], None] = 'e91c3b5d7f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # threads.forum_id and posts.thread_id are covered by the keyset indexes from 8c1f2d9a4b6e
+    op.create_index('ix_messages_debate_id_timestamp', 'messages', ['debate_id', 'timestamp'], unique=False)
+    op.create_index('ix_debates_player1_id_timestamp', 'debates', ['player1_id', 'timestamp'], unique=False)
+    op.create_index('ix_debates_player2_id_timestamp', 'debates', ['player2_id', 'timestamp'], unique=False)
+    op.create_index(op.f('ix_streaks_user_id'), 'streaks', ['user_id'], unique=False)
+    op.create_index(op.f('ix_users_elo'), 'users', ['elo'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_elo'), table_name='users')
+    op.drop_index(op.f('ix_streaks_user_id'), table_name='streaks')
+    op.drop_index('ix_debates_player2_id_timestamp', table_name='debates')
+    op.drop_index('ix_debates_player1_id_timestamp', table_name='debates')
+    op.drop_index('ix_messages_debate_id_timestamp', table_name='messages')
@@ -2,23 +2,32 @@
 from dotenv import load_dotenv
 load_dotenv()
 import os
-print("API KEY:", os.getenv("GROQ_API_KEY"))
-import os
 import logging
 import asyncio
+import random
+import time
 from groq import AsyncGroq, APIError
+from app import metrics
+
+logger = logging.getLogger(__name__) # Level comes from LOG_LEVEL / LOG_LEVELS (app.logging_config)
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
+# Load tests: AI_STUB=1 answers with a canned reply after ~AI_STUB_LATENCY_MS instead of calling Groq
+AI_STUB = os.getenv("AI_STUB", "0") == "1"
+AI_STUB_LATENCY = float(os.getenv("AI_STUB_LATENCY_MS", "800")) / 1000
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
+if not GROQ_API_KEY and not AI_STUB:
     raise ValueError("❌ GROQ_API_KEY environment variable not set")
 
-client = AsyncGroq(api_key=GROQ_API_KEY)
+client = AsyncGroq(api_key=GROQ_API_KEY or "stub")
 
 async def get_ai_response(prompt: str) -> str:
-    logger.debug(f"AI: Attempting to get response for prompt (first 80 chars): {prompt[:800]}")
+    logger.debug("AI: Attempting to get response for prompt (first 80 chars): %s", prompt[:80])
+    started = time.perf_counter()
+    if AI_STUB:
+        await asyncio.sleep(AI_STUB_LATENCY * random.uniform(0.5, 1.5))
+        metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, "stub")
+        return "That's a fair point, but you're overlooking the strongest evidence on the other side."
     try:
         chat_completion = await client.chat.completions.create(
            model="llama-3.3-70b-versatile",   # ✅ fixed model name
@@ -42,14 +51,19 @@ async def get_ai_response(prompt: str) -> str:
             ],
             temperature=0.0,
         )
-        logger.info("✅ AI response received successfully from Groq.")
+        metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, "ok")
+        logger.debug("AI response received successfully from Groq.")
         return chat_completion.choices[0].message.content
 
     except APIError as e:
-        logger.error(f"❌ Groq API Error: {str(e)}")
+        metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, "error")
+        metrics.LLM_ERRORS.inc(type(e).__name__)
+        logger.error("Groq API Error: %s", e)
         return f"AI failed to respond due to a Groq API error: {str(e)}"
     except Exception as e:
-        logger.error(f"❌ Unexpected error: {e}")
+        metrics.LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, "error")
+        metrics.LLM_ERRORS.inc("unexpected")
+        logger.exception("Unexpected error: %s", e)
         return "AI failed to respond due to an unexpected internal error."
 if __name__ == "__main__":
     prompt = "Explain the benefits of renewable energy in 2 sentences."
@@ -0,0 +1,170 @@
+# app/archive.py - Cold storage for finished debate transcripts
+#
+# A background job moves the messages of debates that have been quiet for
+# ARCHIVE_AFTER_DAYS out of the hot `messages` table: each debate's messages
+# become one zlib-compressed JSON blob in `archived_transcripts`, the message
+# rows are deleted, and debates.archived_at is set. Batches of ARCHIVE_BATCH
+# debates are moved in one transaction each. Debates without messages are only
+# marked. Messages added to an archived debate later stay in the hot table
+# and are merged back on read.
+#
+# Readers check debates.archived_at and, if set, prepend archived_messages()
+# to the hot rows. Decompressed transcripts are kept in a small TTL cache
+# because an old debate that is opened once is usually opened a few times.
+# Search index rows are left in place, so archived messages stay searchable;
+# search.rebuild_index indexes them again from the archived transcripts.
+#
+# Run a single pass by hand with:  python -m app.archive
+#
+# Environment:
+#   ARCHIVE_AFTER_DAYS        quiet days before a debate is archived; 0 disables the job (default 90)
+#   ARCHIVE_INTERVAL_SECONDS  interval between passes (default 3600)
+#   ARCHIVE_BATCH             debates archived per transaction (default 200)
+#   ARCHIVE_CACHE_SIZE        decompressed transcripts kept in memory (default 256)
+
+import asyncio
+import json
+import logging
+import os
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, exists, insert, update
+from sqlalchemy.orm import Session
+
+from app import database, metrics, models
+from app.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH", "200"))
+CACHE_SIZE = int(os.getenv("ARCHIVE_CACHE_SIZE", "256"))
+CACHE_SECONDS = 600
+
+ARCHIVED_DEBATES = metrics.Counter("archived_debates_total", "Debates moved to cold storage.")
+ARCHIVED_MESSAGES = metrics.Counter("archived_messages_total", "Messages moved out of the hot table.")
+ARCHIVE_READS = metrics.Counter("archive_reads_total", "Archived transcript reads, by cache result.", ("result",))
+
+_transcripts = TTLCache(maxsize=CACHE_SIZE, ttl=CACHE_SECONDS) # {debate id: tuple of message dicts}
+
+
+# --- Packing ---
+# A blob is a JSON list of [id, sender_id, sender_type, content, timestamp] rows in transcript order.
+
+def pack(rows: Iterable) -> bytes:
+    return zlib.compress(json.dumps(
+        [[row.id, row.sender_id, row.sender_type, row.content, row.timestamp.isoformat() if row.timestamp else None]
+         for row in rows], ensure_ascii=False, separators=(",", ":")).encode(), 6)
+
+
+def unpack(debate_id: int, data: bytes) -> Tuple[dict, ...]:
+    """Message dicts shaped like schemas.MessageOut."""
+    return tuple(
+        {"id": id_, "debate_id": debate_id, "sender_id": sender_id, "sender_type": sender_type, "content": content,
+         "timestamp": datetime.fromisoformat(timestamp) if timestamp else None}
+        for id_, sender_id, sender_type, content, timestamp in json.loads(zlib.decompress(data))
+    )
+
+
+# --- Reads ---
+
+def archived_messages(db: Session, debate_id: int) -> Tuple[dict, ...]:
+    """The archived part of a transcript (empty if none). Callers must not modify the returned dicts."""
+    messages = _transcripts.get(debate_id)
+    if messages is not None:
+        ARCHIVE_READS.inc("hit")
+        return messages
+    ARCHIVE_READS.inc("miss")
+    data = db.query(models.ArchivedTranscript.data).filter(models.ArchivedTranscript.debate_id == debate_id).scalar()
+    messages = unpack(debate_id, data) if data is not None else ()
+    _transcripts.set(debate_id, messages)
+    return messages
+
+
+def archived_messages_many(db: Session, debate_ids: List[int]) -> Dict[int, Tuple[dict, ...]]:
+    """Archived transcripts for many debates in one query, bypassing the cache (for bulk readers)."""
+    if not debate_ids:
+        return {}
+    rows = db.query(models.ArchivedTranscript.debate_id, models.ArchivedTranscript.data).filter(
+        models.ArchivedTranscript.debate_id.in_(debate_ids))
+    return {debate_id: unpack(debate_id, data) for debate_id, data in rows}
+
+
+# --- Archiving ---
+
+def archive_batch(db: Session, cutoff: datetime, after_id: int = 0, limit: int = BATCH_SIZE) -> Tuple[int, int, Optional[int]]:
+    """Archives up to `limit` debates with id > after_id and no message since `cutoff`, in one transaction.
+
+    Returns (debates archived, messages moved, last debate id examined).
+    """
+    ids = [debate_id for (debate_id,) in (
+        db.query(models.Debate.id)
+        .filter(models.Debate.archived_at.is_(None), models.Debate.id > after_id, models.Debate.timestamp < cutoff,
+                ~exists().where(models.Message.debate_id == models.Debate.id, models.Message.timestamp >= cutoff))
+        .order_by(models.Debate.id).limit(limit)
+    )]
+    if not ids:
+        return 0, 0, None
+
+    rows = (
+        db.query(models.Message.id, models.Message.debate_id, models.Message.sender_id, models.Message.sender_type,
+                 models.Message.content, models.Message.timestamp)
+        .filter(models.Message.debate_id.in_(ids))
+        .order_by(models.Message.debate_id, models.Message.timestamp, models.Message.id).all()
+    )
+    by_debate: Dict[int, list] = {}
+    for row in rows:
+        by_debate.setdefault(row.debate_id, []).append(row)
+
+    now = datetime.utcnow()
+    if by_debate:
+        db.execute(insert(models.ArchivedTranscript), [
+            {"debate_id": debate_id, "message_count": len(messages), "data": pack(messages), "archived_at": now}
+            for debate_id, messages in by_debate.items()
+        ])
+        # By id, not by debate: a message written after the read above stays hot
+        db.execute(delete(models.Message).where(models.Message.id.in_([row.id for row in rows])))
+    db.execute(update(models.Debate).where(models.Debate.id.in_(ids)).values(archived_at=now))
+    db.commit()
+    for debate_id in ids:
+        _transcripts.invalidate(debate_id)
+    return len(ids), len(rows), ids[-1]
+
+
+def archive(cutoff: Optional[datetime] = None, limit: int = BATCH_SIZE) -> Tuple[int, int]:
+    """Archives every debate quiet since `cutoff` (default: ARCHIVE_AFTER_DAYS ago). Returns (debates, messages)."""
+    cutoff = cutoff or datetime.utcnow() - timedelta(days=AFTER_DAYS)
+    debates = messages = 0
+    after_id = 0
+    with database.SessionLocal() as db:
+        while True:
+            archived, moved, last_id = archive_batch(db, cutoff, after_id, limit)
+            if last_id is None:
+                return debates, messages
+            debates += archived
+            messages += moved
+            after_id = last_id
+            ARCHIVED_DEBATES.inc(amount=archived)
+            ARCHIVED_MESSAGES.inc(amount=moved)
+
+
+async def run_archiver():
+    """Background loop: archives quiet debates every INTERVAL_SECONDS."""
+    if AFTER_DAYS <= 0:
+        return
+    while True:
+        await asyncio.sleep(INTERVAL_SECONDS)
+        try:
+            debates, messages = await asyncio.to_thread(archive)
+            if debates:
+                logger.info("Archived %d debates (%d messages).", debates, messages)
+        except Exception:
+            logger.exception("Transcript archiver failed")
+
+
+if __name__ == "__main__":
+    debates, messages = archive()
+    print(f"Archived {debates} debates ({messages} messages).")
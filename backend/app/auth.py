@@ -4,11 +4,23 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from app import models, schemas, database # FIX: Changed from relative to absolute imports (Gunicorn-safe)
-from sqlalchemy.orm import Session
+from app.cache import TTLCache
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
 import os
 SECRET_KEY = os.getenv("JWT_SECRET", "testsecret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440 # Token set for 24 hours
+# Comma-separated emails allowed to use the /diagnostics endpoints
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
+
+# --- Resolved user cache ---
+# Short-lived snapshots of user rows so hot endpoints skip the users query.
+USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "30"))
+USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+
+_user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL) # {user_id: {column: value}}
+_email_to_id = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL) # {email: user_id} for tokens without "uid"
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -32,20 +44,93 @@ def authenticate_user(db: Session, name: str, password: str):
         return None
     return user
 
+def invalidate_user(user_id: int):
+    """Drops a user's cached snapshot. Call after bulk (non-ORM) updates to the users row."""
+    _user_cache.invalidate(int(user_id))
+
+def _snapshot_user(user: models.User) -> dict:
+    return {column.key: getattr(user, column.key) for column in models.User.__table__.columns}
+
+def _cache_user(user: models.User):
+    _user_cache.set(user.id, _snapshot_user(user))
+    _email_to_id.set(user.email, user.id)
+
+def _attach_cached_user(db: Session, snapshot: dict) -> models.User:
+    # Rebuild the row as a detached instance and add it to the request's session,
+    # so routes can still modify and commit it without an extra SELECT.
+    user = models.User(**snapshot)
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
+def invalidate_users_on_commit(session: Session, user_ids):
+    """Queues cache invalidation for users changed by bulk (non-ORM) statements in this session."""
+    session.info.setdefault("changed_user_ids", set()).update(user_ids)
+
+@event.listens_for(database.SessionLocal, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = [obj.id for obj in list(session.dirty) + list(session.deleted) if isinstance(obj, models.User)]
+    if changed:
+        invalidate_users_on_commit(session, changed)
+
+@event.listens_for(database.SessionLocal, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_user(user_id)
+
+@event.listens_for(database.SessionLocal, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_user_ids", None)
+
+def resolve_user_from_token(token: str, db: Session):
+    """Decodes a JWT and returns the matching user, or None if the token is invalid."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    email: str = payload.get("sub")
+    if email is None:
+        return None
+
+    user_id = payload.get("uid")
+    if user_id is None:
+        user_id = _email_to_id.get(email)
+    if user_id is not None:
+        snapshot = _user_cache.get(int(user_id))
+        if snapshot is not None and snapshot["email"] == email:
+            return _attach_cached_user(db, snapshot)
+        # Tokens issued with a "uid" claim resolve by primary key
+        user = db.get(models.User, int(user_id))
+        if user is not None and user.email != email:
+            user = None
+    else:
+        user = db.query(models.User).filter(models.User.email == email).first()
+
+    if user is not None:
+        _cache_user(user)
+    return user
+
+def token_user_id(token: str):
+    """The "uid" claim of a valid token, without touching the database; None otherwise."""
+    try:
+        user_id = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("uid")
+    except JWTError:
+        return None
+    return int(user_id) if user_id is not None else None
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = resolve_user_from_token(token, db)
     if user is None:
         raise credentials_exception
+    db.info["user_id"] = user.id # Lets database.get_read_db route this user's next reads to the primary
     return user
+
+def get_current_admin(current_user: models.User = Depends(get_current_user)):
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return current_user
@@ -1,21 +1,127 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 import os
+import threading
+import time
+from typing import Optional
 from dotenv import load_dotenv
+from app import metrics
+from app.cache import TTLCache
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL") # Optional read replica for get_read_db
 
-engine = create_engine(
-    DATABASE_URL,
-    # required for sqlite
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# --- Pool configuration (QueuePool; ignored for in-memory SQLite) ---
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30")) # Seconds to wait for a connection before failing
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800")) # Replace connections older than this (seconds); -1 disables
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1" # Test connections on checkout (survives server-side idle kills)
+POOL_SLOW_HOLD = float(os.getenv("DB_POOL_SLOW_HOLD_SECONDS", "1")) # Holders listed by pool_status() past this age
+
+POOL_HOLD_SECONDS = metrics.Histogram(
+    "db_pool_connection_hold_seconds", "Time a pooled connection stayed checked out, by operation.", ("pool", "operation"))
+POOL_TIMEOUTS = metrics.Counter(
+    "db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT, by operation.", ("pool", "operation"))
+
+
+# Connections currently checked out, per pool: {pool name: {id(connection record): (operation, checked out at)}}
+_holders = {}
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection, per operation."""
+
+    metrics_name = "primary" # Set per engine by a subclass so it survives pool.recreate()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        operation = metrics.operation_name(metrics.current_operation.get())
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc(self.metrics_name, operation)
+            raise
+        finally:
+            metrics.DB_POOL_CHECKOUT_WAIT_SECONDS.observe(time.perf_counter() - started, self.metrics_name, operation)
+
+
+def _pool_options(url: str, name: str) -> dict:
+    if ":memory:" in url:
+        return {} # In-memory SQLite needs its default single-connection pool
+    return {
+        "poolclass": type(TimedQueuePool.__name__, (TimedQueuePool,), {"metrics_name": name}),
+        "pool_size": POOL_SIZE,
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+
+
+def _instrument_pool(engine, name: str):
+    """Tracks who holds each connection and for how long."""
+    holders = _holders.setdefault(name, {})
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        holders[id(connection_record)] = (
+            metrics.operation_name(metrics.current_operation.get()), time.monotonic()
+        )
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        held = holders.pop(id(connection_record), None)
+        if held is not None:
+            POOL_HOLD_SECONDS.observe(time.monotonic() - held[1], name, held[0])
+
+
+def create_pooled_engine(url: str, name: str):
+    engine = create_engine(
+        url,
+        # required for sqlite
+        connect_args={"check_same_thread": False} if "sqlite" in url else {},
+        **_pool_options(url, name)
+    )
+    _instrument_pool(engine, name)
+    return engine
+
+
+def pool_status(engine, name: str) -> dict:
+    """Snapshot of pool saturation plus connections held longer than POOL_SLOW_HOLD."""
+    pool = engine.pool
+    now = time.monotonic()
+    status = {"pool": name, "class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "max_overflow": POOL_MAX_OVERFLOW,
+            "timeout": POOL_TIMEOUT,
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+    status["slow_holders"] = sorted(
+        ({"operation": operation, "held_seconds": round(now - since, 3)}
+         for operation, since in list(_holders.get(name, {}).values()) if now - since >= POOL_SLOW_HOLD),
+        key=lambda holder: -holder["held_seconds"],
+    )
+    return status
+
+
+engine = create_pooled_engine(DATABASE_URL, "primary")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+metrics.Gauge("db_pool_checked_out", "Connections currently checked out of the primary pool.",
+              function=lambda: engine.pool.checkedout() if isinstance(engine.pool, QueuePool) else 0)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -25,3 +131,114 @@ def get_db():
 
 # Make the engine accessible for creating sessions in async contexts
 get_db.engine = engine
+
+
+# --- Read replica routing ---
+# Read-only routes depend on get_read_db instead of get_db. They are served by
+# the replica unless it is down or lagging, or the caller committed a write
+# within READ_YOUR_WRITES_SECONDS (then they must see their own write).
+REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_SECONDS", "5"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "10"))
+
+READ_ROUTING = metrics.Counter(
+    "db_read_routing_total", "Read sessions handed out by get_read_db, by target and reason.", ("target", "reason"))
+
+replica_engine = create_pooled_engine(DATABASE_REPLICA_URL, "replica") if DATABASE_REPLICA_URL else None
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine) if replica_engine else None
+
+_replica_state = {"healthy": True, "lag": 0.0, "checked_at": 0.0}
+_replica_check_lock = threading.Lock()
+_recent_writers = TTLCache(maxsize=100_000, ttl=READ_YOUR_WRITES_SECONDS) # {user_id: True}
+
+# Seconds behind the primary; 0 when the standby has replayed everything it received
+_POSTGRES_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+metrics.Gauge("db_replica_lag_seconds", "Replica lag at the last health check.", function=lambda: _replica_state["lag"])
+
+
+def _check_replica():
+    try:
+        with replica_engine.connect() as connection:
+            if connection.dialect.name == "postgresql":
+                lag = float(connection.execute(_POSTGRES_LAG_SQL).scalar() or 0)
+            else:
+                connection.execute(text("SELECT 1"))
+                lag = 0.0
+        _replica_state.update(healthy=True, lag=lag)
+    except Exception:
+        _replica_state.update(healthy=False)
+    _replica_state["checked_at"] = time.monotonic()
+
+
+def _replica_usable() -> Optional[str]:
+    """None if reads can go to the replica, else the reason they can't. Re-checks at most every REPLICA_CHECK_INTERVAL."""
+    if time.monotonic() - _replica_state["checked_at"] > REPLICA_CHECK_INTERVAL and _replica_check_lock.acquire(blocking=False):
+        try:
+            _check_replica()
+        finally:
+            _replica_check_lock.release()
+    if not _replica_state["healthy"]:
+        return "replica_unavailable"
+    if _replica_state["lag"] > REPLICA_MAX_LAG:
+        return "replica_lagging"
+    return None
+
+
+if replica_engine is not None:
+    @event.listens_for(replica_engine, "handle_error")
+    def _replica_disconnected(context):
+        # Stop routing to a replica that dropped connections until the next health check
+        if context.is_disconnect:
+            _replica_state.update(healthy=False, checked_at=time.monotonic())
+
+
+def _read_target(request: Request):
+    if replica_engine is None:
+        return "primary", "no_replica"
+    from app import auth # auth imports this module
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        user_id = auth.token_user_id(authorization[7:])
+        if user_id is not None and _recent_writers.get(user_id):
+            return "primary", "read_your_writes"
+    reason = _replica_usable()
+    return ("primary", reason) if reason else ("replica", "replica")
+
+
+def read_session_factory():
+    """Session factory for long read-only jobs (exports): the replica when it is usable, otherwise the primary."""
+    if replica_engine is not None and _replica_usable() is None:
+        return ReadSessionLocal
+    return SessionLocal
+
+
+def get_read_db(request: Request):
+    """Session for read-only routes: the replica when it is usable, otherwise the primary."""
+    target, reason = _read_target(request)
+    READ_ROUTING.inc(target, reason)
+    db = ReadSessionLocal() if target == "replica" else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Writers are tagged with session.info["user_id"] (see auth.get_current_user);
+# a commit that flushed anything starts their read-your-writes window.
+@event.listens_for(SessionLocal, "after_flush")
+def _mark_session_wrote(session, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(SessionLocal, "after_commit")
+def _remember_writer(session):
+    user_id = session.info.get("user_id")
+    if session.info.pop("wrote", False) and user_id is not None:
+        _recent_writers.set(user_id, True)
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _forget_session_write(session):
+    session.info.pop("wrote", None)
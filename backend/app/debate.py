@@ -2,31 +2,19 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app import models, schemas, database, auth # Gunicorn-safe absolute imports
+from typing import Optional
+from app import models, schemas, database, auth, reaper, search, topics, archive # Gunicorn-safe absolute imports
 # from app.socketio_instance import sio # Not needed in this specific file
-import random # Import the random module
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/debate", # Base prefix for all routes in this file
     tags=["Debates"]
 )
 
-# --- List of Debate Topics ---
-DEBATE_TOPICS = [
-    "Should social media platforms censor content?",
-    "Is universal basic income a viable solution to poverty?",
-    "Should animal testing be banned completely?",
-    "Is artificial intelligence more beneficial or harmful to humanity?",
-    "Should college education be free for everyone?",
-    "Is climate change primarily caused by human activity?",
-    "Should voting be mandatory in democratic countries?",
-    "Is homework beneficial for students?",
-    "Should plastic production be significantly reduced?",
-    "Does technology make people more isolated?",
-    "Should genetically modified foods be labeled?",
-    "Is space exploration worth the investment?"
-]
-
 # ----------------- CREATE DEBATE (Optional - if needed elsewhere) -----------------
 @router.post("/", response_model=schemas.DebateOut, include_in_schema=False) # Hiding from docs unless needed
 def create_debate_route(debate_data: schemas.DebateCreate, db: Session = Depends(database.get_db)):
@@ -46,20 +34,40 @@ def create_debate_route(debate_data: schemas.DebateCreate, db: Session = Depends
 @router.post("/start-human", response_model=schemas.DebateOut)
 def start_human_match_route(
     # Body is no longer needed as topic is random
+    category: Optional[str] = None,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user) # Ensure user is authenticated
 ):
-    """Creates a preliminary debate object with a random topic for human matchmaking."""
+    """Creates a preliminary debate object with a random topic (from `category`, if given) for human matchmaking."""
     if not current_user:
          # This should technically be handled by auth.get_current_user, but adding safety
          raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication required")
 
     player1_id = current_user.id
     placeholder_player2_id = None # Set to None for nullable foreign key
-    selected_topic = random.choice(DEBATE_TOPICS) # Select a random topic
-    print(f"DEBUG start_human: User {player1_id} starting search. Topic: {selected_topic}")
+    try:
+        selected_topic = topics.pick(db, [player1_id], category) # Weighted, skipping this user's recent topics
+    except ValueError as e: # Unknown or empty category
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except RuntimeError as e: # Empty catalog
+        logger.error("start_human_match_route: %s", e)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="No debate topics are available right now.")
 
     try:
+        # Reuse this user's last unmatched, untouched search debate instead of adding another row
+        db_debate = (
+            reaper.orphaned(db.query(models.Debate), datetime.max)
+            .filter(models.Debate.player1_id == player1_id)
+            .order_by(models.Debate.id.desc()).first()
+        )
+        if db_debate is not None:
+            db_debate.topic = selected_topic
+            db_debate.timestamp = datetime.utcnow() # Restarts the reaper's TTL
+            search.replace_document(db.connection(), "debate", db_debate.id, None, selected_topic)
+            db.commit()
+            logger.info("Debate %s reused for user %s (topic: %s)", db_debate.id, player1_id, selected_topic)
+            return db_debate
+
         db_debate = models.Debate(
             player1_id=player1_id,
             player2_id=placeholder_player2_id,
@@ -68,17 +76,17 @@ def start_human_match_route(
         db.add(db_debate)
         db.commit()
         db.refresh(db_debate)
-        print(f"DEBUG start_human: Debate {db_debate.id} created for user {player1_id}")
+        logger.info("Debate %s created for user %s (topic: %s)", db_debate.id, player1_id, selected_topic)
         return db_debate
     except Exception as e:
         db.rollback() # Rollback on error
-        print(f"CRITICAL DB ERROR in start_human_match_route: {e}")
+        logger.exception("DB error in start_human_match_route: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not create debate session.")
 
 
 # ----------------- GET DEBATE BY ID -----------------
 @router.get("/{debate_id}", response_model=schemas.DebateOut)
-def get_debate_route(debate_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+def get_debate_route(debate_id: int, db: Session = Depends(database.get_read_db), current_user: models.User = Depends(auth.get_current_user)):
      # Added auth dependency
     db_debate = db.query(models.Debate).filter(models.Debate.id == debate_id).first()
     if not db_debate:
@@ -126,7 +134,7 @@ def create_message_route(
         return db_message
     except Exception as e:
         db.rollback()
-        print(f"ERROR creating message via HTTP: {e}")
+        logger.exception("Error creating message via HTTP: %s", e)
         raise HTTPException(status_code=500, detail="Could not save message.")
 
 
@@ -134,7 +142,7 @@ def create_message_route(
 @router.get("/{debate_id}/messages", response_model=list[schemas.MessageOut])
 def get_messages_route(
     debate_id: int,
-    db: Session = Depends(database.get_db),
+    db: Session = Depends(database.get_read_db),
     current_user: models.User = Depends(auth.get_current_user) # Added auth
 ):
     # Optional: Check if user is participant before allowing access
@@ -146,9 +154,13 @@ def get_messages_route(
     # if not is_authorized:
     #      raise HTTPException(status_code=403, detail="Not authorized to view messages.")
 
-    return (
+    messages = (
         db.query(models.Message)
         .filter(models.Message.debate_id == debate_id)
         .order_by(models.Message.timestamp)
         .all()
-    )
\ No newline at end of file
+    )
+    if debate_obj.archived_at is not None:
+        # Hot rows of an archived debate were all written after the archived ones
+        messages = list(archive.archived_messages(db, debate_id)) + messages
+    return messages
\ No newline at end of file
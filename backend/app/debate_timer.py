@@ -0,0 +1,226 @@
+# app/debate_timer.py - Server-side turn and round timing for live debates
+#
+# Every active debate has a DebateClock: whose turn it is, the round, and at
+# most one pending deadline. Deadlines live in a hashed timing wheel (one slot
+# per tick, entries carry a rotation count), so scheduling, cancelling and
+# firing a deadline are O(1) and a single loop task serves every debate - no
+# asyncio task or sleep per debate.
+#
+# Lifecycle (events go to the debate room):
+#   turn_started  {debate_id, player_id, turn, round, seconds, deadline}  deadline is epoch ms
+#   turn_timeout  {debate_id, player_id, turn, round, missed}
+#   debate_ended  {debate_id, reason, winner}
+# A message from the player whose turn it is ends that turn (turn_taken); if the
+# deadline passes first, turn_timeout is sent and the turn passes to the other
+# player. The debate ends by itself when:
+#   completed  all DEBATE_ROUNDS rounds were played (no winner is recorded here)
+#   forfeit    a player missed DEBATE_MAX_MISSED_TURNS turns in a row; the opponent wins
+#   abandoned  a player ran out of turns while the opponent had missed theirs too; recorded as
+#              gamification.ABANDONED, which the engine does not count, so no streak changes
+# Forfeit and abandoned results are written to Debate.winner (if still empty)
+# and published to the gamification engine.
+# AI debates only time the human's turns; AI_DEBATE_ROUNDS=0 leaves them unlimited.
+# Clocks are in memory: debates live at a restart are left for the reaper.
+#
+# Environment:
+#   DEBATE_TURN_SECONDS       time allowed per turn (default 90)
+#   DEBATE_ROUNDS             rounds per human debate; a round is one turn each (default 3)
+#   AI_DEBATE_ROUNDS          rounds per AI debate, 0 for unlimited (default 0)
+#   DEBATE_MAX_MISSED_TURNS   consecutive missed turns that forfeit the debate (default 2)
+#   DEBATE_TIMER_TICK_MS      wheel resolution (default 1000)
+
+import asyncio
+import logging
+import math
+import os
+import time
+from typing import Dict, Hashable, List, Optional, Set
+
+from app import database, gamification, metrics, models
+from app.socketio_instance import sio
+
+logger = logging.getLogger(__name__)
+
+TURN_SECONDS = float(os.getenv("DEBATE_TURN_SECONDS", "90"))
+ROUNDS = int(os.getenv("DEBATE_ROUNDS", "3"))
+AI_ROUNDS = int(os.getenv("AI_DEBATE_ROUNDS", "0"))
+MAX_MISSED_TURNS = int(os.getenv("DEBATE_MAX_MISSED_TURNS", "2"))
+TICK_SECONDS = float(os.getenv("DEBATE_TIMER_TICK_MS", "1000")) / 1000
+WHEEL_SLOTS = 4096
+
+TURN_TIMEOUTS = metrics.Counter("debate_turn_timeouts_total", "Turns that ran out of time.")
+AUTO_ENDED = metrics.Counter("debates_auto_ended_total", "Debates ended by the turn timer, by reason.", ("reason",))
+
+
+class TimingWheel:
+    """Hashed timing wheel: at most one deadline per key, O(1) schedule/cancel, O(due) per tick."""
+
+    def __init__(self, tick: float, slots: int):
+        self.tick = tick
+        self.slots: List[Dict[Hashable, int]] = [{} for _ in range(slots)] # {key: rotations left}
+        self.where: Dict[Hashable, int] = {} # {key: slot index}
+        self.cursor = 0 # Next slot to process
+        self.next_tick_at = time.monotonic() + tick
+
+    def __len__(self) -> int:
+        return len(self.where)
+
+    def schedule(self, key: Hashable, delay: float):
+        """Fires `key` in [delay, delay + tick) from now, replacing any pending deadline."""
+        self.cancel(key)
+        ticks = max(1, math.ceil((delay - (self.next_tick_at - time.monotonic())) / self.tick) + 1)
+        rotations, offset = divmod(ticks - 1, len(self.slots))
+        slot = (self.cursor + offset) % len(self.slots)
+        self.slots[slot][key] = rotations
+        self.where[key] = slot
+
+    def cancel(self, key: Hashable):
+        slot = self.where.pop(key, None)
+        if slot is not None:
+            del self.slots[slot][key]
+
+    def advance(self, now: float) -> list:
+        """Processes every tick that has elapsed by `now`; returns the keys that are due."""
+        due = []
+        while self.next_tick_at <= now:
+            entries = self.slots[self.cursor]
+            if entries:
+                for key, rotations in list(entries.items()):
+                    if rotations:
+                        entries[key] = rotations - 1
+                    else:
+                        del entries[key]
+                        del self.where[key]
+                        due.append(key)
+            self.cursor = (self.cursor + 1) % len(self.slots)
+            self.next_tick_at += self.tick
+        return due
+
+
+class DebateClock:
+    __slots__ = ("debate_id", "players", "usernames", "rounds", "turn", "missed", "deadline")
+
+    def __init__(self, debate_id: int, players: list, usernames: dict, rounds: int):
+        self.debate_id = debate_id
+        self.players = players # Turn order; one entry for AI debates (only the human is timed)
+        self.usernames = usernames # {player id: username}, for forfeit results
+        self.rounds = rounds # 0 = unlimited
+        self.turn = 0
+        self.missed = [0] * len(players) # Consecutive missed turns per player
+        self.deadline = 0.0 # Epoch seconds, for clients
+
+    @property
+    def current_player(self) -> int:
+        return self.players[self.turn % len(self.players)]
+
+    @property
+    def round(self) -> int:
+        return self.turn // len(self.players) + 1
+
+
+_wheel = TimingWheel(TICK_SECONDS, WHEEL_SLOTS)
+_clocks: Dict[int, DebateClock] = {}
+_result_writes: Set[asyncio.Task] = set() # Held until done so they are not garbage-collected
+
+metrics.Gauge("debate_clocks", "Debates with a running turn timer.", function=lambda: len(_clocks))
+
+
+async def _start_turn(clock: DebateClock):
+    clock.deadline = time.time() + TURN_SECONDS
+    _wheel.schedule(clock.debate_id, TURN_SECONDS)
+    await sio.emit('turn_started', {
+        'debate_id': clock.debate_id, 'player_id': clock.current_player, 'turn': clock.turn + 1,
+        'round': clock.round, 'seconds': TURN_SECONDS, 'deadline': int(clock.deadline * 1000),
+    }, room=str(clock.debate_id))
+
+
+async def start(debate_id: int, players: list, usernames: dict, ai: bool = False):
+    """Starts timing a debate; the first turn belongs to players[0]."""
+    clock = DebateClock(debate_id, players, usernames, AI_ROUNDS if ai else ROUNDS)
+    _clocks[debate_id] = clock
+    await _start_turn(clock)
+
+
+def stop(debate_id: int):
+    """Stops timing a debate (it ended some other way). Safe to call for untimed debates."""
+    _clocks.pop(debate_id, None)
+    _wheel.cancel(debate_id)
+
+
+async def turn_taken(debate_id: int, player_id: int):
+    """Ends the current turn if `player_id` holds it; messages out of turn do not move the clock."""
+    clock = _clocks.get(debate_id)
+    if clock is None or clock.current_player != player_id:
+        return
+    clock.missed[clock.turn % len(clock.players)] = 0
+    await _next_turn(clock)
+
+
+async def _next_turn(clock: DebateClock):
+    clock.turn += 1
+    if clock.rounds and clock.turn >= clock.rounds * len(clock.players):
+        await _end(clock, "completed", None)
+    else:
+        await _start_turn(clock)
+
+
+async def _turn_timed_out(clock: DebateClock):
+    index = clock.turn % len(clock.players)
+    clock.missed[index] += 1
+    TURN_TIMEOUTS.inc()
+    await sio.emit('turn_timeout', {
+        'debate_id': clock.debate_id, 'player_id': clock.current_player, 'turn': clock.turn + 1,
+        'round': clock.round, 'missed': clock.missed[index],
+    }, room=str(clock.debate_id))
+
+    if clock.missed[index] < MAX_MISSED_TURNS:
+        await _next_turn(clock)
+    elif len(clock.players) == 1:
+        await _end(clock, "forfeit", "AI") # Evaluator convention for AI debates (see gamification.winner_id_for)
+    elif clock.missed[1 - index]:
+        await _end(clock, "abandoned", gamification.ABANDONED) # The opponent missed their last turn too
+    else:
+        await _end(clock, "forfeit", clock.usernames.get(clock.players[1 - index]))
+
+
+async def _end(clock: DebateClock, reason: str, winner: Optional[str]):
+    stop(clock.debate_id)
+    AUTO_ENDED.inc(reason)
+    logger.info("Debate %s ended by timer: %s (winner %s)", clock.debate_id, reason, winner)
+    await sio.emit('debate_ended', {'debate_id': clock.debate_id, 'reason': reason, 'winner': winner},
+                   room=str(clock.debate_id))
+    if winner is not None:
+        task = asyncio.create_task(asyncio.to_thread(_record_result, clock.debate_id, winner),
+                                   name=f"debate {clock.debate_id} result")
+        _result_writes.add(task)
+        task.add_done_callback(_result_written)
+
+
+def _record_result(debate_id: int, winner: str):
+    with database.SessionLocal() as db:
+        debate = db.get(models.Debate, debate_id)
+        if debate is None or debate.winner is not None:
+            return
+        debate.winner = winner
+        db.commit()
+        gamification.publish_finished_debate(db, debate)
+
+
+def _result_written(task: asyncio.Task):
+    _result_writes.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Failed to record timer result (%s)", task.get_name(), exc_info=task.exception())
+
+
+async def run_wheel():
+    """Background loop: advances the wheel every tick and handles the deadlines that fired."""
+    while True:
+        await asyncio.sleep(max(0.0, _wheel.next_tick_at - time.monotonic()))
+        for debate_id in _wheel.advance(time.monotonic()):
+            clock = _clocks.get(debate_id)
+            if clock is None:
+                continue
+            try:
+                await _turn_timed_out(clock)
+            except Exception:
+                logger.exception("Turn timeout handling failed for debate %s", debate_id)
@@ -1,11 +1,14 @@
 # app/evaluation.py
 import json
 import asyncio
+import logging
 from typing import Dict, Any, List
 
 from . import models
 from .ai import get_ai_response
 
+logger = logging.getLogger(__name__)
+
 async def evaluate_debate(messages: List[models.Message]) -> Dict[str, Any]:
     """
     Evaluates a debate transcript using the Groq AI model.
@@ -85,7 +88,7 @@ async def evaluate_debate(messages: List[models.Message]) -> Dict[str, Any]:
         }
 
     except json.JSONDecodeError as e:
-        print(f"Error decoding AI response JSON: {e}")
+        logger.error("Error decoding AI response JSON: %s", e)
         return {
             'winner_id': None,
             'result': 'undetermined',
@@ -97,7 +100,7 @@ async def evaluate_debate(messages: List[models.Message]) -> Dict[str, Any]:
             }
         }
     except Exception as e:
-        print(f"An unexpected error occurred during AI evaluation: {e}")
+        logger.exception("An unexpected error occurred during AI evaluation: %s", e)
         return {
             'winner_id': None,
             'result': 'undetermined',
@@ -0,0 +1,107 @@
+# app/export.py - Streaming transcript export (NDJSON, optionally gzip)
+#
+# One JSON object per line per debate:
+#   {"id", "topic", "player1_id", "player2_id", "winner", "timestamp",
+#    "messages": [{"id", "sender_type", "sender_id", "content", "timestamp"}, ...]}
+# Debates come out in id order. They are read in keyset chunks of
+# EXPORT_CHUNK_DEBATES (WHERE id > last id ORDER BY id LIMIT n, then one query
+# for those debates' messages and one for their archived transcripts), each
+# in its own short session. Memory stays flat however large the export, and
+# no connection is held between chunks.
+# To resume an interrupted export, pass the id of the last line received as
+# after_id.
+#
+# Output is produced in pieces of about PIECE_BYTES, each ending on a line
+# boundary. In gzip mode every piece is a complete gzip member; concatenated
+# members are a valid gzip file, and a file cut at a piece boundary stays valid.
+#
+# Used by GET /export/debates and tools/export_debates.py.
+#
+# Environment:
+#   EXPORT_CHUNK_DEBATES   debates read per query (default 200)
+
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import Callable, Iterator, Optional, Tuple
+
+from sqlalchemy import or_
+
+from app import archive, metrics, models
+
+CHUNK_DEBATES = int(os.getenv("EXPORT_CHUNK_DEBATES", "200"))
+PIECE_BYTES = 64 * 1024
+
+EXPORTED = metrics.Counter("export_debates_total", "Debate transcripts written by exports.")
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def iter_transcripts(session_factory: Callable, user_id: Optional[int] = None, since: Optional[datetime] = None,
+                     until: Optional[datetime] = None, after_id: int = 0,
+                     chunk_size: int = CHUNK_DEBATES) -> Iterator[dict]:
+    """Yields debate transcripts with id > after_id, optionally for one user and a [since, until) time range."""
+    while True:
+        with session_factory() as db:
+            query = db.query(models.Debate.id, models.Debate.topic, models.Debate.player1_id, models.Debate.player2_id,
+                             models.Debate.winner, models.Debate.timestamp, models.Debate.archived_at
+                             ).filter(models.Debate.id > after_id)
+            if user_id is not None:
+                query = query.filter(or_(models.Debate.player1_id == user_id, models.Debate.player2_id == user_id))
+            if since is not None:
+                query = query.filter(models.Debate.timestamp >= since)
+            if until is not None:
+                query = query.filter(models.Debate.timestamp < until)
+            debates = query.order_by(models.Debate.id).limit(chunk_size).all()
+            if not debates:
+                return
+            messages = (
+                db.query(models.Message.debate_id, models.Message.id, models.Message.sender_type,
+                         models.Message.sender_id, models.Message.content, models.Message.timestamp)
+                .filter(models.Message.debate_id.in_([debate.id for debate in debates]))
+                .order_by(models.Message.debate_id, models.Message.timestamp, models.Message.id).all()
+            )
+            archived = archive.archived_messages_many(db, [debate.id for debate in debates if debate.archived_at])
+
+        by_debate = {}
+        for debate_id, archived_messages in archived.items(): # Archived messages precede any hot ones
+            by_debate[debate_id] = [{
+                "id": message["id"], "sender_type": message["sender_type"], "sender_id": message["sender_id"],
+                "content": message["content"], "timestamp": _iso(message["timestamp"]),
+            } for message in archived_messages]
+        for message in messages:
+            by_debate.setdefault(message.debate_id, []).append({
+                "id": message.id, "sender_type": message.sender_type, "sender_id": message.sender_id,
+                "content": message.content, "timestamp": _iso(message.timestamp),
+            })
+        for debate in debates:
+            yield {
+                "id": debate.id, "topic": debate.topic, "player1_id": debate.player1_id,
+                "player2_id": debate.player2_id, "winner": debate.winner, "timestamp": _iso(debate.timestamp),
+                "messages": by_debate.get(debate.id, []),
+            }
+        EXPORTED.inc(amount=len(debates))
+        if len(debates) < chunk_size:
+            return
+        after_id = debates[-1].id
+
+
+def pieces(transcripts: Iterator[dict], compress: bool = False) -> Iterator[Tuple[int, int, bytes]]:
+    """Encodes transcripts as NDJSON pieces of about PIECE_BYTES: yields (last debate id, debates, bytes)."""
+    lines, size, count, last_id = [], 0, 0, None
+    for transcript in transcripts:
+        line = json.dumps(transcript, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+        lines.append(line)
+        size += len(line)
+        count += 1
+        last_id = transcript["id"]
+        if size >= PIECE_BYTES:
+            data = b"".join(lines)
+            yield last_id, count, gzip.compress(data, compresslevel=6) if compress else data
+            lines, size, count = [], 0, 0
+    if lines:
+        data = b"".join(lines)
+        yield last_id, count, gzip.compress(data, compresslevel=6) if compress else data
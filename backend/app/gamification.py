@@ -0,0 +1,313 @@
+# app/gamification.py - Event-driven badge and streak engine
+#
+# Finished debates are published as DebateFinished events. A background task
+# drains them in batches: per-user aggregates (debates played/won, win streak,
+# badges held) are kept in memory, the declarative rules below are evaluated
+# against them, and streak updates, badge awards and token credits
+# (tokens.debate_credits) for the whole batch are written in one transaction.
+# The synthetic AI opponent (models.AI_USER_ID) gets no aggregates, streaks,
+# badges or tokens. A batch that fails is put back at the front of the queue
+# and retried with backoff. Each counted debate gets debates.processed_at in the
+# batch's transaction, and debates that already have it are skipped, so a
+# debate is counted once even if it is published again after a restart. `backfill` replays the full debate history the same
+# way for users who predate the engine.
+
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+import os
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from app import database, models, tokens
+from app.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SECONDS = float(os.getenv("GAMIFICATION_FLUSH_SECONDS", "5"))
+RETRY_MAX_SECONDS = 300 # Backoff cap after repeated batch failures
+BATCH_SIZE = int(os.getenv("GAMIFICATION_BATCH_SIZE", "500"))
+WRITE_CHUNK = 1000 # Rows per IN (...) lookup / bulk statement
+
+# --- Rules ---
+# Badge rules: (badge name, description, aggregate field, threshold).
+# A badge is awarded the first time the field reaches the threshold.
+BADGE_RULES = [
+    ("First Debate", "Finished your first debate.", "debates_played", 1),
+    ("First Victory", "Won your first debate.", "debates_won", 1),
+    ("Seasoned Debater", "Finished 10 debates.", "debates_played", 10),
+    ("Veteran", "Finished 50 debates.", "debates_played", 50),
+    ("Champion", "Won 25 debates.", "debates_won", 25),
+    ("Hot Streak", "Won 3 debates in a row.", "max_streak", 3),
+    ("Unstoppable", "Won 10 debates in a row.", "max_streak", 10),
+]
+# Streak rule: a win extends the current streak; a loss or a draw resets it.
+STREAK_RESET_ON_DRAW = True
+# Debate.winner for a debate that ended without a result; it is not counted at all.
+ABANDONED = "abandoned"
+
+
+class DebateFinished(NamedTuple):
+    debate_id: int
+    player_ids: tuple      # Every participant who should be credited
+    winner_id: Optional[int] # None for a draw
+
+
+class UserAggregate:
+    __slots__ = ("debates_played", "debates_won", "current_streak", "max_streak", "badge_ids")
+
+    def __init__(self, debates_played=0, debates_won=0, current_streak=0, max_streak=0, badge_ids=None):
+        self.debates_played = debates_played or 0
+        self.debates_won = debates_won or 0
+        self.current_streak = current_streak or 0
+        self.max_streak = max_streak or 0
+        self.badge_ids: Set[int] = badge_ids or set()
+
+    def apply(self, won: bool, draw: bool):
+        self.debates_played += 1
+        if won:
+            self.debates_won += 1
+            self.current_streak += 1
+            self.max_streak = max(self.max_streak, self.current_streak)
+        elif not draw or STREAK_RESET_ON_DRAW:
+            self.current_streak = 0
+
+
+def winner_id_for(debate: models.Debate, usernames: Dict[int, str]) -> Optional[int]:
+    """Maps Debate.winner (a username, 'Draw', or the evaluator's 'User'/'AI') to a user id."""
+    winner = debate.winner
+    if winner in (None, "Draw", "draw", "undetermined"):
+        return None
+    if winner == "User":
+        return debate.player1_id
+    if winner == "AI":
+        return debate.player2_id
+    for player_id in (debate.player1_id, debate.player2_id):
+        if player_id is not None and usernames.get(player_id) == winner:
+            return player_id
+    return None
+
+
+# --- Engine state ---
+_pending: deque = deque() # DebateFinished events waiting for the next batch
+_aggregates = TTLCache(maxsize=100_000, ttl=3600) # {user_id: UserAggregate}
+_badge_ids: Dict[str, int] = {} # {badge name: badge id}
+_queued: Set[int] = set() # Debate ids in _pending (both players may end a debate)
+_processed = TTLCache(maxsize=100_000, ttl=86400) # Debate ids whose batch has been committed
+
+
+def publish_debate_finished(event: DebateFinished):
+    """Queues a finished debate for the next batch. Cheap enough to call from any handler."""
+    if event.debate_id in _queued or _processed.get(event.debate_id):
+        return
+    _queued.add(event.debate_id)
+    _pending.append(event)
+
+def publish_finished_debate(db: Session, debate: models.Debate) -> bool:
+    """Publishes an event for a debate that has an opponent, a recorded result and was not counted yet."""
+    if debate.winner in (None, ABANDONED) or debate.player2_id is None or debate.processed_at is not None:
+        return False
+    player_ids = (debate.player1_id, debate.player2_id)
+    usernames = dict(db.query(models.User.id, models.User.username).filter(models.User.id.in_(player_ids)))
+    publish_debate_finished(DebateFinished(debate.id, player_ids, winner_id_for(debate, usernames)))
+    return True
+
+
+def ensure_badges(db: Session) -> Dict[str, int]:
+    """Makes sure every rule's badge row exists and returns {name: id}."""
+    if len(_badge_ids) == len(BADGE_RULES):
+        return _badge_ids
+    existing = dict(db.query(models.Badge.name, models.Badge.id))
+    missing = [{"name": name, "description": description}
+               for name, description, _, _ in BADGE_RULES if name not in existing]
+    if missing:
+        db.execute(insert(models.Badge), missing)
+        existing = dict(db.query(models.Badge.name, models.Badge.id))
+    _badge_ids.update({name: existing[name] for name, _, _, _ in BADGE_RULES})
+    return _badge_ids
+
+
+def _chunks(items: List[int]):
+    for start in range(0, len(items), WRITE_CHUNK):
+        yield items[start:start + WRITE_CHUNK]
+
+
+def _load_aggregates(db: Session, user_ids: List[int]) -> Dict[int, UserAggregate]:
+    """Loads stored aggregates for many users with one streaks query and one user_badges query per chunk."""
+    loaded = {user_id: UserAggregate() for user_id in user_ids}
+    for chunk in _chunks(user_ids):
+        for row in db.query(models.Streak).filter(models.Streak.user_id.in_(chunk)):
+            loaded[row.user_id] = UserAggregate(row.debates_played, row.debates_won, row.current_streak, row.max_streak)
+        for user_id, badge_id in db.query(models.UserBadge.user_id, models.UserBadge.badge_id).filter(models.UserBadge.user_id.in_(chunk)):
+            loaded[user_id].badge_ids.add(badge_id)
+    return loaded
+
+
+def _evaluate_badges(aggregate: UserAggregate, badge_ids: Dict[str, int]) -> List[int]:
+    awarded = []
+    for name, _, field, threshold in BADGE_RULES:
+        badge_id = badge_ids[name]
+        if badge_id not in aggregate.badge_ids and getattr(aggregate, field) >= threshold:
+            aggregate.badge_ids.add(badge_id)
+            awarded.append(badge_id)
+    return awarded
+
+
+def _write(db: Session, aggregates: Dict[int, UserAggregate], awards: List[dict]):
+    """Upserts streak rows and inserts badge awards with bulk statements."""
+    user_ids = list(aggregates)
+    streak_ids = {}
+    for chunk in _chunks(user_ids):
+        streak_ids.update(
+            (user_id, streak_id) for streak_id, user_id in
+            db.query(models.Streak.id, models.Streak.user_id).filter(models.Streak.user_id.in_(chunk))
+        )
+
+    def values(user_id):
+        aggregate = aggregates[user_id]
+        return {"current_streak": aggregate.current_streak, "max_streak": aggregate.max_streak,
+                "debates_played": aggregate.debates_played, "debates_won": aggregate.debates_won}
+
+    updates = [{"id": streak_ids[user_id], **values(user_id)} for user_id in user_ids if user_id in streak_ids]
+    inserts = [{"user_id": user_id, **values(user_id)} for user_id in user_ids if user_id not in streak_ids]
+    for start in range(0, len(updates), WRITE_CHUNK):
+        db.execute(update(models.Streak), updates[start:start + WRITE_CHUNK])
+    for start in range(0, len(inserts), WRITE_CHUNK):
+        db.execute(insert(models.Streak), inserts[start:start + WRITE_CHUNK])
+    for start in range(0, len(awards), WRITE_CHUNK):
+        db.execute(insert(models.UserBadge), awards[start:start + WRITE_CHUNK])
+
+
+def process_events(events: Iterable[DebateFinished]) -> int:
+    """Applies a batch of events and writes the results in one transaction. Returns badges awarded.
+
+    Events for debates already marked processed_at (or repeated in the batch) are skipped.
+    """
+    events = list({event.debate_id: event for event in events}.values())
+    touched: Dict[int, UserAggregate] = {}
+    awards = []
+    credits = []
+    with database.SessionLocal() as db:
+        try:
+            processed = set()
+            for chunk in _chunks(sorted(event.debate_id for event in events)):
+                processed.update(debate_id for (debate_id,) in db.query(models.Debate.id).filter(
+                    models.Debate.id.in_(chunk), models.Debate.processed_at.isnot(None)))
+            events = [event for event in events if event.debate_id not in processed]
+            if not events:
+                return 0
+
+            badge_ids = ensure_badges(db)
+            player_ids = {player_id for event in events for player_id in event.player_ids
+                          if player_id is not None and player_id != models.AI_USER_ID}
+            missing = [user_id for user_id in player_ids if _aggregates.get(user_id) is None]
+            for user_id, aggregate in _load_aggregates(db, missing).items():
+                _aggregates.set(user_id, aggregate)
+
+            for event in events:
+                for player_id in event.player_ids:
+                    if player_id is None or player_id == models.AI_USER_ID:
+                        continue
+                    aggregate = touched.get(player_id) or _aggregates.get(player_id)
+                    if aggregate is None: # Evicted mid-batch; reload this one user
+                        aggregate = _load_aggregates(db, [player_id])[player_id]
+                        _aggregates.set(player_id, aggregate)
+                    won = event.winner_id == player_id
+                    aggregate.apply(won=won, draw=event.winner_id is None)
+                    touched[player_id] = aggregate
+                    awards.extend({"user_id": player_id, "badge_id": badge_id}
+                                  for badge_id in _evaluate_badges(aggregate, badge_ids))
+                    credits.extend(tokens.debate_credits(event.debate_id, player_id, won))
+
+            _write(db, touched, awards)
+            tokens.credit_batch(db, credits)
+            for chunk in _chunks([event.debate_id for event in events]):
+                db.execute(update(models.Debate).where(models.Debate.id.in_(chunk)).values(processed_at=datetime.utcnow()))
+            db.commit()
+        except Exception:
+            db.rollback()
+            # In-memory aggregates (and badge ids, if just inserted) no longer match the database
+            for user_id in touched:
+                _aggregates.invalidate(user_id)
+            _badge_ids.clear()
+            raise
+    return len(awards)
+
+
+async def run_engine():
+    """Background loop: drains queued events every FLUSH_SECONDS in batches of BATCH_SIZE."""
+    failures = 0
+    while True:
+        await asyncio.sleep(min(FLUSH_SECONDS * 2 ** failures, RETRY_MAX_SECONDS))
+        while _pending:
+            batch = [_pending.popleft() for _ in range(min(BATCH_SIZE, len(_pending)))]
+            try:
+                awarded = await asyncio.to_thread(process_events, batch)
+            except Exception as e:
+                _pending.extendleft(reversed(batch)) # Retried first, in the original order
+                failures += 1
+                logger.exception("Gamification batch of %d events failed (attempt %d): %s", len(batch), failures, e)
+                break
+            failures = 0
+            for event in batch:
+                _queued.discard(event.debate_id)
+                _processed.set(event.debate_id, True)
+            logger.info("Processed %d debate events, awarded %d badges.", len(batch), awarded)
+
+
+def backfill(db: Session, chunk_size: int = 5000) -> dict:
+    """Rebuilds every user's aggregates, streaks and badges by replaying finished debates in order.
+
+    Debates are streamed in chunks with only the needed columns; all aggregates live in
+    memory and are written once at the end, so the cost is a handful of queries
+    regardless of the number of users and rules. Replayed debates are marked processed_at,
+    so the live engine will not count them again. Token credits are not replayed.
+    """
+    badge_ids = ensure_badges(db)
+    usernames = dict(db.query(models.User.id, models.User.username))
+    aggregates: Dict[int, UserAggregate] = {}
+    replayed = 0
+    unmarked: List[int] = [] # Replayed debates without processed_at yet
+
+    debates = (
+        db.query(models.Debate.id, models.Debate.player1_id, models.Debate.player2_id, models.Debate.winner,
+                 models.Debate.processed_at)
+        .filter(models.Debate.winner.isnot(None), models.Debate.winner != ABANDONED, models.Debate.player2_id.isnot(None))
+        .order_by(models.Debate.timestamp, models.Debate.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    for debate in debates:
+        winner_id = winner_id_for(debate, usernames)
+        for player_id in (debate.player1_id, debate.player2_id):
+            if player_id == models.AI_USER_ID:
+                continue
+            aggregate = aggregates.get(player_id)
+            if aggregate is None:
+                aggregate = aggregates[player_id] = UserAggregate()
+            aggregate.apply(won=winner_id == player_id, draw=winner_id is None)
+        replayed += 1
+        if debate.processed_at is None:
+            unmarked.append(debate.id)
+
+    # Keep badges that were already awarded; only add the missing ones
+    held = {}
+    for user_id, badge_id in db.query(models.UserBadge.user_id, models.UserBadge.badge_id):
+        held.setdefault(user_id, set()).add(badge_id)
+    awards = []
+    for user_id, aggregate in aggregates.items():
+        aggregate.badge_ids = held.get(user_id, set())
+        awards.extend({"user_id": user_id, "badge_id": badge_id} for badge_id in _evaluate_badges(aggregate, badge_ids))
+
+    _write(db, aggregates, awards)
+    now = datetime.utcnow()
+    for chunk in _chunks(unmarked):
+        db.execute(update(models.Debate).where(models.Debate.id.in_(chunk)).values(processed_at=now))
+    # Drop anything credited to the AI opponent before it was excluded
+    db.query(models.Streak).filter(models.Streak.user_id == models.AI_USER_ID).delete(synchronize_session=False)
+    db.query(models.UserBadge).filter(models.UserBadge.user_id == models.AI_USER_ID).delete(synchronize_session=False)
+    db.commit()
+    _aggregates.clear()
+    return {"debates": replayed, "users": len(aggregates), "badges_awarded": len(awards)}
@@ -0,0 +1,151 @@
+# app/group_hub.py - Lightweight pub/sub for the /ws/{group_name} lobby chat
+#
+# Plain WebSockets, no Socket.IO. Each group is a set of connections; each
+# connection owns a bounded send queue drained by its own writer task, so
+# broadcast() only enqueues (O(members), never awaits a socket) and every
+# member is written to concurrently. A member whose queue is full - it is
+# reading slower than the group is talking - is closed with 1013 (try again
+# later) instead of being buffered for without limit. Senders are rate
+# limited per connection, so one flooding client cannot fill everyone's queue.
+#
+# Environment:
+#   GROUP_SEND_QUEUE       messages queued per connection before it is dropped (default 100)
+#   GROUP_SEND_TIMEOUT     seconds one send may block before the connection is dropped (default 10)
+#   GROUP_MAX_MESSAGE      longest accepted chat message, in characters (default 2000)
+#   GROUP_RATE_PER_SECOND  sustained messages a member may send per second (default 5)
+#   GROUP_RATE_BURST       messages a member may send in a burst (default 20)
+#   GROUP_ANNOUNCE_LIMIT   joins/leaves are announced only in groups up to this size (default 100);
+#                          announcing every join to everyone is O(members^2) while a big lobby fills
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Set
+
+from fastapi import WebSocket
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+SEND_QUEUE = int(os.getenv("GROUP_SEND_QUEUE", "100"))
+SEND_TIMEOUT = float(os.getenv("GROUP_SEND_TIMEOUT", "10"))
+MAX_MESSAGE = int(os.getenv("GROUP_MAX_MESSAGE", "2000"))
+ANNOUNCE_LIMIT = int(os.getenv("GROUP_ANNOUNCE_LIMIT", "100"))
+RATE_PER_SECOND = float(os.getenv("GROUP_RATE_PER_SECOND", "5"))
+RATE_BURST = float(os.getenv("GROUP_RATE_BURST", "20"))
+
+SLOW_CLOSE_CODE = 1013 # "Try Again Later"
+
+GROUP_DROPS = metrics.Counter(
+    "ws_group_slow_consumers_total", "Group WebSocket connections closed for falling behind, by reason.", ("reason",))
+GROUP_RATE_LIMITED = metrics.Counter(
+    "ws_group_rate_limited_total", "Group messages discarded because the sender exceeded its rate.")
+
+
+class GroupConnection:
+    """One member of a group: its socket, bounded outbox and writer task."""
+
+    __slots__ = ("websocket", "group", "username", "queue", "writer", "closed", "tokens", "refilled_at")
+
+    def __init__(self, websocket: WebSocket, group: str, username: str):
+        self.websocket = websocket
+        self.group = group
+        self.username = username
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SEND_QUEUE)
+        self.writer = None
+        self.closed = False
+        self.tokens = RATE_BURST
+        self.refilled_at = time.monotonic()
+
+    def allow_send(self) -> bool:
+        """Token bucket: RATE_PER_SECOND sustained, RATE_BURST at once."""
+        now = time.monotonic()
+        self.tokens = min(RATE_BURST, self.tokens + (now - self.refilled_at) * RATE_PER_SECOND)
+        self.refilled_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def offer(self, text: str) -> bool:
+        """Queues `text` for sending; False if the outbox is full."""
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+
+class GroupHub:
+    def __init__(self):
+        self.groups: Dict[str, Set[GroupConnection]] = {}
+        metrics.Gauge("ws_group_connections", "Open /ws group connections.",
+                      function=lambda: sum(len(members) for members in self.groups.values()))
+
+    def size(self, group: str) -> int:
+        return len(self.groups.get(group, ()))
+
+    async def connect(self, websocket: WebSocket, group: str, username: str) -> GroupConnection:
+        await websocket.accept()
+        connection = GroupConnection(websocket, group, username)
+        connection.writer = asyncio.create_task(self._write(connection))
+        self.groups.setdefault(group, set()).add(connection)
+        return connection
+
+    def disconnect(self, connection: GroupConnection):
+        """Removes the connection from its group and stops its writer. Idempotent."""
+        if connection.closed:
+            return
+        connection.closed = True
+        members = self.groups.get(connection.group)
+        if members is not None:
+            members.discard(connection)
+            if not members:
+                del self.groups[connection.group]
+        if connection.writer is not None and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+
+    def broadcast(self, group: str, text: str) -> int:
+        """Queues `text` for every member of `group`; returns how many members it was queued for."""
+        delivered = 0
+        for connection in list(self.groups.get(group, ())):
+            if connection.offer(text):
+                delivered += 1
+            else:
+                self._drop(connection, "queue_full")
+        return delivered
+
+    def announce(self, group: str, text: str):
+        """Broadcasts a join/leave notice unless the group is past ANNOUNCE_LIMIT."""
+        if self.size(group) <= ANNOUNCE_LIMIT:
+            self.broadcast(group, text)
+
+    def _drop(self, connection: GroupConnection, reason: str):
+        GROUP_DROPS.inc(reason)
+        logger.info("Dropping slow /ws/%s member %s (%s).", connection.group, connection.username, reason)
+        self.disconnect(connection)
+        asyncio.create_task(self._close(connection.websocket))
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=SLOW_CLOSE_CODE), SEND_TIMEOUT)
+        except Exception:
+            pass # Already gone or not draining; the server reaps the transport
+
+    async def _write(self, connection: GroupConnection):
+        try:
+            while True:
+                text = await connection.queue.get()
+                await asyncio.wait_for(connection.websocket.send_text(text), SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            self._drop(connection, "send_timeout")
+        except Exception:
+            self.disconnect(connection) # Socket closed underneath us; the reader will notice too
+
+
+hub = GroupHub()
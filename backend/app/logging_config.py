@@ -0,0 +1,154 @@
+# app/logging_config.py - Structured, queue-backed logging
+#
+# Handlers on the event loop only enqueue the LogRecord; a QueueListener
+# thread formats it and writes it to stdout. Configuration comes from env:
+#   LOG_LEVEL                root level (default INFO)
+#   LOG_LEVELS               per-module overrides, e.g. "app.matchmaking=DEBUG,app.http=WARNING"
+#   LOG_FORMAT               "json" (default) or "text"
+#   LOG_REQUEST_SAMPLE_RATE  fraction of non-error HTTP requests to log (default 1.0)
+#   LOG_REQUEST_HEADERS      "1" to include request headers (credentials are redacted)
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("LOG_REQUEST_SAMPLE_RATE", "1.0"))
+LOG_REQUEST_HEADERS = os.getenv("LOG_REQUEST_HEADERS", "0") == "1"
+QUEUE_SIZE = 10000
+
+REDACTED_HEADERS = {"authorization", "proxy-authorization", "cookie", "set-cookie"}
+
+# Attributes every LogRecord has; anything else was passed via `extra=` and is emitted as a field
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+request_logger = logging.getLogger("app.http")
+
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in record.__dict__.items() if key not in _STANDARD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread and drops records when the queue is full."""
+
+    dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DeferredQueueHandler.dropped += 1
+
+
+_listener = None
+
+
+def setup_logging():
+    """Installs the queue handler on the root logger. Safe to call more than once."""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+    _listener = QueueListener(log_queue, stream_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.handlers = [DeferredQueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+    for override in filter(None, (item.strip() for item in LOG_LEVELS.split(","))):
+        name, _, level = override.partition("=")
+        logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+
+def redact_headers(headers) -> dict:
+    return {name: ("[REDACTED]" if name.lower() in REDACTED_HEADERS else value) for name, value in headers}
+
+
+class RequestLogMiddleware:
+    """Pure ASGI middleware: one sampled log line per HTTP request, errors always logged."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500, "sent": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                status["sent"] = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            request_logger.exception("Unhandled exception", extra={"method": scope["method"], "path": scope["path"]})
+            if not status["sent"]:
+                body = b"Internal Server Error: See server logs for details"
+                await send({"type": "http.response.start", "status": 500,
+                            "headers": [(b"content-type", b"text/plain"), (b"content-length", str(len(body)).encode())]})
+                await send({"type": "http.response.body", "body": body})
+            return
+
+        code = status["code"]
+        if not request_logger.isEnabledFor(logging.INFO):
+            return
+        if code < 500 and REQUEST_LOG_SAMPLE_RATE < 1.0 and random.random() >= REQUEST_LOG_SAMPLE_RATE:
+            return
+        fields = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        if LOG_REQUEST_HEADERS:
+            fields["headers"] = redact_headers((k.decode("latin-1"), v.decode("latin-1")) for k, v in scope["headers"])
+        request_logger.log(logging.ERROR if code >= 500 else logging.INFO, "request", extra=fields)
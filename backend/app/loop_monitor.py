@@ -0,0 +1,103 @@
+# app/loop_monitor.py - Event-loop lag watchdog
+#
+# A heartbeat task sleeps for INTERVAL and records how late it wakes up
+# (the event-loop lag histogram). A daemon thread watches the heartbeat; when
+# the loop has not ticked for LAG_THRESHOLD it grabs the loop thread's current
+# stack - i.e. the blocking call itself - and the route or Socket.IO event the
+# running task is handling, and keeps it in a ring buffer of recent stalls.
+# Steady-state cost is one timer wake-up per INTERVAL on each side.
+#   LOOP_MONITOR              "1" to enable (default off)
+#   LOOP_LAG_THRESHOLD_MS     stall threshold (default 100)
+#   LOOP_MONITOR_INTERVAL_MS  heartbeat period (default 50)
+#   LOOP_STALL_BUFFER         stalls kept for /diagnostics/loop-stalls (default 50)
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("LOOP_MONITOR", "0") == "1"
+LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100")) / 1000
+INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50")) / 1000
+STACK_DEPTH = 30 # Innermost frames kept per stall
+
+LOOP_LAG_SECONDS = metrics.Histogram(
+    "event_loop_lag_seconds", "How late the event-loop heartbeat woke up.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+LOOP_STALLS = metrics.Counter(
+    "event_loop_stalls_total", "Event-loop stalls over the threshold, by operation.", ("operation",))
+
+recent_stalls: deque = deque(maxlen=int(os.getenv("LOOP_STALL_BUFFER", "50")))
+
+_last_beat = time.monotonic()
+_open_stall: Optional[dict] = None # Stall currently in progress (captured, loop not yet resumed)
+_started = False
+
+
+def _capture_stall(loop, loop_thread_id: int, stalled_for: float) -> dict:
+    frame = sys._current_frames().get(loop_thread_id)
+    stack = traceback.format_stack(frame)[-STACK_DEPTH:] if frame is not None else []
+    task = asyncio.current_task(loop)
+    operation = metrics.operation_name(metrics.task_operations.get(task))
+    return {
+        "at": time.time(),
+        "lag_ms": round(stalled_for * 1000, 1),
+        "operation": operation,
+        "task": task.get_name() if task is not None else None,
+        "stack": [line.rstrip() for line in stack],
+    }
+
+
+def _watch(loop, loop_thread_id: int):
+    global _open_stall
+    while True:
+        time.sleep(INTERVAL)
+        stalled_for = time.monotonic() - _last_beat - INTERVAL
+        if stalled_for < LAG_THRESHOLD:
+            continue
+        if _open_stall is not None:
+            _open_stall["lag_ms"] = round(stalled_for * 1000, 1)
+            continue
+        try:
+            stall = _capture_stall(loop, loop_thread_id, stalled_for)
+        except Exception: # Never let the watchdog thread die
+            continue
+        _open_stall = stall
+        recent_stalls.append(stall)
+        LOOP_STALLS.inc(stall["operation"])
+
+
+async def _heartbeat():
+    global _last_beat, _open_stall
+    while True:
+        _last_beat = started = time.monotonic()
+        await asyncio.sleep(INTERVAL)
+        lag = max(time.monotonic() - started - INTERVAL, 0.0)
+        LOOP_LAG_SECONDS.observe(lag)
+        stall = _open_stall
+        if stall is not None:
+            _open_stall = None
+            stall["lag_ms"] = round(lag * 1000, 1)
+            logger.warning("Event loop blocked for %.0f ms in %s", stall["lag_ms"], stall["operation"],
+                           extra={"stack": "".join(line + "\n" for line in stall["stack"][-8:])})
+
+
+def start():
+    """Starts the heartbeat and the watchdog thread on the running loop. Idempotent."""
+    global _started
+    if _started:
+        return
+    _started = True
+    loop = asyncio.get_running_loop()
+    asyncio.create_task(_heartbeat())
+    threading.Thread(target=_watch, args=(loop, threading.get_ident()), name="loop-monitor", daemon=True).start()
+    logger.info("Event-loop monitor started (threshold %.0f ms).", LAG_THRESHOLD * 1000)
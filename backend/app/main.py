@@ -1,13 +1,16 @@
 # app/main.py - FINAL WORKING CODE (CORS CHECK)
 
-from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect, Query 
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query 
 from fastapi.middleware.cors import CORSMiddleware
 # Gunicorn Import Fix: app.routers का उपयोग करें
-from app.routers import auth_routes, leaderboard_routes, dashboard_routes, token_routes, gamification_routes, forum_routes, ai_debate_routes, analysis_routes
-from app import debate, matchmaking
+from app.routers import auth_routes, leaderboard_routes, dashboard_routes, token_routes, gamification_routes, forum_routes, ai_debate_routes, analysis_routes, search_routes, metrics_routes, diagnostics_routes, topic_routes, export_routes
+from app import debate, matchmaking, gamification, metrics, loop_monitor, rooms, group_hub, debate_timer, reaper, archive
 from app.socketio_instance import sio 
+from app.logging_config import setup_logging, RequestLogMiddleware
 import socketio
-import traceback 
+import asyncio
+
+setup_logging()
 
 # Define the list of allowed origins explicitly - CRITICAL
 origins = [
@@ -25,61 +28,47 @@ fastapi_app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"], # Keyset pagination cursor on listing routes
 )
-# Log incoming requests for debugging (Keeping original logging middleware)
-@fastapi_app.middleware("http")
-async def log_requests(request: Request, call_next):
-    # ... (Your logging logic remains unchanged, but placed AFTER CORS) ...
-    print(f"\n--- INCOMING HTTP REQUEST START ---")
-    print(f"Method: {request.method}")
-    print(f"URL: {request.url}")
-    print(f"Headers: {request.headers}")
-    print(f"--- REQUEST BODY (if any) ---")
-    try:
-        # NOTE: Cannot await request.body() before call_next if not reading it fully
-        pass # Skipping heavy body logging for simplicity
-    except Exception as e:
-        pass 
-    print(f"--- END REQUEST BODY ---")
-
-    response = Response("Internal Server Error", status_code=500)
-
-    try:
-        response = await call_next(request)
-        print(f"--- OUTGOING HTTP RESPONSE START ---")
-        print(f"Status: {response.status_code}")
-        print(f"Headers: {response.headers}")
-        # The CORS middleware should handle the header, but keeping this for safety:
-        # response.headers["Access-Control-Allow-Origin"] = request.headers.get('origin', '*') 
-        print(f"--- OUTGOING HTTP RESPONSE END ---")
-        return response
-    except Exception as e:
-        print(f"\n--- CRITICAL EXCEPTION CAUGHT IN MIDDLEWARE ---")
-        print(f"Error: {e}")
-        traceback.print_exc()
-        print(f"--- END CRITICAL EXCEPTION ---")
-        return Response("Internal Server Error: See server logs for details", status_code=500, media_type="text/plain")
-
-# Define a simple connection manager for WebSocket connections (Kept but unused)
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
-    # ... (ConnectionManager methods) ...
-
-manager = ConnectionManager()
+# Structured request logging (replaces the old print-based middleware).
+# Added after CORS so it stays the outermost middleware, as before.
+fastapi_app.add_middleware(RequestLogMiddleware)
+# Per-route latency histograms for /metrics
+fastapi_app.add_middleware(metrics.MetricsMiddleware)
 
+# Lobby chat over plain WebSockets, one pub/sub group per path (see app/group_hub.py)
 @fastapi_app.websocket("/ws/{group_name}")
 async def websocket_endpoint(websocket: WebSocket, group_name: str, username: str = Query(...)):
-    # ... (Your WebSocket logic remains unchanged) ...
-    await manager.connect(websocket, username)
-    await manager.broadcast(f"📢 {username} joined {group_name}")
+    connection = await group_hub.hub.connect(websocket, group_name, username)
+    group_hub.hub.announce(group_name, f"📢 {username} joined {group_name}")
     try:
-        while True:
+        while not connection.closed: # Set when the hub drops this member as a slow consumer
             data = await websocket.receive_text()
-            await manager.broadcast(f"{username}: {data}")
+            if not connection.allow_send():
+                group_hub.GROUP_RATE_LIMITED.inc()
+                continue
+            group_hub.hub.broadcast(group_name, f"{username}: {data[:group_hub.MAX_MESSAGE]}")
+            await asyncio.sleep(0) # Let the writers run before reading the next message
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
-        await manager.broadcast(f"❌ {username} left {group_name}")
+        pass
+    finally:
+        was_member = not connection.closed
+        group_hub.hub.disconnect(connection)
+        if was_member:
+            group_hub.hub.announce(group_name, f"❌ {username} left {group_name}")
+
+
+# Background jobs (single worker, see Procfile)
+@fastapi_app.on_event("startup")
+async def start_background_jobs():
+    asyncio.create_task(gamification.run_engine())
+    asyncio.create_task(rooms.run_evictor())
+    asyncio.create_task(rooms.run_spectator_flusher())
+    asyncio.create_task(debate_timer.run_wheel())
+    asyncio.create_task(reaper.run_reaper())
+    asyncio.create_task(archive.run_archiver())
+    if loop_monitor.ENABLED:
+        loop_monitor.start()
 
 
 # Include routers
@@ -97,6 +86,14 @@ fastapi_app.include_router(gamification_routes.router, tags=["Gamification"])
 fastapi_app.include_router(forum_routes.router, tags=["Forum"])
 fastapi_app.include_router(ai_debate_routes.router, tags=["AI Debate"])
 fastapi_app.include_router(analysis_routes.router, tags=["Analysis"])
+fastapi_app.include_router(search_routes.router, tags=["Search"])
+fastapi_app.include_router(metrics_routes.router, tags=["Metrics"])
+fastapi_app.include_router(diagnostics_routes.router, tags=["Diagnostics"])
+fastapi_app.include_router(topic_routes.router, tags=["Topics"])
+fastapi_app.include_router(export_routes.router, tags=["Export"])
+
+# Time every Socket.IO handler registered by the imports above
+metrics.instrument_socketio(sio)
 
 # Combine Socket.IO and FastAPI into a single ASGI app
 app = socketio.ASGIApp(sio, other_asgi_app=fastapi_app)
\ No newline at end of file
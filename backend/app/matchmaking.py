@@ -3,66 +3,90 @@
 from app.socketio_instance import sio
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from app import database, models, schemas
+from app import database, models, schemas, gamification, metrics, rooms, debate_timer, search, topics
+from app import auth as auth_utils # Aliased: connect() takes an `auth` argument
 # FIX: evaluation import needs correct path if it exists
 # from app.evaluation import evaluate_debate # Assuming this exists
 from typing import Dict, Any, Optional, List
 from datetime import datetime
-from jose import JWTError, jwt
-import os
-import traceback # For detailed error logging
+import logging
+import time
 
-SECRET_KEY = os.getenv("JWT_SECRET", "testsecret")
-ALGORITHM = "HS256"
+logger = logging.getLogger(__name__)
 
 # NOTE: These are safe Global lists because Gunicorn worker is set to 1
 online_users: Dict[str, Any] = {} # {user_id: {username, elo, sid}}
-matchmaking_queue: List[Dict[str, Any]] = [] # [{user_id, elo, sid, debate_id, username}]
+matchmaking_queue: List[Dict[str, Any]] = [] # [{user_id, elo, sid, debate_id, username, queued_at}]
+
+# Read at scrape time, so they cost nothing on the hot path
+metrics.Gauge("online_users", "Users currently marked online.", function=lambda: len(online_users))
+metrics.Gauge("matchmaking_queue_depth", "Users waiting in the matchmaking queue.", function=lambda: len(matchmaking_queue))
+
+
+async def get_session_user(sid) -> Optional[Dict[str, Any]]:
+    """Returns the identity bound to this socket at connect time, or None if unauthenticated."""
+    session = await sio.get_session(sid)
+    if session.get('user_id') is None:
+        return None
+    return session
+
+
+def _optional_int(value) -> Optional[int]:
+    """Parses an optional integer from a client payload; missing or malformed values give None."""
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
 
 
 # --- Socket.IO Event Handlers ---
 
 @sio.event
 async def connect(sid, environ, auth: Optional[dict] = None):
-    """Handles initial connection and authentication."""
+    """Handles initial connection and authentication.
+
+    The user is resolved once here and their id, username and elo are kept in
+    the Socket.IO session; later handlers read identity from the session instead
+    of trusting the client payload. Elo is refreshed when the user joins the queue.
+    """
     token = auth.get('token') if auth else None
 
     if not token:
-        print(f"SID {sid} connected without explicit token. Waiting for 'user_online'.")
+        logger.info("SID %s connected without explicit token. Identity-bound events will be rejected.", sid)
         return True # Allow connection
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            print(f"SID {sid} connection allowed but token payload invalid.")
+    with database.SessionLocal() as db:
+        user = auth_utils.resolve_user_from_token(token, db)
+        if user is None:
+            logger.info("SID %s connection allowed despite JWT validation failure.", sid)
             return True # Allow connection for now
 
-        # Store authenticated email in the session for potential future use
-        await sio.save_session(sid, {'email': email})
-        print(f"SID {sid} connected and authenticated via token successfully.")
-        return True
-
-    except JWTError:
-        print(f"SID {sid} connection allowed despite JWT validation failure.")
-        return True # Allow connection for now
+        await sio.save_session(sid, {
+            'email': user.email,
+            'user_id': str(user.id),
+            'username': user.username,
+            'elo': user.elo if user.elo is not None else 1000,
+            'debate_ids': set(), # Debates this socket has already been authorized for
+        })
+    logger.info("SID %s connected and authenticated as user %s.", sid, user.id)
+    return True
 
 
 @sio.event
-async def user_online(sid, data):
-    """Registers user details when they explicitly declare themselves online."""
-    user_id = str(data.get('userId'))
-    username = data.get('username')
-    elo = data.get('elo')
-
-    if user_id and username:
-        # Always update the user's entry with the latest SID
-        online_users[user_id] = {'username': username, 'elo': elo, 'id': user_id, 'sid': sid}
-        print(f"User online: {username} (ID: {user_id}, ELO: {elo}). Total online: {len(online_users)}")
-        # Optionally broadcast the updated online users list if UI needs it
-        # await sio.emit('online_users', list(online_users.values()))
-    else:
-        print(f"WARNING: Missing userId or username in user_online event for SID {sid}. Data: {data}")
+async def user_online(sid, data=None):
+    """Registers the session's user as online."""
+    identity = await get_session_user(sid)
+    if identity is None:
+        logger.warning("user_online from unauthenticated SID %s.", sid)
+        await sio.emit('error', {'detail': 'Authentication required.'}, room=sid)
+        return
+
+    user_id = identity['user_id']
+    # Always update the user's entry with the latest SID
+    online_users[user_id] = {'username': identity['username'], 'elo': identity['elo'], 'id': user_id, 'sid': sid}
+    logger.info("User online: %s (ID: %s, ELO: %s). Total online: %d", identity['username'], user_id, identity['elo'], len(online_users))
+    # Optionally broadcast the updated online users list if UI needs it
+    # await sio.emit('online_users', list(online_users.values()))
 
 
 @sio.event
@@ -70,12 +94,13 @@ async def user_offline(sid, data=None):
     """Handles user going offline or disconnecting based on SID."""
     user_id_to_remove = None
     username = "Unknown"
-    # Find user_id based on sid
-    for uid, udata in list(online_users.items()): # Use list() for safe iteration during removal
-        if udata.get('sid') == sid:
-            user_id_to_remove = uid
-            username = udata.get('username', 'Unknown')
-            break
+    # The session identifies the user directly; only remove the entry if it still belongs to this SID
+    identity = await get_session_user(sid)
+    if identity is not None:
+        udata = online_users.get(identity['user_id'])
+        if udata and udata.get('sid') == sid:
+            user_id_to_remove = identity['user_id']
+            username = identity['username']
 
     if user_id_to_remove:
         if user_id_to_remove in online_users:
@@ -83,7 +108,7 @@ async def user_offline(sid, data=None):
         # Also remove user from queue if they were searching
         global matchmaking_queue
         matchmaking_queue = [q for q in matchmaking_queue if q['user_id'] != user_id_to_remove]
-        print(f"User offline: {username} (ID: {user_id_to_remove}). Total online: {len(online_users)}. Queue size: {len(matchmaking_queue)}")
+        logger.info("User offline: %s (ID: %s). Total online: %d. Queue size: %d", username, user_id_to_remove, len(online_users), len(matchmaking_queue))
         # Optionally broadcast the updated online users list
         # await sio.emit('online_users', list(online_users.values()))
 
@@ -91,26 +116,42 @@ async def user_offline(sid, data=None):
 @sio.event
 async def disconnect(sid):
     """Handles socket disconnection event by cleaning up user state."""
-    print(f"SID {sid} disconnected.")
+    logger.debug("SID %s disconnected.", sid)
     # Call user_offline logic to clean up based on SID
     await user_offline(sid, data=None)
+    await rooms.spectator_disconnected(sid)
 
 
 # --- Room Join Handler ---
 @sio.event
 async def join_debate_room(sid, data):
-    """Handles a client joining a specific debate room."""
+    """Handles a client joining (or rejoining) a specific debate room.
+
+    A reconnecting client sends `lastSeq`, the seq of the last new_message it
+    received; the messages it missed are re-sent from the room's replay buffer.
+    The ack is {'seq', 'replayed', 'complete'}; complete=False means the gap is
+    no longer buffered and the transcript must be refetched over HTTP.
+    Replayed and live messages can overlap by a few; clients drop seqs they have seen.
+    """
     debate_id = data.get('debateId')
     if debate_id:
         room_id = str(debate_id)
         try:
             await sio.enter_room(sid, room_id)
-            print(f"DEBUG: SID {sid} joined room {room_id}")
+            logger.debug("SID %s joined room %s", sid, room_id)
         except Exception as e:
-            print(f"ERROR: Failed to join room {room_id} for SID {sid}. Error: {e}")
+            logger.error("Failed to join room %s for SID %s. Error: %s", room_id, sid, e)
             await sio.emit('error', {'detail': f'Failed to join debate room: {e}'}, room=sid)
+            return None
+        last_seq = _optional_int(data.get('lastSeq')) # Malformed is treated as absent
+        missed, complete, latest = rooms.missed_messages(room_id, last_seq)
+        for message in missed:
+            await sio.emit('new_message', message, room=sid)
+        if missed or not complete:
+            logger.debug("SID %s rejoined room %s after seq %s: replayed %d, complete=%s", sid, room_id, last_seq, len(missed), complete)
+        return {'seq': latest, 'replayed': len(missed), 'complete': complete}
     else:
-        print(f"WARNING: join_debate_room called without debateId for SID {sid}")
+        logger.warning("join_debate_room called without debateId for SID %s", sid)
 
 @sio.event
 async def leave_debate_room(sid, data):
@@ -120,12 +161,41 @@ async def leave_debate_room(sid, data):
         room_id = str(debate_id)
         try:
              await sio.leave_room(sid, room_id)
-             print(f"DEBUG: SID {sid} left room {room_id}")
+             logger.debug("SID %s left room %s", sid, room_id)
         except Exception as e:
-             print(f"ERROR: Failed to leave room {room_id} for SID {sid}. Error: {e}")
+             logger.error("Failed to leave room %s for SID %s. Error: %s", room_id, sid, e)
              # No need to emit error on leave typically
     else:
-        print(f"WARNING: leave_debate_room called without debateId for SID {sid}")
+        logger.warning("leave_debate_room called without debateId for SID %s", sid)
+
+
+# --- Spectators ---
+@sio.event
+async def spectate_debate(sid, data):
+    """Starts streaming a debate to a viewer as batched message_batch events.
+
+    Works without logging in. Pass `lastSeq` to resume after a reconnect; the
+    ack is {'seq', 'replayed', 'complete', 'spectators'} as for join_debate_room.
+    """
+    debate_id = _optional_int(data.get('debateId')) if data else None
+    if not debate_id:
+        logger.warning("spectate_debate called without a valid debateId for SID %s", sid)
+        await sio.emit('error', {'detail': 'A numeric debateId is required.'}, room=sid)
+        return None
+    last_seq = _optional_int(data.get('lastSeq')) # Malformed is treated as absent
+    ack = await rooms.add_spectator(sid, debate_id, last_seq)
+    logger.debug("SID %s spectating debate %s (%d spectators)", sid, debate_id, ack['spectators'])
+    return ack
+
+@sio.event
+async def stop_spectating(sid, data):
+    """Stops streaming a debate to a viewer."""
+    debate_id = _optional_int(data.get('debateId')) if data else None
+    if not debate_id:
+        logger.warning("stop_spectating called without a valid debateId for SID %s", sid)
+        await sio.emit('error', {'detail': 'A numeric debateId is required.'}, room=sid)
+        return
+    await rooms.remove_spectator(sid, debate_id)
 
 
 # --- Matchmaking Queue Logic ---
@@ -133,13 +203,20 @@ async def leave_debate_room(sid, data):
 @sio.event
 async def join_matchmaking_queue(sid, data):
     """Adds a user to the matchmaking queue and attempts to find a match."""
-    print(f"DEBUG: Received join_matchmaking_queue from SID {sid} with data: {data}")
+    logger.debug("join_matchmaking_queue from SID %s with data: %s", sid, data)
+
+    identity = await get_session_user(sid)
+    if identity is None:
+        logger.warning("join_matchmaking_queue: Unauthenticated SID %s", sid)
+        await sio.emit('error', {'detail': 'Authentication required.'}, room=sid)
+        return
 
-    user_id = str(data.get('userId'))
+    # Identity and ELO come from the session, never from the payload
+    user_id = identity['user_id']
     debate_id = data.get('debateId')
 
-    if not user_id or not debate_id:
-        print(f"ERROR join_matchmaking_queue: Missing userId or debateId for SID {sid}")
+    if not debate_id:
+        logger.warning("join_matchmaking_queue: Missing debateId for SID %s", sid)
         await sio.emit('error', {'detail': 'Missing user or debate ID for queue.'}, room=sid)
         return
 
@@ -148,23 +225,31 @@ async def join_matchmaking_queue(sid, data):
     # Ensure user is registered as online and SID matches before proceeding
     online_user_data = online_users.get(user_id)
     if not online_user_data or online_user_data.get('sid') != sid:
-        print(f"ERROR join_matchmaking_queue: User {user_id} not online or SID mismatch for SID {sid}")
+        logger.warning("join_matchmaking_queue: User %s not online or SID mismatch for SID %s", user_id, sid)
         await sio.emit('toast', {'title': 'Error', 'description': 'Not properly registered as online or session mismatch.'}, room=sid)
         return
 
     # Remove user if they are restarting the search
     matchmaking_queue = [q for q in matchmaking_queue if q['user_id'] != user_id]
 
+    # The session's elo dates from connect; re-read it so ratings changed since then are used
+    with database.SessionLocal() as db:
+        elo = db.query(models.User.elo).filter(models.User.id == int(user_id)).scalar()
+    identity['elo'] = elo if elo is not None else 1000
+    online_user_data['elo'] = identity['elo']
+    await sio.save_session(sid, identity)
+
     # Add user to the queue
     user_data = {
         'user_id': user_id,
-        'elo': online_user_data.get('elo', 1000),
+        'elo': identity['elo'],
         'sid': sid, # Use the current SID from the event
         'debate_id': debate_id,
-        'username': online_user_data.get('username', 'Unknown')
+        'username': identity['username'],
+        'queued_at': time.monotonic(),
     }
     matchmaking_queue.append(user_data)
-    print(f"User {user_data['username']} added to queue. Size: {len(matchmaking_queue)}")
+    logger.info("User %s added to queue. Size: %d", user_data['username'], len(matchmaking_queue))
 
     # Check for an immediate match
     if len(matchmaking_queue) >= 2:
@@ -192,23 +277,23 @@ async def join_matchmaking_queue(sid, data):
                       player1 = matchmaking_queue.pop(p1_index)
             else:
                  # Not enough different users
-                 print(f"Matchmaking check: Not enough different users in queue. Size: {len(matchmaking_queue)}")
+                 logger.debug("Matchmaking check: Not enough different users in queue. Size: %d", len(matchmaking_queue))
                  return # Wait for another different user
 
         except IndexError:
-            print("WARNING: IndexError during pop.")
+            logger.warning("IndexError during pop.")
             if player1: matchmaking_queue.insert(0, player1)
             if player2: matchmaking_queue.insert(0, player2)
             return
 
         # Double check players are valid
         if not player1 or not player2 or player1.get('user_id') == player2.get('user_id'):
-             print("ERROR: Matchmaking failed after pop.")
+             logger.error("Matchmaking failed after pop.")
              if player1: matchmaking_queue.insert(0, player1)
              if player2: matchmaking_queue.insert(0, player2)
              return
 
-        print(f"Match Found: {player1.get('username', 'P1')} vs {player2.get('username', 'P2')}")
+        logger.info("Match Found: %s vs %s", player1.get('username', 'P1'), player2.get('username', 'P2'))
 
         # Update the debate in the database
         db_debate = None
@@ -221,16 +306,23 @@ async def join_matchmaking_queue(sid, data):
                 if db_debate:
                     # Update player2_id for the debate initiated by player1
                     db_debate.player2_id = int(player2['user_id'])
+                    player_ids = [int(player1['user_id']), int(player2['user_id'])]
+                    # player1's topic skipped only player1's recent topics; re-pick if player2 just had it,
+                    # from the same category so a ?category= choice survives the re-pick
+                    if topics.is_recent(db, player_ids[1], db_debate.topic):
+                        db_debate.topic = topics.pick(db, player_ids, topics.category_of(db, db_debate.topic))
+                        search.replace_document(db.connection(), "debate", db_debate.id, None, db_debate.topic)
                     db.commit()
                     db.refresh(db_debate)
+                    topics.remember(db, player_ids, db_debate.topic)
                 else:
                     matchmaking_queue.insert(0, player1)
                     matchmaking_queue.insert(0, player2)
-                    print(f"WARNING: Debate {player1.get('debate_id', 'N/A')} not found. Players re-queued.")
+                    logger.warning("Debate %s not found. Players re-queued.", player1.get('debate_id', 'N/A'))
                     return
 
         except Exception as e:
-            print(f"CRITICAL DB ERROR during matchmaking update: {e}")
+            logger.exception("DB error during matchmaking update: %s", e)
             matchmaking_queue.insert(0, player1)
             matchmaking_queue.insert(0, player2)
             return
@@ -258,11 +350,18 @@ async def join_matchmaking_queue(sid, data):
             # Join users to the Socket.IO room for the debate *after* they receive match_found
             await sio.enter_room(p1_sid, str(db_debate.id))
             await sio.enter_room(p2_sid, str(db_debate.id))
+            await debate_timer.start(
+                db_debate.id, [int(player1['user_id']), int(player2['user_id'])],
+                {int(player['user_id']): player.get('username') for player in (player1, player2)},
+            )
 
-            print(f"Matchmaking Success: Match for Debate {db_debate.id} emitted. Players joined room.")
+            logger.info("Matchmaking Success: Match for Debate %s emitted. Players joined room.", db_debate.id)
+            matched_at = time.monotonic()
+            for player in (player1, player2):
+                metrics.TIME_TO_MATCH_SECONDS.observe(matched_at - player['queued_at'])
 
         except Exception as e:
-            print(f"CRITICAL ERROR during match emit/room join: {e}")
+            logger.exception("Error during match emit/room join: %s", e)
             # Attempt to re-queue players if emit/join fails
             matchmaking_queue.insert(0, player1)
             matchmaking_queue.insert(0, player2)
@@ -271,12 +370,15 @@ async def join_matchmaking_queue(sid, data):
 @sio.event
 async def cancel_matchmaking(sid, data):
     """Removes a user from the matchmaking queue."""
-    user_id = str(data.get('userId'))
+    identity = await get_session_user(sid)
+    if identity is None:
+        return
+    user_id = identity['user_id']
     global matchmaking_queue
     original_size = len(matchmaking_queue)
     matchmaking_queue = [q for q in matchmaking_queue if q['user_id'] != user_id]
     if len(matchmaking_queue) < original_size:
-        print(f"User {user_id} removed from queue. Size: {len(matchmaking_queue)}")
+        logger.info("User %s removed from queue. Size: %d", user_id, len(matchmaking_queue))
 
 
 # --- Message Handling ---
@@ -284,72 +386,89 @@ async def cancel_matchmaking(sid, data):
 async def send_message_to_human(sid, data):
     """Handles receiving a message from a client and broadcasting it to the debate room."""
     debate_id = data.get('debateId')
-    sender_id = data.get('senderId')
     content = data.get('content')
-    sender_type = data.get('senderType', 'user')
 
-    print(f"\n--- DEBUG: send_message_to_human ---")
-    print(f"SID: {sid}")
-    print(f"Received Data: {data}")
+    logger.debug("send_message_to_human SID %s debate %s", sid, debate_id)
 
-    if not debate_id or sender_id is None or content is None:
-        print(f"ERROR send_message_to_human: Missing data.")
+    # The sender is whoever authenticated this socket; 'senderId' in the payload is ignored
+    identity = await get_session_user(sid)
+    if identity is None:
+        logger.warning("send_message_to_human: Unauthenticated SID %s.", sid)
+        await sio.emit('error', {'detail': 'Authentication required.'}, room=sid)
+        return
+
+    if not debate_id or content is None:
+        logger.warning("send_message_to_human: Missing data from SID %s.", sid)
         await sio.emit('error', {'detail': 'Missing message data.'}, room=sid)
         return
 
     try:
-        sender_id_int = int(sender_id)
-        print(f"DEBUG: Data validated.")
+        sender_id_int = int(identity['user_id'])
+        debate_id = int(debate_id)
 
         with database.SessionLocal() as db:
-            print("DEBUG: DB session opened.")
-            db_debate = db.query(models.Debate).filter(models.Debate.id == debate_id).first()
-            if not db_debate:
-                print(f"ERROR: Debate {debate_id} not found.")
-                await sio.emit('error', {'detail': 'Debate not found.'}, room=sid)
-                return
-            print(f"DEBUG: Debate {debate_id} found.")
-
-            # Authorization check
-            is_authorized = (db_debate.player1_id == sender_id_int) or \
-                            (db_debate.player2_id is not None and db_debate.player2_id == sender_id_int)
-            if not is_authorized:
-                print(f"ERROR: Sender {sender_id_int} not authorized.")
-                await sio.emit('error', {'detail': 'Not authorized.'}, room=sid)
-                return
-            print(f"DEBUG: Sender {sender_id_int} authorized.")
+            db.info["user_id"] = sender_id_int # Read-your-writes for this user's transcript reads
+            # Participation is checked once per socket and remembered in the session
+            if debate_id not in identity['debate_ids']:
+                db_debate = db.query(models.Debate).filter(models.Debate.id == debate_id).first()
+                if not db_debate:
+                    logger.warning("send_message_to_human: Debate %s not found.", debate_id)
+                    await sio.emit('error', {'detail': 'Debate not found.'}, room=sid)
+                    return
+
+                # Authorization check
+                is_authorized = (db_debate.player1_id == sender_id_int) or \
+                                (db_debate.player2_id is not None and db_debate.player2_id == sender_id_int)
+                if not is_authorized:
+                    logger.warning("send_message_to_human: Sender %s not authorized for debate %s.", sender_id_int, debate_id)
+                    await sio.emit('error', {'detail': 'Not authorized.'}, room=sid)
+                    return
+                identity['debate_ids'].add(debate_id)
 
             # Save message
             new_message_db = models.Message(
-                content=content, sender_type=sender_type,
+                content=content, sender_type='user',
                 debate_id=debate_id, sender_id=sender_id_int,
             )
             db.add(new_message_db)
             db.commit()
             db.refresh(new_message_db)
-            print(f"DEBUG: Message committed. ID: {new_message_db.id}")
 
             # Prepare message for broadcasting
             message_to_broadcast = schemas.MessageOut.from_orm(new_message_db).dict()
             if 'timestamp' in message_to_broadcast and isinstance(message_to_broadcast['timestamp'], datetime):
                 message_to_broadcast['timestamp'] = message_to_broadcast['timestamp'].isoformat()
-            print("DEBUG: Message prepared:", message_to_broadcast)
 
-            # Broadcast to the specific debate room
-            room_id = str(debate_id)
-            print(f"DEBUG: Broadcasting 'new_message' to room {room_id}...")
-            await sio.emit('new_message', message_to_broadcast, room=room_id) # <<< EMIT TO ROOM
-            print(f"DEBUG: Message broadcasted successfully.")
+            # Broadcast to the specific debate room (buffered for clients that reconnect)
+            await rooms.emit_message(debate_id, message_to_broadcast)
+            logger.debug("Message %s broadcast to room %s", new_message_db.id, debate_id)
+        await debate_timer.turn_taken(debate_id, sender_id_int)
 
     except Exception as e:
-        print(f"\n--- CRITICAL ERROR in send_message_to_human ---")
-        traceback.print_exc()
+        logger.exception("Error in send_message_to_human")
         await sio.emit('error', {'detail': f'Server error: {type(e).__name__}'}, room=sid)
 
-# --- Placeholder for end_debate ---
+# --- End of debate ---
 @sio.event
 async def end_debate(sid, data):
-     debate_id = data.get('debate_id')
-     print(f"Placeholder: Received end_debate for debate {debate_id}")
-     # TODO: Implement debate ending logic (evaluation, ELO update, etc.)
-     pass
\ No newline at end of file
+    """Stops a debate's turn clock and publishes its result. Only the debate's players may end it."""
+    debate_id = _optional_int(data.get('debate_id')) if data else None
+    logger.info("Received end_debate for debate %s", debate_id)
+    identity = await get_session_user(sid)
+    if identity is None:
+        logger.warning("end_debate: Unauthenticated SID %s.", sid)
+        await sio.emit('error', {'detail': 'Authentication required.'}, room=sid)
+        return
+    if not debate_id:
+        await sio.emit('error', {'detail': 'A numeric debate_id is required.'}, room=sid)
+        return
+    user_id = int(identity['user_id'])
+    with database.SessionLocal() as db:
+        db_debate = db.query(models.Debate).filter(models.Debate.id == debate_id).first()
+        if db_debate is None or user_id not in (db_debate.player1_id, db_debate.player2_id):
+            logger.warning("end_debate: User %s not authorized for debate %s.", user_id, debate_id)
+            await sio.emit('error', {'detail': 'Not authorized.'}, room=sid)
+            return
+        debate_timer.stop(db_debate.id)
+        # Debates that already have a recorded winner feed the badge/streak engine
+        gamification.publish_finished_debate(db, db_debate)
\ No newline at end of file
@@ -0,0 +1,252 @@
+# app/metrics.py - Minimal Prometheus-style metrics (no external dependency)
+#
+# Counters, gauges and fixed-bucket histograms kept in process memory and
+# rendered in the Prometheus text exposition format by GET /metrics.
+# Recording is a dict lookup, a bisect over the buckets and a few additions
+# under an uncontended lock, i.e. around a microsecond.
+
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Seconds; tuned for HTTP/DB work (sub-ms to seconds)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds; for slower things like LLM calls and waiting for an opponent
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+_registry: List["_Metric"] = []
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Gauge whose value is either set directly or read from a callback at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=(), function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple, float] = {}
+        self._function = function
+
+    def set(self, value: float, *label_values):
+        self._values[label_values] = value
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def dec(self, *label_values, amount: float = 1.0):
+        self.inc(*label_values, amount=-amount)
+
+    def _samples(self):
+        if self._function is not None:
+            return [f"{self.name} {float(self._function())}"]
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {} # {labels: [bucket counts..., +Inf count, sum]}
+
+    def observe(self, value: float, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *label_values):
+        return _Timer(self, label_values)
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = 'le="%s"' % ("+Inf" if bound == float("inf") else repr(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "started")
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+        return False
+
+
+def render() -> str:
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+# --- Application metrics ---
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status"))
+SOCKETIO_EVENT_SECONDS = Histogram(
+    "socketio_event_duration_seconds", "Socket.IO handler latency by event.", ("event",))
+SOCKETIO_EVENT_ERRORS = Counter(
+    "socketio_event_errors_total", "Socket.IO handlers that raised, by event.", ("event",))
+TIME_TO_MATCH_SECONDS = Histogram(
+    "matchmaking_time_to_match_seconds", "Time from joining the queue to being matched.", buckets=SLOW_BUCKETS)
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds", "LLM call latency by outcome.", ("outcome",), buckets=SLOW_BUCKETS)
+AI_TURN_STAGE_SECONDS = Histogram(
+    "ai_turn_stage_seconds", "AI debate turn pipeline time by stage.", ("stage",), buckets=SLOW_BUCKETS)
+LLM_ERRORS = Counter(
+    "llm_errors_total", "Failed LLM calls by error type.", ("error",))
+DB_POOL_CHECKOUT_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled DB connection, by operation.", ("pool", "operation"))
+
+
+# --- Operation tagging ---
+# What each task is currently handling: the ASGI scope of an HTTP request or a
+# Socket.IO event name. The context var follows the handler into threadpool
+# work; the task map lets other threads (loop monitor, profiler) look it up.
+current_operation: ContextVar = ContextVar("current_operation", default=None)
+task_operations: Dict[asyncio.Task, object] = {}
+
+
+def operation_name(operation) -> str:
+    if operation is None:
+        return "background"
+    if isinstance(operation, dict):
+        route = operation.get("route")
+        return f'{operation["method"]} {route.path if route is not None else "unmatched"}'
+    return operation
+
+
+def _enter_operation(operation):
+    task = asyncio.current_task()
+    if task is not None:
+        task_operations[task] = operation
+    return current_operation.set(operation), task
+
+
+def _exit_operation(token, task):
+    current_operation.reset(token)
+    if task is not None:
+        task_operations.pop(task, None)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route latency. Uses the matched route template to bound cardinality."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        token, task = _enter_operation(scope)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _exit_operation(token, task)
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                scope["method"], getattr(route, "path", "unmatched"), status[0],
+            )
+
+
+def instrument_socketio(sio, namespace: str = "/"):
+    """Wraps every registered Socket.IO handler to record latency and errors per event."""
+    handlers = sio.handlers.get(namespace, {})
+    for event, handler in list(handlers.items()):
+        if getattr(handler, "_instrumented", False):
+            continue
+        handlers[event] = _instrumented_handler(event, handler)
+
+
+def _instrumented_handler(event: str, handler):
+    async def wrapper(*args):
+        started = time.perf_counter()
+        token, task = _enter_operation(event)
+        try:
+            return await handler(*args)
+        except TypeError:
+            raise # python-socketio retries connect() without `auth` on TypeError
+        except Exception:
+            SOCKETIO_EVENT_ERRORS.inc(event)
+            raise
+        finally:
+            _exit_operation(token, task)
+            SOCKETIO_EVENT_SECONDS.observe(time.perf_counter() - started, event)
+
+    wrapper._instrumented = True
+    wrapper.__name__ = getattr(handler, "__name__", event)
+    return wrapper
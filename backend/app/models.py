@@ -1,9 +1,11 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, func
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Float, ForeignKey, LargeBinary, Text, Index, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 from app.database import Base
 
+AI_USER_ID = 1 # Synthetic user that plays player2 in every AI debate
+
 
 class User(Base):
     __tablename__ = "users"
@@ -13,7 +15,7 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    elo = Column(Integer, default=1000)
+    elo = Column(Integer, default=1000, index=True) # Leaderboard: ORDER BY elo DESC LIMIT n
     mind_tokens = Column(Integer, default=0)
     # Updated relationships to reflect two players in Debate
     debates_as_player1 = relationship("Debate", foreign_keys="[Debate.player1_id]", back_populates="player1_obj")
@@ -33,11 +35,43 @@ class Debate(Base):
     topic = Column(String, nullable=False)
     winner = Column(String, nullable=True) 
     timestamp = Column(DateTime, default=datetime.utcnow)
+    archived_at = Column(DateTime, nullable=True) # Set once the transcript moved to archived_transcripts (app/archive.py)
+    processed_at = Column(DateTime, nullable=True) # Set once the result was counted by app/gamification.py
 
     player1_obj = relationship("User", foreign_keys=[player1_id], back_populates="debates_as_player1")
     player2_obj = relationship("User", foreign_keys=[player2_id], back_populates="debates_as_player2")
     messages = relationship("Message", back_populates="debate")
 
+    # A user's debates: WHERE player1_id = ? OR player2_id = ? ORDER BY timestamp DESC
+    __table_args__ = (
+        Index("ix_debates_player1_id_timestamp", "player1_id", "timestamp"),
+        Index("ix_debates_player2_id_timestamp", "player2_id", "timestamp"),
+        # Archiver: WHERE archived_at IS NULL AND id > ? ORDER BY id
+        Index("ix_debates_archived_at_id", "archived_at", "id"),
+    )
+
+
+class ArchivedTranscript(Base):
+    """A finished debate's messages, compressed into one blob (see app/archive.py)."""
+    __tablename__ = "archived_transcripts"
+
+    debate_id = Column(Integer, ForeignKey("debates.id"), primary_key=True)
+    message_count = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False) # zlib-compressed JSON
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
+class Topic(Base):
+    """Debate topic catalog (see app/topics.py). Edits are picked up without a deploy."""
+    __tablename__ = "topics"
+
+    id = Column(Integer, primary_key=True, index=True)
+    text = Column(String, unique=True, nullable=False)
+    category = Column(String, nullable=False, default="general")
+    weight = Column(Float, nullable=False, default=1.0) # Relative chance of being picked
+    enabled = Column(Boolean, nullable=False, default=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 
 class Message(Base):
     __tablename__ = "messages"
@@ -52,6 +86,9 @@ class Message(Base):
     debate = relationship("Debate", back_populates="messages")
     sender_obj = relationship("User", back_populates="messages")
 
+    # Transcripts: WHERE debate_id = ? ORDER BY timestamp
+    __table_args__ = (Index("ix_messages_debate_id_timestamp", "debate_id", "timestamp"),)
+
 class Badge(Base):
     __tablename__ = "badges"
 
@@ -66,13 +103,19 @@ class UserBadge(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     badge_id = Column(Integer, ForeignKey("badges.id"), nullable=False)
 
+    # A badge is awarded at most once per user
+    __table_args__ = (Index("ix_user_badges_user_id_badge_id", "user_id", "badge_id", unique=True),)
+
 class Streak(Base):
     __tablename__ = "streaks"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     current_streak = Column(Integer, default=0)
     max_streak = Column(Integer, default=0)
+    # Running totals maintained by app.gamification for badge rules
+    debates_played = Column(Integer, default=0)
+    debates_won = Column(Integer, default=0)
 
 class Forum(Base):
     __tablename__ = "forums"
@@ -88,6 +131,10 @@ class Thread(Base):
     title = Column(String, index=True, nullable=False)
     forum_id = Column(Integer, ForeignKey("forums.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Serves keyset pagination: WHERE forum_id = ? AND id > ? ORDER BY id
+    __table_args__ = (Index("ix_threads_forum_id_id", "forum_id", "id"),)
 
 class Post(Base):
     __tablename__ = "posts"
@@ -95,4 +142,25 @@ class Post(Base):
     id = Column(Integer, primary_key=True, index=True)
     content = Column(Text, nullable=False)
     thread_id = Column(Integer, ForeignKey("threads.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
\ No newline at end of file
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Serves keyset pagination: WHERE thread_id = ? AND id > ? ORDER BY id
+    __table_args__ = (Index("ix_posts_thread_id_id", "thread_id", "id"),)
+
+class TokenTransaction(Base):
+    """Append-only ledger of mind-token balance changes (positive = credit, negative = debit)."""
+    __tablename__ = "token_transactions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    amount = Column(Integer, nullable=False)
+    reason = Column(String, nullable=False)
+    debate_id = Column(Integer, ForeignKey("debates.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_token_transactions_user_id_id", "user_id", "id"),
+        # Debate credits already paid (tokens.credit_batch) and the reaper's NOT EXISTS
+        Index("ix_token_transactions_debate_id_user_id_reason", "debate_id", "user_id", "reason"),
+    )
@@ -0,0 +1,119 @@
+# app/profiler.py - On-demand statistical sampler for the live worker
+#
+# Nothing runs until a profile is requested: a sampler thread then wakes up
+# `hz` times per second for `seconds`, reads every thread's current frame via
+# sys._current_frames() and counts the stacks. Output is the collapsed-stack
+# format ("root;...;leaf count") understood by flamegraph.pl and speedscope.
+#   - Samples from the event-loop thread are rooted at the route or Socket.IO
+#     event the running task is handling (see metrics.task_operations).
+#   - Threadpool samples are rooted at the thread name; the endpoint function
+#     appears in the stack itself.
+#   - With include_tasks, suspended asyncio tasks are sampled too, rooted at
+#     "[await]", showing where each one is waiting (LLM calls, sleeps, ...).
+
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from app import metrics
+
+MAX_SECONDS = 60
+MAX_DEPTH = 64
+
+_lock = threading.Lock() # One profile at a time per worker
+
+# Leaf frames that mean "this thread is parked", skipped unless include_idle
+_IDLE_LEAVES = {
+    ("selectors", "select"),
+    ("threading", "wait"),
+    ("threading", "_wait_for_tstate_lock"),
+    ("queue", "get"),
+    ("concurrent.futures.thread", "_worker"),
+}
+
+
+def _frame_label(frame) -> str:
+    return f'{frame.f_globals.get("__name__", "?")}:{frame.f_code.co_name}'
+
+
+def _stack(frame) -> list:
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def _is_idle(frame) -> bool:
+    return (frame.f_globals.get("__name__"), frame.f_code.co_name) in _IDLE_LEAVES
+
+
+def _task_stack(task) -> Optional[list]:
+    # Follow the coroutine's await chain down to where it is suspended
+    labels = []
+    coro = task.get_coro()
+    while coro is not None and len(labels) < MAX_DEPTH:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        labels.append(_frame_label(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return labels or None
+
+
+def sample(loop, loop_thread_id: int, seconds: float, hz: int,
+           include_tasks: bool = False, include_idle: bool = False) -> dict:
+    """Samples all threads (and optionally all tasks) for `seconds`. Blocking; run it off the loop."""
+    if not _lock.acquire(blocking=False):
+        raise RuntimeError("A profile is already running")
+    try:
+        own_thread = threading.get_ident()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        interval = 1.0 / hz
+        stacks: Counter = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+
+        while time.monotonic() < deadline:
+            tick = time.monotonic()
+            running_task = asyncio.current_task(loop)
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread or (not include_idle and _is_idle(frame)):
+                    continue
+                if thread_id == loop_thread_id:
+                    root = metrics.operation_name(metrics.task_operations.get(running_task))
+                else:
+                    name = thread_names.get(thread_id)
+                    if name is None:
+                        thread_names.update((thread.ident, thread.name) for thread in threading.enumerate())
+                        name = thread_names.get(thread_id, str(thread_id))
+                    root = f"[thread {name}]"
+                stacks[";".join([root] + _stack(frame))] += 1
+
+            if include_tasks:
+                try:
+                    tasks = list(asyncio.all_tasks(loop))
+                except RuntimeError: # Task set changed while copying; skip this tick
+                    tasks = []
+                for task in tasks:
+                    if task is running_task or task.done():
+                        continue
+                    task_stack = _task_stack(task)
+                    if task_stack:
+                        operation = metrics.operation_name(metrics.task_operations.get(task))
+                        stacks[";".join(["[await]", operation] + task_stack)] += 1
+
+            samples += 1
+            time.sleep(max(0.0, interval - (time.monotonic() - tick)))
+
+        return {"samples": samples, "stacks": stacks}
+    finally:
+        _lock.release()
+
+
+def collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
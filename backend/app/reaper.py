@@ -0,0 +1,105 @@
+# app/reaper.py - Deletes orphaned matchmaking debates
+#
+# POST /debate/start-human inserts a debate with player2_id NULL when a search
+# starts; matchmaking fills player2_id when an opponent is found. Searches that
+# are cancelled or abandoned leave that row behind. A background job deletes
+# such debates - no opponent, no messages (hot or archived), no token
+# transactions, not in the matchmaking queue, older than
+# ORPHAN_DEBATE_TTL_SECONDS - in batches of ORPHAN_REAP_BATCH rows, one short
+# transaction per batch, and removes their search index rows. The DELETE
+# re-checks every condition, since a debate can be matched, reused or written
+# to after it was selected. Reclaimed rows are logged and counted in
+# orphan_debates_reaped_total.
+#
+# Run a single sweep by hand with:  python -m app.reaper
+#
+# Environment:
+#   ORPHAN_DEBATE_TTL_SECONDS   age after which an unmatched debate is deleted (default 3600)
+#   ORPHAN_REAP_SECONDS         interval between sweeps (default 600)
+#   ORPHAN_REAP_BATCH           debates deleted per transaction (default 500)
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, exists
+from sqlalchemy.orm import Session
+
+from app import database, metrics, models, search
+
+logger = logging.getLogger(__name__)
+
+TTL_SECONDS = float(os.getenv("ORPHAN_DEBATE_TTL_SECONDS", "3600"))
+REAP_SECONDS = float(os.getenv("ORPHAN_REAP_SECONDS", "600"))
+BATCH_SIZE = int(os.getenv("ORPHAN_REAP_BATCH", "500"))
+
+REAPED = metrics.Counter("orphan_debates_reaped_total", "Unmatched debates deleted by the reaper.")
+
+
+def orphaned(query, cutoff: datetime):
+    """Restricts a Debate query or DELETE to unmatched debates with nothing attached, created before `cutoff`."""
+    return query.filter(
+        models.Debate.player2_id.is_(None),
+        models.Debate.timestamp < cutoff,
+        ~exists().where(models.Message.debate_id == models.Debate.id),
+        ~exists().where(models.TokenTransaction.debate_id == models.Debate.id),
+        ~exists().where(models.ArchivedTranscript.debate_id == models.Debate.id),
+    )
+
+
+def _queued_debate_ids() -> set:
+    from app import matchmaking # Deferred: matchmaking pulls in the Socket.IO handlers
+    return {int(entry['debate_id']) for entry in matchmaking.matchmaking_queue}
+
+
+def _not_queued(statement):
+    queued = _queued_debate_ids()
+    return statement.filter(models.Debate.id.notin_(queued)) if queued else statement
+
+
+def reap_batch(db: Session, cutoff: datetime, limit: int = BATCH_SIZE) -> Tuple[int, int]:
+    """Deletes up to `limit` orphaned debates in one transaction. Returns (selected, deleted).
+
+    Debates that stop being orphaned between the SELECT and the DELETE are left
+    alone, so `deleted` can be less than `selected`.
+    """
+    query = _not_queued(orphaned(db.query(models.Debate.id), cutoff))
+    ids = [debate_id for (debate_id,) in query.order_by(models.Debate.id).limit(limit)]
+    if not ids:
+        return 0, 0
+    statement = _not_queued(orphaned(delete(models.Debate), cutoff)).where(models.Debate.id.in_(ids))
+    deleted = [debate_id for (debate_id,) in db.execute(statement.returning(models.Debate.id))]
+    search.remove_documents(db.connection(), "debate", deleted)
+    db.commit()
+    return len(ids), len(deleted)
+
+
+def reap(cutoff: Optional[datetime] = None, limit: int = BATCH_SIZE) -> int:
+    """Deletes every orphaned debate older than `cutoff` (default: TTL ago), batch by batch."""
+    cutoff = cutoff or datetime.utcnow() - timedelta(seconds=TTL_SECONDS)
+    total = 0
+    with database.SessionLocal() as db:
+        while True:
+            selected, reaped = reap_batch(db, cutoff, limit)
+            total += reaped
+            REAPED.inc(amount=reaped)
+            if selected < limit: # A short SELECT is the last batch; a short DELETE is not
+                return total
+
+
+async def run_reaper():
+    """Background loop: reaps orphaned debates every REAP_SECONDS."""
+    while True:
+        await asyncio.sleep(REAP_SECONDS)
+        try:
+            reaped = await asyncio.to_thread(reap)
+            if reaped:
+                logger.info("Reaped %d orphaned matchmaking debates.", reaped)
+        except Exception:
+            logger.exception("Orphaned debate reaper failed")
+
+
+if __name__ == "__main__":
+    print(f"Reaped {reap()} orphaned matchmaking debates.")
@@ -0,0 +1,261 @@
+# app/rooms.py - Debate room fan-out: replay buffers and batched spectator delivery
+#
+# Every new_message sent to a debate room goes through emit_message(), which
+# stamps it with a per-room sequence number ("seq") and keeps the last
+# ROOM_REPLAY_SIZE payloads in memory. A client that reconnects passes the
+# last seq it saw to join_debate_room and receives only the messages it missed,
+# without a DB read. If the gap is older than the buffer (or the buffer is
+# gone) the join ack says complete=False and the client refetches
+# GET /debate/{id}/messages instead.
+#
+# Sequence numbers start at the buffer's creation time in milliseconds, so a
+# buffer recreated after eviction or a restart never reuses a seq a client
+# has already seen.
+#
+# Spectators join a separate "spectate:<debate id>" room. They do not get a
+# new_message per message: messages are collected per debate and sent as one
+# message_batch event every SPECTATOR_BATCH_MS, so a popular debate costs one
+# encode and one emit per interval however fast the players type. Spectator
+# counts are tracked as integers (never by listing the room) and broadcast as
+# spectator_count in the same flush when they change. A spectator whose
+# outgoing Engine.IO queue is longer than SPECTATOR_MAX_BACKLOG packets is
+# disconnected rather than buffered for; it can reconnect and catch up with lastSeq.
+# The queue length is read from python-engineio internals (see _backlog).
+#
+# Environment:
+#   ROOM_REPLAY_SIZE          messages kept per room (default 200)
+#   ROOM_IDLE_SECONDS         rooms without a message for this long are dropped (default 1800)
+#   ROOM_REPLAY_MAX_ROOMS     upper bound on buffered rooms; least recently active go first (default 10000)
+#   SPECTATOR_BATCH_MS        spectator flush interval (default 500)
+#   SPECTATOR_MAX_BACKLOG     queued packets after which a spectator is dropped (default 50)
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from app import metrics
+from app.socketio_instance import sio
+
+logger = logging.getLogger(__name__)
+
+REPLAY_SIZE = int(os.getenv("ROOM_REPLAY_SIZE", "200"))
+IDLE_SECONDS = float(os.getenv("ROOM_IDLE_SECONDS", "1800"))
+MAX_ROOMS = int(os.getenv("ROOM_REPLAY_MAX_ROOMS", "10000"))
+SWEEP_SECONDS = 60
+SPECTATOR_BATCH_SECONDS = float(os.getenv("SPECTATOR_BATCH_MS", "500")) / 1000
+SPECTATOR_MAX_BACKLOG = int(os.getenv("SPECTATOR_MAX_BACKLOG", "50"))
+
+REPLAYS = metrics.Counter(
+    "room_replays_total", "Reconnect replays served by join_debate_room, by result.", ("result",))
+SPECTATOR_DROPS = metrics.Counter(
+    "spectator_drops_total", "Spectators disconnected for falling too far behind.")
+SPECTATOR_BATCH_SIZE = metrics.Histogram(
+    "spectator_batch_messages", "Messages per spectator message_batch.", buckets=(1, 2, 5, 10, 20, 50, 100))
+
+
+class ReplayBuffer:
+    """The last `size` messages of one room, each tagged with its seq."""
+
+    __slots__ = ("messages", "next_seq", "last_active")
+
+    def __init__(self, size: int):
+        self.messages = deque(maxlen=size)
+        self.next_seq = int(time.time() * 1000)
+        self.last_active = time.monotonic()
+
+    @property
+    def last_seq(self) -> int:
+        return self.next_seq - 1
+
+    def append(self, payload: dict) -> dict:
+        stamped = {**payload, "seq": self.next_seq}
+        self.next_seq += 1
+        self.messages.append(stamped)
+        self.last_active = time.monotonic()
+        return stamped
+
+    def since(self, last_seq: int) -> Optional[list]:
+        """Messages after `last_seq`, or None if some of them are no longer buffered."""
+        if last_seq >= self.last_seq:
+            return [] if last_seq == self.last_seq else None # Ahead of us: seq from an older buffer
+        first_seq = self.messages[0]["seq"] if self.messages else self.next_seq
+        if last_seq < first_seq - 1:
+            return None
+        return list(self.messages)[last_seq - first_seq + 1:]
+
+
+# {debate id: ReplayBuffer}, least recently active first
+_buffers: "OrderedDict[str, ReplayBuffer]" = OrderedDict()
+
+metrics.Gauge("room_replay_buffers", "Debate rooms with a replay buffer in memory.", function=lambda: len(_buffers))
+
+
+async def emit_message(debate_id, payload: dict) -> dict:
+    """Stamps `payload` with the room's next seq, buffers it and emits it as new_message to the room."""
+    room_id = str(debate_id)
+    buffer = _buffers.get(room_id)
+    if buffer is None:
+        buffer = _buffers[room_id] = ReplayBuffer(REPLAY_SIZE)
+        while len(_buffers) > MAX_ROOMS:
+            _buffers.popitem(last=False)
+    else:
+        _buffers.move_to_end(room_id)
+    stamped = buffer.append(payload)
+    if _spectator_counts.get(room_id):
+        _pending_batches.setdefault(room_id, []).append(stamped)
+    await sio.emit('new_message', stamped, room=room_id)
+    return stamped
+
+
+def missed_messages(debate_id, last_seq: Optional[int]) -> Tuple[list, bool, Optional[int]]:
+    """Returns (messages after last_seq, complete, room's latest seq) for a rejoining client."""
+    buffer = _buffers.get(str(debate_id))
+    latest = buffer.last_seq if buffer is not None and buffer.messages else None
+    if last_seq is None:
+        return [], True, latest
+    missed = buffer.since(last_seq) if buffer is not None else None
+    if missed is None:
+        REPLAYS.inc("gap")
+        return [], False, latest
+    REPLAYS.inc("complete")
+    return missed, True, latest
+
+
+def evict_idle(now: Optional[float] = None) -> int:
+    """Drops buffers of rooms that have been quiet for IDLE_SECONDS."""
+    cutoff = (time.monotonic() if now is None else now) - IDLE_SECONDS
+    evicted = 0
+    while _buffers:
+        room_id, buffer = next(iter(_buffers.items()))
+        if buffer.last_active > cutoff:
+            break
+        del _buffers[room_id]
+        evicted += 1
+    return evicted
+
+
+async def run_evictor():
+    """Background loop: evicts idle room buffers every SWEEP_SECONDS."""
+    while True:
+        await asyncio.sleep(SWEEP_SECONDS)
+        evicted = evict_idle()
+        if evicted:
+            logger.debug("Evicted %d idle room buffers; %d remain.", evicted, len(_buffers))
+
+
+# --- Spectators ---
+
+_spectator_counts: Dict[str, int] = {} # {debate id: spectators}
+_spectating: Dict[str, Set[str]] = {} # {sid: debate ids it spectates}
+_pending_batches: Dict[str, List[dict]] = {} # {debate id: messages not yet sent to spectators}
+_counts_changed: Set[str] = set()
+_backlog_unavailable = False # Set once if Engine.IO send queues cannot be read
+
+metrics.Gauge("spectators", "Sockets currently spectating a debate.", function=lambda: sum(_spectator_counts.values()))
+
+
+def spectate_room(debate_id) -> str:
+    return f"spectate:{debate_id}"
+
+
+def spectator_count(debate_id) -> int:
+    return _spectator_counts.get(str(debate_id), 0)
+
+
+async def add_spectator(sid: str, debate_id, last_seq: Optional[int] = None) -> dict:
+    """Adds `sid` to the debate's spectator room and sends it what it missed since `last_seq`."""
+    room_id = str(debate_id)
+    rooms = _spectating.setdefault(sid, set())
+    if room_id not in rooms:
+        await sio.enter_room(sid, spectate_room(room_id))
+        rooms.add(room_id)
+        _spectator_counts[room_id] = _spectator_counts.get(room_id, 0) + 1
+        _counts_changed.add(room_id)
+    missed, complete, latest = missed_messages(room_id, last_seq)
+    if missed:
+        await sio.emit('message_batch', {'debate_id': int(room_id), 'messages': missed}, room=sid)
+    return {'seq': latest, 'replayed': len(missed), 'complete': complete, 'spectators': _spectator_counts[room_id]}
+
+
+async def remove_spectator(sid: str, debate_id, leave_room: bool = True):
+    room_id = str(debate_id)
+    rooms = _spectating.get(sid)
+    if not rooms or room_id not in rooms:
+        return
+    rooms.discard(room_id)
+    if not rooms:
+        del _spectating[sid]
+    if leave_room:
+        await sio.leave_room(sid, spectate_room(room_id))
+    remaining = _spectator_counts.get(room_id, 1) - 1
+    if remaining > 0:
+        _spectator_counts[room_id] = remaining
+    else:
+        _spectator_counts.pop(room_id, None)
+        _pending_batches.pop(room_id, None)
+    _counts_changed.add(room_id)
+
+
+async def spectator_disconnected(sid: str):
+    """Forgets every room `sid` spectated; Socket.IO has already removed it from the rooms."""
+    for room_id in list(_spectating.get(sid, ())):
+        await remove_spectator(sid, room_id, leave_room=False)
+
+
+def _backlog(eio_sid) -> int:
+    """Packets queued for one Engine.IO connection, or 0 if that cannot be read.
+
+    python-engineio has no public API for this, so it reads the server's
+    `sockets` map and each socket's `queue`, as of the python-engineio version
+    pinned in requirements.txt. If a later release moves them, slow spectators
+    are simply not dropped (and a warning is logged once) instead of the flush
+    failing.
+    """
+    global _backlog_unavailable
+    try:
+        socket = sio.eio.sockets.get(eio_sid)
+        return socket.queue.qsize() if socket is not None else 0
+    except (AttributeError, TypeError):
+        if not _backlog_unavailable:
+            _backlog_unavailable = True
+            logger.warning("Cannot read Engine.IO send queues; slow spectators will not be dropped.")
+        return 0
+
+
+async def _drop_slow_spectators(room_id: str):
+    slow = [sid for sid, eio_sid in sio.manager.get_participants('/', spectate_room(room_id))
+            if _backlog(eio_sid) > SPECTATOR_MAX_BACKLOG]
+    for sid in slow:
+        SPECTATOR_DROPS.inc()
+        logger.info("Dropping slow spectator %s of debate %s (backlog over %d packets).", sid, room_id, SPECTATOR_MAX_BACKLOG)
+        await sio.disconnect(sid)
+
+
+async def flush_spectators():
+    """Sends each debate's pending messages as one message_batch, plus changed spectator counts."""
+    batches = dict(_pending_batches)
+    _pending_batches.clear()
+    changed = set(_counts_changed)
+    _counts_changed.clear()
+
+    for room_id, messages in batches.items():
+        await _drop_slow_spectators(room_id)
+        SPECTATOR_BATCH_SIZE.observe(len(messages))
+        await sio.emit('message_batch', {'debate_id': int(room_id), 'messages': messages}, room=spectate_room(room_id))
+    for room_id in changed:
+        count = {'debate_id': int(room_id), 'count': _spectator_counts.get(room_id, 0)}
+        await sio.emit('spectator_count', count, room=room_id)
+        await sio.emit('spectator_count', count, room=spectate_room(room_id))
+
+
+async def run_spectator_flusher():
+    """Background loop: flushes spectator batches every SPECTATOR_BATCH_SECONDS."""
+    while True:
+        await asyncio.sleep(SPECTATOR_BATCH_SECONDS)
+        try:
+            await flush_spectators()
+        except Exception:
+            logger.exception("Spectator flush failed")
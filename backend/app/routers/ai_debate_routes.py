@@ -2,56 +2,48 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session, joinedload
-from app import database, models, schemas, auth
+from app import database, models, schemas, auth, rooms, debate_timer, topics, metrics
 from app.ai import get_ai_response
-from app.socketio_instance import sio
 from datetime import datetime
-import traceback
-import random # Import the random module
+import asyncio
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/ai-debate",
     tags=["AI Debate"]
 )
 
-AI_USER_ID = 1
-
-# --- List of Debate Topics (Copied from debate.py for consistency) ---
-DEBATE_TOPICS = [
-    "Should social media platforms censor content?",
-    "Is universal basic income a viable solution to poverty?",
-    "Should animal testing be banned completely?",
-    "Is artificial intelligence more beneficial or harmful to humanity?",
-    "Should college education be free for everyone?",
-    "Is climate change primarily caused by human activity?",
-    "Should voting be mandatory in democratic countries?",
-    "Is homework beneficial for students?",
-    "Should plastic production be significantly reduced?",
-    "Does technology make people more isolated?",
-    "Should genetically modified foods be labeled?",
-    "Is space exploration worth the investment?"
-]
+AI_USER_ID = models.AI_USER_ID
 
 # --- Endpoint to START an AI Debate (Uses Random Topic) ---
 @router.post("/start", response_model=schemas.DebateOut)
 async def start_ai_debate_route(
     # REMOVED: topic_data: schemas.TopicSchema,
+    category: Optional[str] = None,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
     """Creates a new AI Debate entry with a random topic."""
-    print(f"\n--- DEBUG: AI Route /ai-debate/start ---")
-    print(f"Request from User ID {current_user.id}")
+    logger.debug("/ai-debate/start from user %s", current_user.id)
+    # --- Select a random topic ---
+    try:
+        selected_topic = topics.pick(db, [current_user.id], category)
+    except ValueError as e: # Unknown or empty category
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except RuntimeError as e: # Empty catalog
+        logger.error("/ai-debate/start: %s", e)
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="No debate topics are available right now.")
+    # --- End topic selection ---
+
     try:
         ai_user = db.query(models.User).filter(models.User.id == AI_USER_ID).first()
         if not ai_user:
             raise HTTPException(status_code=500, detail="AI opponent configuration error.")
 
-        # --- Select a random topic ---
-        selected_topic = random.choice(DEBATE_TOPICS)
-        print(f"DEBUG start_ai: Selected topic: {selected_topic}")
-        # --- End topic selection ---
-
         db_debate = models.Debate(
             player1_id=current_user.id,
             player2_id=AI_USER_ID,
@@ -60,16 +52,47 @@ async def start_ai_debate_route(
         db.add(db_debate)
         db.commit()
         db.refresh(db_debate)
-        print(f"DEBUG: AI Debate created successfully. ID: {db_debate.id}")
+        topics.remember(db, [current_user.id], selected_topic)
+        logger.info("AI debate %s created for user %s (topic: %s)", db_debate.id, current_user.id, selected_topic)
+        await debate_timer.start(db_debate.id, [current_user.id], {current_user.id: current_user.username}, ai=True)
         return db_debate
     except Exception as e:
         db.rollback()
-        print(f"\n--- CRITICAL ERROR in /ai-debate/start ---")
-        traceback.print_exc()
+        logger.exception("Error in /ai-debate/start")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to start AI debate.")
 
 
-# --- Endpoint to handle messages DURING an AI Debate (Unchanged) ---
+# --- AI turn pipeline ---
+# The LLM call starts as soon as the request is validated. The user's message
+# is written (in a worker thread) and emitted while the model is generating,
+# and the reply is written in its own short transaction afterwards. The
+# request's session is closed before anything is awaited, so no pooled
+# connection sits idle during generation. Stage timings go to
+# ai_turn_stage_seconds; "generate" overlaps "persist_user" and "emit_user".
+
+def _save_message(debate_id: int, content: str, sender_type: str, sender_id: int, user_id: int) -> dict:
+    """Writes one message in its own transaction and returns it serialized for emitting."""
+    with database.SessionLocal() as db:
+        db.info["user_id"] = user_id # Read-your-writes for this user's transcript reads
+        db_message = models.Message(content=content, sender_type=sender_type, debate_id=debate_id, sender_id=sender_id)
+        db.add(db_message)
+        db.commit()
+        db.refresh(db_message)
+        message_data = schemas.MessageOut.from_orm(db_message).dict()
+    if isinstance(message_data.get('timestamp'), datetime):
+        message_data['timestamp'] = message_data['timestamp'].isoformat()
+    return message_data
+
+
+async def _timed(stage: str, awaitable):
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        metrics.AI_TURN_STAGE_SECONDS.observe(time.perf_counter() - started, stage)
+
+
+# --- Endpoint to handle messages DURING an AI Debate ---
 @router.post("/{debate_id}/{topic}", response_model=schemas.MessageOut)
 async def create_ai_message_route(
     debate_id: int,
@@ -78,71 +101,50 @@ async def create_ai_message_route(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    # ... (Your existing logic for handling AI messages remains the same) ...
-    # Ensure it uses debate_obj.topic instead of the 'topic' from URL if possible
-    print(f"\n--- DEBUG: AI Route /ai-debate/{debate_id}/messages ---")
-    print(f"Received message from User ID {current_user.id}: {message.content[:50]}...")
-    room_id = str(debate_id)
+    logger.debug("AI debate %s: message from user %s", debate_id, current_user.id)
+    started = time.perf_counter()
+    reply = None
 
     try:
-        debate_obj = db.query(models.Debate).filter(models.Debate.id == debate_id).first()
+        debate_obj = db.query(models.Debate.player1_id, models.Debate.topic).filter(models.Debate.id == debate_id).first()
         if not debate_obj: raise HTTPException(status_code=404, detail="Debate not found.")
-        # Use the topic from the database object for consistency
-        actual_topic = debate_obj.topic
         if current_user.id != debate_obj.player1_id: raise HTTPException(status_code=403, detail="Not authorized.")
+        db.close() # Nothing below uses the request session; the writes take their own short ones
+        metrics.AI_TURN_STAGE_SECONDS.observe(time.perf_counter() - started, "validate")
 
-        # 1. Save User's Message
-        user_message = models.Message(
-            content=message.content, sender_type='user',
-            debate_id=debate_id, sender_id=current_user.id,
-        )
-        db.add(user_message)
-        db.commit()
-        db.refresh(user_message)
-        print(f"DEBUG: User message saved. ID: {user_message.id}")
+        # 1. Start generating (using the topic from the DB, not the URL)
+        ai_prompt = f"Debate topic: '{debate_obj.topic}'. User '{current_user.username}' said: '{message.content}'. Respond concisely (max 2 sentences) as the opponent."
+        reply = asyncio.create_task(_timed("generate", get_ai_response(ai_prompt)))
 
-        # Emit user message back
+        # 2. Save and emit the user's message while the model works
+        user_message_data = await _timed("persist_user", asyncio.to_thread(
+            _save_message, debate_id, message.content, 'user', current_user.id, current_user.id))
         try:
-            user_message_data = schemas.MessageOut.from_orm(user_message).dict()
-            if 'timestamp' in user_message_data and isinstance(user_message_data['timestamp'], datetime):
-                user_message_data['timestamp'] = user_message_data['timestamp'].isoformat()
-            await sio.emit('new_message', user_message_data, room=room_id)
-            print(f"DEBUG: Emitted user's message back to room {room_id}.")
+            await _timed("emit_user", rooms.emit_message(debate_id, user_message_data))
         except Exception as emit_err:
-             print(f"ERROR: Failed to emit user message: {emit_err}")
-
-        # 2. Get AI Response (using actual_topic from DB)
-        ai_prompt = f"Debate topic: '{actual_topic}'. User '{current_user.username}' said: '{message.content}'. Respond concisely (max 2 sentences) as the opponent."
-        print("DEBUG: Calling AI...")
-        ai_content = await get_ai_response(ai_prompt)
-        print(f"DEBUG: AI response received: {ai_content[:50]}...")
-        if not ai_content: ai_content = "(AI had no response)"
-
-        # 3. Save AI's Message
-        ai_message = models.Message(
-            content=ai_content, debate_id=debate_id,
-            sender_type='ai', sender_id=AI_USER_ID,
-        )
-        db.add(ai_message)
-        db.commit()
-        db.refresh(ai_message)
-        print(f"DEBUG: AI message saved. ID: {ai_message.id}")
-
-        # 4. Prepare and Emit AI's Message
-        print("DEBUG: Preparing AI message for broadcast...")
-        ai_message_data = schemas.MessageOut.from_orm(ai_message).dict()
-        if 'timestamp' in ai_message_data and isinstance(ai_message_data['timestamp'], datetime):
-            ai_message_data['timestamp'] = ai_message_data['timestamp'].isoformat()
-        print(f"DEBUG: Emitting 'new_message' (AI response) to room {room_id}...")
-        await sio.emit('new_message', ai_message_data, room=room_id)
-        print(f"DEBUG: AI message emitted successfully.")
+             logger.error("Failed to emit user message: %s", emit_err)
+        await debate_timer.turn_taken(debate_id, current_user.id)
 
-        return ai_message
+        # 3. Save and emit the AI's reply. The user's turn is already saved, so a
+        # failed generation gets the fallback reply rather than a 500.
+        try:
+            ai_content = await reply
+        except Exception:
+            logger.exception("AI reply failed for debate %s", debate_id)
+            ai_content = None
+        ai_content = ai_content or "(AI had no response)"
+        ai_message_data = await _timed("persist_ai", asyncio.to_thread(
+            _save_message, debate_id, ai_content, 'ai', AI_USER_ID, current_user.id))
+        await _timed("emit_ai", rooms.emit_message(debate_id, ai_message_data))
+        logger.debug("AI debate %s: reply %s emitted", debate_id, ai_message_data['id'])
+        metrics.AI_TURN_STAGE_SECONDS.observe(time.perf_counter() - started, "total")
+
+        return ai_message_data
 
     except HTTPException as http_exc:
          raise http_exc
     except Exception as e:
-        db.rollback()
-        print(f"\n--- CRITICAL ERROR in AI Message Route for debate {debate_id} ---")
-        traceback.print_exc()
+        if reply is not None:
+            reply.cancel() # No-op if it finished; otherwise nothing will save its result
+        logger.exception("Error in AI message route for debate %s", debate_id)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Server error: {type(e).__name__}")
\ No newline at end of file
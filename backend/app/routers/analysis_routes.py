@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session, joinedload
 # FIX: Changed relative imports to Gunicorn-safe absolute imports
-from app import database, models, schemas, auth 
+from app import database, models, schemas, auth, archive
 from app.ai import get_ai_response # Assuming app.ai is the module path
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/analysis",
@@ -15,7 +18,7 @@ async def get_analysis(
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(auth.get_current_user)
 ):
-    print(f"Analysis requested for debate {debate_id} by user {current_user.username} (ID: {current_user.id})")
+    logger.info("Analysis requested for debate %s by user %s", debate_id, current_user.id)
 
     debate_obj = db.query(models.Debate).filter(
         models.Debate.id == debate_id
@@ -34,10 +37,18 @@ async def get_analysis(
         models.Message.debate_id == debate_id
     ).order_by(models.Message.timestamp).all()
 
-    if not messages:
+    archived = archive.archived_messages(db, debate_id) if debate_obj.archived_at is not None else ()
+
+    if not messages and not archived:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No messages found for this debate to analyze.")
 
     debate_transcript_lines = []
+    if archived: # Archived messages precede any hot ones
+        sender_ids = {message["sender_id"] for message in archived if message["sender_type"] == 'user'}
+        usernames = dict(db.query(models.User.id, models.User.username).filter(models.User.id.in_(sender_ids)))
+        for message in archived:
+            sender_display_name = usernames.get(message["sender_id"], "AI") if message["sender_type"] == 'user' else "AI"
+            debate_transcript_lines.append(f"{sender_display_name}: {message['content']}")
     for message in messages:
         sender_display_name = "AI"
         if message.sender_type == 'user' and message.sender_obj:
@@ -58,6 +69,7 @@ async def get_analysis(
     )
     # --- End Updated Prompt ---
 
+    db.close() # Everything needed is loaded; don't hold a pooled connection during the LLM call
     analysis_content = await get_ai_response(prompt)
 
     # NOTE: Schemas.Analysis assumes the return structure is {'analysis': string}
@@ -28,8 +28,9 @@ def login_for_access_token(
         )
     
     # Create token that expires in 1440 minutes (24 hours)
+    # "uid" lets get_current_user resolve the user by primary key
     access_token = auth.create_access_token(
-        data={"sub": user.email}, expires_delta=None
+        data={"sub": user.email, "uid": user.id}, expires_delta=None
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
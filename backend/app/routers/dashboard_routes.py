@@ -11,7 +11,7 @@ router = APIRouter(
 
 # ----------------- GET USER STATS -----------------
 @router.get("/stats", response_model=schemas.UserStats)
-def get_user_stats(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+def get_user_stats(db: Session = Depends(database.get_read_db), current_user: models.User = Depends(auth.get_current_user)):
     # Corrected query to count debates where the user was either player1 or player2
     debates_competed = db.query(models.Debate).filter(
         or_(models.Debate.player1_id == current_user.id, models.Debate.player2_id == current_user.id)
@@ -47,7 +47,7 @@ def get_user_stats(db: Session = Depends(database.get_db), current_user: models.
 # ----------------- GET USER HISTORY -----------------
 # This will return a list of dictionaries with opponent username included
 @router.get("/history", response_model=list[schemas.DebateHistory])
-def get_user_history(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+def get_user_history(db: Session = Depends(database.get_read_db), current_user: models.User = Depends(auth.get_current_user)):
     # Corrected query to fetch debates the user participated in
     debates_history = (
         db.query(models.Debate)
@@ -57,22 +57,25 @@ def get_user_history(db: Session = Depends(database.get_db), current_user: model
         .all()
     )
 
+    # Opponent usernames in one query instead of one per debate
+    opponent_ids = {
+        debate.player1_id if debate.player2_id == current_user.id else debate.player2_id
+        for debate in debates_history
+    }
+    opponent_ids.discard(None)
+    usernames = dict(
+        db.query(models.User.id, models.User.username).filter(models.User.id.in_(opponent_ids))
+    ) if opponent_ids else {}
+
     history_list = []
     for debate in debates_history:
         # Determine the opponent's ID
         opponent_id = debate.player1_id if debate.player2_id == current_user.id else debate.player2_id
 
-        # Fetch opponent's username, defaulting to "AI Bot" if needed
-        opponent_username = "AI Bot"
-        if opponent_id != 0: # Assuming AI has ID 0
-            opponent = db.query(models.User).filter(models.User.id == opponent_id).first()
-            if opponent:
-                opponent_username = opponent.username
-        
         history_list.append({
             "id": debate.id,
             "topic": debate.topic,
-            "opponent_username": opponent_username,
+            "opponent_username": usernames.get(opponent_id, "AI Bot"), # Unknown or no opponent shows as "AI Bot"
             "winner": debate.winner,
             "date": debate.timestamp.isoformat(), # Return as ISO format string
         })
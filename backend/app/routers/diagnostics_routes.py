@@ -0,0 +1,42 @@
+import asyncio
+import threading
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from .. import database, models, auth, loop_monitor, profiler
+
+router = APIRouter(
+    prefix="/diagnostics",
+    tags=["Diagnostics"]
+)
+
+@router.get("/loop-stalls")
+def get_loop_stalls(current_admin: models.User = Depends(auth.get_current_admin)):
+    """Most recent event-loop stalls, newest first, with the blocking stack and the operation that caused it."""
+    return {
+        "enabled": loop_monitor.ENABLED,
+        "threshold_ms": loop_monitor.LAG_THRESHOLD * 1000,
+        "stalls": list(reversed(loop_monitor.recent_stalls)),
+    }
+
+@router.get("/pool")
+def get_pool_status(current_admin: models.User = Depends(auth.get_current_admin)):
+    """Connection-pool saturation and the operations currently holding connections the longest."""
+    return database.pool_status(database.engine, "primary")
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def get_profile(
+    seconds: float = Query(10, gt=0, le=profiler.MAX_SECONDS),
+    hz: int = Query(100, ge=1, le=1000),
+    include_tasks: bool = False,
+    include_idle: bool = False,
+    current_admin: models.User = Depends(auth.get_current_admin)
+):
+    """Samples this worker for `seconds` and returns collapsed stacks (flamegraph.pl / speedscope input)."""
+    loop = asyncio.get_running_loop()
+    try:
+        result = await asyncio.to_thread(
+            profiler.sample, loop, threading.get_ident(), seconds, hz, include_tasks, include_idle
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(profiler.collapsed(result["stacks"]), headers={"X-Profile-Samples": str(result["samples"])})
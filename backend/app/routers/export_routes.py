@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from .. import database, models, auth, export
+
+router = APIRouter(
+    prefix="/export",
+    tags=["Export"]
+)
+
+@router.get("/debates")
+def export_debates(
+    user_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after_id: int = Query(0, ge=0),
+    format: str = Query("ndjson", pattern="^(ndjson|gzip)$"),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Streams debate transcripts as NDJSON (one debate per line, id order), optionally gzipped.
+
+    Admins may export any user's debates or all of them; other users only their own.
+    To resume, pass the id of the last line received as after_id.
+    """
+    if user_id != current_user.id and current_user.email.lower() not in auth.ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    compress = format == "gzip"
+    transcripts = export.iter_transcripts(database.read_session_factory(), user_id, since, until, after_id)
+    body = (data for _, _, data in export.pieces(transcripts, compress)) # Sync generator: Starlette runs it in the threadpool
+    filename = "debates.ndjson.gz" if compress else "debates.ndjson"
+    return StreamingResponse(
+        body, media_type="application/gzip" if compress else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,23 +1,141 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from .. import database, models, schemas, auth
+from ..cache import TTLCache
 
 router = APIRouter(
     prefix="/forums",
     tags=["Forums"]
 )
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Requests with neither ?limit= nor ?after_id= get the full, unpaginated list,
+# as before pagination existed; clients opt in by sending either parameter.
+
+# Read-through cache for forum and thread listings, keyed by ("forums", after_id, limit)
+# and ("threads", forum_id, after_id, limit). create_thread/create_post invalidate it.
+# Cache fills stay on the primary: a fill from a lagging replica right after an
+# invalidation would pin the stale page for the whole TTL.
+listing_cache = TTLCache(maxsize=2048, ttl=60)
+
+
+def _last_activity(*timestamps):
+    present = [t for t in timestamps if t is not None]
+    return max(present) if present else None
+
+def _page_size(after_id: Optional[int], limit: Optional[int]) -> Optional[int]:
+    """The page size to use, or None for the legacy unpaginated listing."""
+    if limit is None and after_id is not None:
+        return DEFAULT_PAGE_SIZE
+    return limit
+
+def _set_next_cursor(response: Response, page: list, limit: Optional[int]):
+    # Keyset pagination: clients pass this back as ?after_id= to get the next page
+    if limit is not None and len(page) == limit:
+        response.headers["X-Next-Cursor"] = str(page[-1]["id"])
+
+def _invalidate_forum_listings(forum_id: int):
+    listing_cache.invalidate_where(lambda key: key[0] == "forums" or key[:2] == ("threads", forum_id))
+
+
+def _load_forums(db: Session, after_id: Optional[int], limit: Optional[int]) -> list:
+    """One page of forums with thread/post counts and last activity, in a single grouped query."""
+    query = (
+        db.query(
+            models.Forum,
+            func.count(func.distinct(models.Thread.id)),
+            func.count(models.Post.id),
+            func.max(models.Thread.created_at),
+            func.max(models.Post.created_at),
+        )
+        .outerjoin(models.Thread, models.Thread.forum_id == models.Forum.id)
+        .outerjoin(models.Post, models.Post.thread_id == models.Thread.id)
+    )
+    if after_id is not None:
+        query = query.filter(models.Forum.id > after_id)
+    rows = query.group_by(models.Forum.id).order_by(models.Forum.id).limit(limit).all()
+    return [
+        {
+            "id": forum.id,
+            "name": forum.name,
+            "description": forum.description,
+            "thread_count": thread_count,
+            "post_count": post_count,
+            "last_activity": _last_activity(last_thread_at, last_post_at),
+        }
+        for forum, thread_count, post_count, last_thread_at, last_post_at in rows
+    ]
+
+def _load_threads(db: Session, forum_id: int, after_id: Optional[int], limit: Optional[int]) -> list:
+    """One page of a forum's threads with post counts and last activity, in a single grouped query."""
+    query = (
+        db.query(models.Thread, func.count(models.Post.id), func.max(models.Post.created_at))
+        .outerjoin(models.Post, models.Post.thread_id == models.Thread.id)
+        .filter(models.Thread.forum_id == forum_id)
+    )
+    if after_id is not None:
+        query = query.filter(models.Thread.id > after_id)
+    rows = query.group_by(models.Thread.id).order_by(models.Thread.id).limit(limit).all()
+    return [
+        {
+            "id": thread.id,
+            "title": thread.title,
+            "forum_id": thread.forum_id,
+            "user_id": thread.user_id,
+            "created_at": thread.created_at,
+            "post_count": post_count,
+            "last_activity": _last_activity(thread.created_at, last_post_at),
+        }
+        for thread, post_count, last_post_at in rows
+    ]
+
+
 @router.get("/", response_model=list[schemas.Forum])
-def get_forums(db: Session = Depends(database.get_db)):
-    return db.query(models.Forum).all()
+def get_forums(
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(database.get_db)
+):
+    limit = _page_size(after_id, limit)
+    page = listing_cache.get_or_set(("forums", after_id, limit), lambda: _load_forums(db, after_id, limit))
+    _set_next_cursor(response, page, limit)
+    return page
 
 @router.get("/{forum_id}/threads", response_model=list[schemas.Thread])
-def get_threads(forum_id: int, db: Session = Depends(database.get_db)):
-    return db.query(models.Thread).filter(models.Thread.forum_id == forum_id).all()
+def get_threads(
+    forum_id: int,
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(database.get_db)
+):
+    limit = _page_size(after_id, limit)
+    page = listing_cache.get_or_set(
+        ("threads", forum_id, after_id, limit), lambda: _load_threads(db, forum_id, after_id, limit)
+    )
+    _set_next_cursor(response, page, limit)
+    return page
 
 @router.get("/threads/{thread_id}/posts", response_model=list[schemas.Post])
-def get_posts(thread_id: int, db: Session = Depends(database.get_db)):
-    return db.query(models.Post).filter(models.Post.thread_id == thread_id).all()
+def get_posts(
+    thread_id: int,
+    response: Response,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(database.get_read_db)
+):
+    limit = _page_size(after_id, limit)
+    query = db.query(models.Post).filter(models.Post.thread_id == thread_id)
+    if after_id is not None:
+        query = query.filter(models.Post.id > after_id)
+    posts = query.order_by(models.Post.id).limit(limit).all()
+    if limit is not None and len(posts) == limit:
+        response.headers["X-Next-Cursor"] = str(posts[-1].id)
+    return posts
 
 @router.post("/threads", response_model=schemas.Thread)
 def create_thread(thread: schemas.ThreadCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
@@ -25,12 +143,18 @@ def create_thread(thread: schemas.ThreadCreate, db: Session = Depends(database.g
     db.add(db_thread)
     db.commit()
     db.refresh(db_thread)
+    _invalidate_forum_listings(db_thread.forum_id)
     return db_thread
 
 @router.post("/posts", response_model=schemas.Post)
 def create_post(post: schemas.PostCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    db_thread = db.get(models.Thread, post.thread_id)
+    if not db_thread:
+        raise HTTPException(status_code=404, detail="Thread not found")
+    forum_id = db_thread.forum_id
     db_post = models.Post(**post.dict(), user_id=current_user.id)
     db.add(db_post)
     db.commit()
     db.refresh(db_post)
+    _invalidate_forum_listings(forum_id)
     return db_post
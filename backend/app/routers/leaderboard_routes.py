@@ -8,5 +8,5 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=list[schemas.UserOut])
-def get_leaderboard(db: Session = Depends(database.get_db)):
+def get_leaderboard(db: Session = Depends(database.get_read_db)):
     return db.query(models.User).order_by(models.User.elo.desc()).limit(10).all()
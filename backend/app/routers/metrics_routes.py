@@ -0,0 +1,20 @@
+import os
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from .. import metrics
+
+router = APIRouter(
+    tags=["Metrics"]
+)
+
+# When set, scrapers must send "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics_route(authorization: Optional[str] = Header(None)):
+    """Prometheus text exposition of the in-process metrics."""
+    if METRICS_TOKEN and not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,21 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from .. import database, models, schemas, auth, search
+
+router = APIRouter(
+    prefix="/search",
+    tags=["Search"]
+)
+
+@router.get("/", response_model=list[schemas.SearchResult])
+def search_route(
+    q: str = Query(..., min_length=2, max_length=200),
+    kind: Optional[str] = Query(None, pattern="^(message|post|thread|debate)$"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    """Ranked full-text search over debate topics, transcripts, thread titles and posts."""
+    return search.search(db.connection(), q, kind=kind, limit=limit, offset=offset)
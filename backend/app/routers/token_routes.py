@@ -1,18 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from .. import database, models, schemas, auth
+from .. import database, models, schemas, auth, tokens
 
 router = APIRouter(
     prefix="/tokens",
     tags=["Tokens"]
 )
 
+REDEEM_COST = 10
+
 @router.post("/redeem")
 def redeem_tokens(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    if current_user.mind_tokens < 10:
+    # Conditional UPDATE: concurrent redeems cannot take the balance below zero
+    balance = tokens.debit(db, current_user.id, REDEEM_COST, reason="redeem")
+    if balance is None:
+        db.rollback()
         raise HTTPException(status_code=400, detail="Not enough tokens.")
-
-    current_user.mind_tokens -= 10
     db.commit()
 
-    return {"message": "Tokens redeemed successfully."}
+    return {"message": "Tokens redeemed successfully.", "mind_tokens": balance}
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from .. import database, models, auth, topics
+
+router = APIRouter(
+    prefix="/topics",
+    tags=["Topics"]
+)
+
+@router.get("/")
+def get_topics(db: Session = Depends(database.get_db)):
+    """Enabled debate topics and their categories (the `category` accepted by the debate start routes)."""
+    return [{"id": topic.id, "text": topic.text, "category": topic.category} for topic in topics.catalog(db).topics]
+
+@router.post("/reload")
+def reload_topics(db: Session = Depends(database.get_db), current_admin: models.User = Depends(auth.get_current_admin)):
+    """Reloads the topic catalog now instead of waiting for the periodic refresh."""
+    snapshot = topics.reload(db)
+    return {"enabled": len(snapshot.topics), "total": len(snapshot.ids_by_text)}
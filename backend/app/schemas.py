@@ -69,6 +69,9 @@ class Forum(BaseModel):
     id: int
     name: str
     description: str
+    thread_count: int = 0
+    post_count: int = 0
+    last_activity: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -78,6 +81,9 @@ class Thread(BaseModel):
     title: str
     forum_id: int
     user_id: int
+    created_at: Optional[datetime] = None
+    post_count: int = 0
+    last_activity: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -91,6 +97,7 @@ class Post(BaseModel):
     content: str
     thread_id: int
     user_id: int
+    created_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -156,4 +163,10 @@ class LeaderboardEntry(BaseModel):
     mind_tokens: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+class SearchResult(BaseModel):
+    kind: str  # "message", "post", "thread" or "debate"
+    id: int
+    parent_id: Optional[int] = None  # debate_id, thread_id or forum_id depending on kind
+    snippet: str  # HTML-escaped text with matches wrapped in <b>...</b>
+    score: float
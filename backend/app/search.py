@@ -0,0 +1,193 @@
+# app/search.py - Full-text search over debates, transcripts and forums
+#
+# One `search_documents` table holds every searchable text:
+#   SQLite   -> FTS5 virtual table ranked with bm25()
+#   Postgres -> plain table with a generated tsvector column and a GIN index
+# Rows are added incrementally from ORM after_insert hooks; `rebuild_index`
+# repopulates everything (e.g. after bulk loads that bypass the ORM), including
+# messages that only exist in archived transcripts (see app/archive.py).
+# Snippets are HTML: the matched text is escaped and only the <b>...</b>
+# highlight markers are markup.
+
+import html
+import re
+from typing import List, Optional, Set
+
+from sqlalchemy import event, inspect, select, text
+
+from app import archive, models
+
+# kind -> (model, text column, parent column)
+SOURCES = {
+    "message": (models.Message, "content", "debate_id"),
+    "post": (models.Post, "content", "thread_id"),
+    "thread": (models.Thread, "title", "forum_id"),
+    "debate": (models.Debate, "topic", None),
+}
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_documents USING fts5("
+    "content, kind UNINDEXED, ref_id UNINDEXED, parent_id UNINDEXED, tokenize='porter unicode61')",
+]
+
+POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS search_documents ("
+    "id BIGSERIAL PRIMARY KEY, "
+    "kind VARCHAR(16) NOT NULL, "
+    "ref_id INTEGER NOT NULL, "
+    "parent_id INTEGER, "
+    "content TEXT NOT NULL, "
+    "tsv tsvector GENERATED ALWAYS AS (to_tsvector('english', content)) STORED)",
+    "CREATE INDEX IF NOT EXISTS ix_search_documents_tsv ON search_documents USING GIN (tsv)",
+    "CREATE INDEX IF NOT EXISTS ix_search_documents_kind_ref_id ON search_documents (kind, ref_id)",
+]
+
+_INSERT = text(
+    "INSERT INTO search_documents (content, kind, ref_id, parent_id) "
+    "VALUES (:content, :kind, :ref_id, :parent_id)"
+)
+
+REBUILD_ARCHIVE_CHUNK = 200 # Archived transcripts unpacked per query during a rebuild
+
+# Highlight markers used inside the database; replaced by <b>...</b> after escaping
+_START, _STOP = "\x02", "\x03"
+
+# Database URLs whose index table is known to exist. Only hits are cached, so
+# an index created after startup is picked up on the next call.
+_index_ready: Set[str] = set()
+
+
+def _is_sqlite(connection) -> bool:
+    return connection.dialect.name == "sqlite"
+
+def index_available(connection) -> bool:
+    key = str(connection.engine.url)
+    if key not in _index_ready and inspect(connection).has_table("search_documents"):
+        _index_ready.add(key)
+    return key in _index_ready
+
+def create_search_index(connection):
+    """Creates the search table for this dialect (idempotent). Migrations do this in deployed DBs."""
+    for statement in SQLITE_DDL if _is_sqlite(connection) else POSTGRES_DDL:
+        connection.execute(text(statement))
+    _index_ready.add(str(connection.engine.url))
+
+
+def index_document(connection, kind: str, ref_id: int, parent_id: Optional[int], content: str):
+    if not content or not index_available(connection):
+        return
+    connection.execute(_INSERT, {"content": content, "kind": kind, "ref_id": ref_id, "parent_id": parent_id})
+
+def remove_documents(connection, kind: str, ref_ids: List[int]):
+    """Drops index rows for deleted source rows."""
+    if not ref_ids or not index_available(connection):
+        return
+    # FTS5 UNINDEXED columns are not indexed, so deleting by ref_id scans the
+    # table; callers batch their deletes to amortize that.
+    connection.execute(
+        text("DELETE FROM search_documents WHERE kind = :kind AND ref_id IN (%s)" % ",".join(str(int(i)) for i in ref_ids)),
+        {"kind": kind},
+    )
+
+def replace_document(connection, kind: str, ref_id: int, parent_id: Optional[int], content: str):
+    """Reindexes a source row whose text changed."""
+    remove_documents(connection, kind, [ref_id])
+    index_document(connection, kind, ref_id, parent_id, content)
+
+def rebuild_index(connection):
+    """Repopulates the whole index: one INSERT ... SELECT per kind, then the archived messages."""
+    if not index_available(connection):
+        create_search_index(connection)
+    connection.execute(text("DELETE FROM search_documents"))
+    for kind, (model, text_column, parent_column) in SOURCES.items():
+        table = model.__tablename__
+        parent = parent_column or "NULL"
+        connection.execute(text(
+            f"INSERT INTO search_documents (content, kind, ref_id, parent_id) "
+            f"SELECT {text_column}, '{kind}', id, {parent} FROM {table}"
+        ))
+    # Archived messages are no longer in `messages`; unpack their transcripts a chunk at a time
+    after_id = 0
+    while True:
+        rows = connection.execute(
+            select(models.ArchivedTranscript.debate_id, models.ArchivedTranscript.data)
+            .where(models.ArchivedTranscript.debate_id > after_id)
+            .order_by(models.ArchivedTranscript.debate_id).limit(REBUILD_ARCHIVE_CHUNK)
+        ).all()
+        if not rows:
+            return
+        documents = [
+            {"content": message["content"], "kind": "message", "ref_id": message["id"], "parent_id": debate_id}
+            for debate_id, data in rows for message in archive.unpack(debate_id, data) if message["content"]
+        ]
+        if documents:
+            connection.execute(_INSERT, documents)
+        after_id = rows[-1].debate_id
+
+
+def _fts5_query(query: str) -> str:
+    # Quote every term so user input can never be parsed as FTS5 syntax; terms are ANDed.
+    return " ".join('"%s"' % term for term in re.findall(r"\w+", query))
+
+def _highlight(snippet: str) -> str:
+    """Escapes the snippet's text, then turns the database's markers into <b>...</b>."""
+    return html.escape(snippet or "").replace(_START, "<b>").replace(_STOP, "</b>")
+
+def search(connection, query: str, kind: Optional[str] = None, limit: int = 20, offset: int = 0) -> List[dict]:
+    """Ranked full-text search. Higher `score` is a better match."""
+    if not index_available(connection):
+        return []
+    params = {"limit": limit, "offset": offset, "kind": kind}
+    kind_filter = "AND kind = :kind " if kind else ""
+
+    if _is_sqlite(connection):
+        params["q"] = _fts5_query(query)
+        if not params["q"]:
+            return []
+        params.update(start_sel=_START, stop_sel=_STOP)
+        sql = (
+            "SELECT kind, ref_id, parent_id, "
+            "snippet(search_documents, 0, :start_sel, :stop_sel, '…', 16) AS snippet, "
+            "-bm25(search_documents) AS score "
+            "FROM search_documents WHERE search_documents MATCH :q " + kind_filter +
+            "ORDER BY bm25(search_documents) LIMIT :limit OFFSET :offset"
+        )
+    else:
+        params["q"] = query
+        params["headline_options"] = f"MaxWords=24, MinWords=8, StartSel={_START}, StopSel={_STOP}"
+        sql = (
+            "SELECT kind, ref_id, parent_id, "
+            "ts_headline('english', content, q, :headline_options) AS snippet, "
+            "ts_rank_cd(tsv, q) AS score "
+            "FROM search_documents, websearch_to_tsquery('english', :q) AS q "
+            "WHERE tsv @@ q " + kind_filter +
+            "ORDER BY score DESC LIMIT :limit OFFSET :offset"
+        )
+
+    rows = connection.execute(text(sql), params).mappings().all()
+    return [
+        {"kind": row["kind"], "id": int(row["ref_id"]), "parent_id": row["parent_id"],
+         "snippet": _highlight(row["snippet"]), "score": float(row["score"])}
+        for row in rows
+    ]
+
+
+# --- Incremental indexing on insert ---
+
+def _register_insert_hook(kind: str, model, text_column: str, parent_column: Optional[str]):
+    @event.listens_for(model, "after_insert")
+    def _index_new_row(mapper, connection, target):
+        parent_id = getattr(target, parent_column) if parent_column else None
+        index_document(connection, kind, target.id, parent_id, getattr(target, text_column))
+
+for _kind, (_model, _text_column, _parent_column) in SOURCES.items():
+    _register_insert_hook(_kind, _model, _text_column, _parent_column)
+
+
+if __name__ == "__main__":
+    # python -m app.search  -> create (if needed) and rebuild the index
+    from app.database import engine
+    with engine.begin() as conn:
+        rebuild_index(conn)
+        count = conn.execute(text("SELECT count(*) FROM search_documents")).scalar()
+    print(f"Search index rebuilt: {count} documents.")
@@ -0,0 +1,98 @@
+# app/tokens.py - Mind-token balance changes backed by the token_transactions ledger
+#
+# Balances live on users.mind_tokens; every change also appends a ledger row in
+# the same transaction. Debits are a single conditional UPDATE, so concurrent
+# redeems can never overdraw a balance. Finished debates are credited in
+# batches by the gamification engine (debate_credits + credit_batch), in the
+# same transaction as streaks and badges. A debate credit is paid at most once
+# per (debate, user, reason): credit_batch skips pairs the ledger already holds.
+# Callers own the commit.
+#
+# Environment:
+#   TOKENS_PER_DEBATE   tokens credited to each player of a finished debate (default 5)
+#   TOKENS_PER_WIN      extra tokens credited to the winner (default 10)
+
+import os
+from collections import defaultdict
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, insert, update
+from sqlalchemy.orm import Session
+
+from app import auth, models
+
+users_table = models.User.__table__
+
+PER_DEBATE = int(os.getenv("TOKENS_PER_DEBATE", "5"))
+PER_WIN = int(os.getenv("TOKENS_PER_WIN", "10"))
+
+
+def _chunks(items: List[int], size: int = 1000):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def debit(db: Session, user_id: int, cost: int, reason: str, debate_id: Optional[int] = None) -> Optional[int]:
+    """Atomically takes `cost` tokens from a user. Returns the new balance, or None if they have too few."""
+    balance = db.execute(
+        update(users_table)
+        .where(users_table.c.id == user_id, users_table.c.mind_tokens >= cost)
+        .values(mind_tokens=users_table.c.mind_tokens - cost)
+        .returning(users_table.c.mind_tokens)
+    ).scalar()
+    if balance is None:
+        return None
+    db.execute(insert(models.TokenTransaction), [
+        {"user_id": user_id, "amount": -cost, "reason": reason, "debate_id": debate_id},
+    ])
+    auth.invalidate_users_on_commit(db, [user_id])
+    return balance
+
+
+def debate_credits(debate_id: int, player_id: int, won: bool) -> List[Tuple[int, int, str, Optional[int]]]:
+    """The credits one player earns for a finished debate, as credit_batch tuples."""
+    credits = []
+    if PER_DEBATE:
+        credits.append((player_id, PER_DEBATE, "debate_finished", debate_id))
+    if won and PER_WIN:
+        credits.append((player_id, PER_WIN, "debate_won", debate_id))
+    return credits
+
+
+def credit_batch(db: Session, credits: Iterable[Tuple[int, int, str, Optional[int]]]) -> int:
+    """Credits many users at once, e.g. everyone in a batch of finished debates.
+
+    `credits` holds (user_id, amount, reason, debate_id) tuples. Amounts are summed per
+    user so each users row is updated once, and all ledger rows go in one executemany.
+    Credits for a debate whose (debate_id, user_id, reason) is already in the ledger, or
+    earlier in `credits`, are skipped. Returns the number of ledger rows written.
+    """
+    credits = list(credits)
+    debate_ids = {debate_id for _, _, _, debate_id in credits if debate_id is not None}
+    paid = set()
+    for chunk in _chunks(sorted(debate_ids)):
+        paid.update(tuple(row) for row in db.query(
+            models.TokenTransaction.debate_id, models.TokenTransaction.user_id, models.TokenTransaction.reason
+        ).filter(models.TokenTransaction.debate_id.in_(chunk)))
+
+    totals = defaultdict(int)
+    ledger_rows = []
+    for user_id, amount, reason, debate_id in credits:
+        if debate_id is not None:
+            if (debate_id, user_id, reason) in paid:
+                continue
+            paid.add((debate_id, user_id, reason))
+        totals[user_id] += amount
+        ledger_rows.append({"user_id": user_id, "amount": amount, "reason": reason, "debate_id": debate_id})
+    if not ledger_rows:
+        return 0
+
+    db.execute(
+        update(users_table)
+        .where(users_table.c.id == bindparam("target_id"))
+        .values(mind_tokens=func.coalesce(users_table.c.mind_tokens, 0) + bindparam("delta")),
+        [{"target_id": user_id, "delta": delta} for user_id, delta in totals.items()],
+    )
+    db.execute(insert(models.TokenTransaction), ledger_rows)
+    auth.invalidate_users_on_commit(db, totals.keys())
+    return len(ledger_rows)
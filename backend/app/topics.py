@@ -0,0 +1,134 @@
+# app/topics.py - Debate topic catalog and non-repeating topic selection
+#
+# Topics live in the `topics` table (text, category, weight, enabled) and are
+# held in memory as an immutable snapshot. The snapshot is reloaded every
+# TOPIC_CATALOG_REFRESH_SECONDS, or at once via POST /topics/reload, so
+# adding, disabling or reweighting topics in the table needs no deploy. The
+# default topics are seeded by migration 5d8b3f1a7c20; the app never re-seeds,
+# so an operator can empty the catalog on purpose.
+#
+# pick() draws a weighted random topic, skipping the last TOPIC_RECENT_COUNT
+# topics each of the given users debated. Recent topics are kept per user as a
+# short tuple of topic ids in a bounded LRU; a user's tuple is loaded from
+# their debate history once, on first use, and kept current by remember().
+# If every candidate was seen recently, the recency filter is dropped. An
+# unknown or empty category raises ValueError (the start routes answer 400) and
+# an empty catalog raises RuntimeError (503).
+#
+# Environment:
+#   TOPIC_CATALOG_REFRESH_SECONDS   catalog snapshot lifetime (default 60)
+#   TOPIC_RECENT_COUNT              recent topics avoided per user (default 5)
+#   TOPIC_RECENT_USERS              users whose recent topics are kept in memory (default 100000)
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app import models
+from app.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+REFRESH_SECONDS = float(os.getenv("TOPIC_CATALOG_REFRESH_SECONDS", "60"))
+RECENT_COUNT = int(os.getenv("TOPIC_RECENT_COUNT", "5"))
+RECENT_USERS = int(os.getenv("TOPIC_RECENT_USERS", "100000"))
+RECENT_TTL = 7 * 24 * 3600
+
+class CatalogTopic(NamedTuple):
+    id: int
+    text: str
+    category: str
+    weight: float
+
+
+class Catalog(NamedTuple):
+    topics: List[CatalogTopic] # Enabled topics with a positive weight
+    ids_by_text: Dict[str, int]
+    loaded_at: float
+
+
+_catalog: Optional[Catalog] = None
+_load_lock = threading.Lock()
+_recent = TTLCache(maxsize=RECENT_USERS, ttl=RECENT_TTL) # {user id: topic ids, newest first}
+
+
+def reload(db: Session) -> Catalog:
+    """Loads a fresh catalog snapshot from the database."""
+    global _catalog
+    with _load_lock:
+        rows = db.query(models.Topic.id, models.Topic.text, models.Topic.category, models.Topic.weight,
+                        models.Topic.enabled).order_by(models.Topic.id).all()
+        topics = [CatalogTopic(row.id, row.text, row.category, row.weight) for row in rows if row.enabled and row.weight > 0]
+        _catalog = Catalog(topics, {row.text: row.id for row in rows}, time.monotonic())
+    logger.debug("Topic catalog loaded: %d enabled of %d.", len(topics), len(rows))
+    return _catalog
+
+
+def catalog(db: Session) -> Catalog:
+    """The current snapshot, reloaded once it is older than REFRESH_SECONDS."""
+    snapshot = _catalog
+    if snapshot is None or time.monotonic() - snapshot.loaded_at > REFRESH_SECONDS:
+        snapshot = reload(db)
+    return snapshot
+
+
+def recent_topic_ids(db: Session, user_id: int) -> Tuple[int, ...]:
+    """Ids of the topics `user_id` debated most recently, newest first."""
+    return _recent.get_or_set(user_id, lambda: _recent_from_history(db, user_id))
+
+
+def _recent_from_history(db: Session, user_id: int) -> Tuple[int, ...]:
+    ids_by_text = catalog(db).ids_by_text
+    rows = (
+        db.query(models.Debate.topic)
+        .filter(or_(models.Debate.player1_id == user_id, models.Debate.player2_id == user_id),
+                models.Debate.player2_id.isnot(None)) # Unmatched searches were never debated
+        .order_by(models.Debate.timestamp.desc()).limit(RECENT_COUNT * 2).all()
+    )
+    recent: List[int] = []
+    for (text,) in rows:
+        topic_id = ids_by_text.get(text)
+        if topic_id is not None and topic_id not in recent:
+            recent.append(topic_id)
+    return tuple(recent[:RECENT_COUNT])
+
+
+def remember(db: Session, user_ids: Iterable[int], text: str):
+    """Records that `user_ids` are now debating `text`."""
+    topic_id = catalog(db).ids_by_text.get(text)
+    if topic_id is None:
+        return
+    for user_id in user_ids:
+        recent = recent_topic_ids(db, user_id)
+        _recent.set(user_id, ((topic_id,) + tuple(i for i in recent if i != topic_id))[:RECENT_COUNT])
+
+
+def is_recent(db: Session, user_id: int, text: str) -> bool:
+    return catalog(db).ids_by_text.get(text) in recent_topic_ids(db, user_id)
+
+
+def category_of(db: Session, text: str) -> Optional[str]:
+    """The category of enabled topic `text`, or None if it is not in the catalog."""
+    return next((topic.category for topic in catalog(db).topics if topic.text == text), None)
+
+
+def pick(db: Session, user_ids: Iterable[int] = (), category: Optional[str] = None) -> str:
+    """A weighted random topic from `category` (default: any) that none of `user_ids` debated recently."""
+    topics = catalog(db).topics
+    if not topics:
+        raise RuntimeError("No enabled debate topics in the catalog.")
+    if category:
+        topics = [topic for topic in topics if topic.category == category]
+        if not topics:
+            raise ValueError(f"No enabled debate topics in category '{category}'.")
+    seen = set()
+    for user_id in user_ids:
+        seen.update(recent_topic_ids(db, user_id))
+    candidates = [topic for topic in topics if topic.id not in seen] or topics
+    return random.choices(candidates, weights=[topic.weight for topic in candidates])[0].text
@@ -0,0 +1,26 @@
+# tools/backfill_gamification.py - Rebuild streaks and badges from debate history
+#
+# Run from backend/ against the database in DATABASE_URL:
+#     python -m tools.backfill_gamification
+#
+# Replays every finished debate through the same rules as the live engine in
+# app.gamification, then writes all streak rows and missing badge awards in
+# bulk. Safe to re-run: badges already held are kept, streaks are recomputed.
+
+import time
+
+from app import database, gamification
+
+
+def main():
+    started = time.perf_counter()
+    with database.SessionLocal() as db:
+        result = gamification.backfill(db)
+    print(
+        f"Backfill complete in {time.perf_counter() - started:.1f}s: replayed {result['debates']} debates "
+        f"for {result['users']} users, awarded {result['badges_awarded']} badges."
+    )
+
+
+if __name__ == "__main__":
+    main()
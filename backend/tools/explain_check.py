@@ -0,0 +1,174 @@
+# tools/explain_check.py - Query-plan regression check for the HTTP routes
+#
+# Run from backend/:
+#     python -m tools.explain_check                       # scratch SQLite file
+#     python -m tools.explain_check --database-url postgresql://.../scratch
+#
+# Seeds a realistic dataset (tools.generate_data), calls every read route (and the writes that
+# query first) through the FastAPI app while recording each SQL statement it
+# issues, then EXPLAINs every statement with its real parameters. A plan that
+# reads a large table without an index is reported and the exit status is 1.
+#   SQLite   -> EXPLAIN QUERY PLAN; "SCAN <table>" without an index is a full scan
+#   Postgres -> EXPLAIN (FORMAT JSON) with enable_seqscan off; any Seq Scan means
+#               no usable index exists
+# The database is written to; never point --database-url at real data.
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+
+# Tables small enough that scanning them is the right plan
+SMALL_TABLES = {"forums", "badges", "alembic_version"}
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Query-plan regression check for the HTTP routes")
+    parser.add_argument("--database-url", help="Scratch database (default: a temporary SQLite file)")
+    parser.add_argument("--messages", type=int, default=100000, help="Dataset size (see tools.generate_data)")
+    parser.add_argument("--show-plans", action="store_true", help="Print every plan, not only regressions")
+    return parser.parse_args()
+
+
+args = _parse_args()
+os.environ["DATABASE_URL"] = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "explain.db")
+os.environ.setdefault("GROQ_API_KEY", "unused") # app.ai requires it at import; no route here calls the LLM
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, text
+
+from app import auth, database, models, search
+from app.main import fastapi_app
+from tools import generate_data
+
+
+def seed(db, messages: int) -> dict:
+    """Generates a dataset with tools.generate_data and picks ids for the routes to hit."""
+    generate_data.generate(db, generate_data.sizes(messages=messages), seed=42)
+    debate = (
+        db.query(models.Debate)
+        .filter(models.Debate.player2_id.isnot(None), models.Debate.player2_id != models.AI_USER_ID)
+        .order_by(models.Debate.id).first()
+    )
+    thread_id, forum_id = (
+        db.query(models.Post.thread_id, models.Thread.forum_id).join(models.Thread, models.Thread.id == models.Post.thread_id)
+        .group_by(models.Post.thread_id, models.Thread.forum_id).order_by(func.count().desc()).first()
+    )
+    return {"user_id": debate.player1_id, "debate_id": debate.id, "forum_id": forum_id, "thread_id": thread_id}
+
+
+# (method, path template, json body); {user_id}/{debate_id}/... are filled from the seeded ids
+ROUTES = [
+    ("GET", "/leaderboard/", None),
+    ("GET", "/dashboard/stats", None),
+    ("GET", "/dashboard/history", None),
+    ("GET", "/debate/{debate_id}", None),
+    ("GET", "/debate/{debate_id}/messages", None),
+    ("GET", "/forums/", None),
+    ("GET", "/forums/{forum_id}/threads", None),
+    ("GET", "/forums/{forum_id}/threads?after_id=10", None),
+    ("GET", "/forums/threads/{thread_id}/posts", None),
+    ("GET", "/forums/threads/{thread_id}/posts?after_id=5", None),
+    ("GET", "/gamification/badges", None),
+    ("GET", "/gamification/streaks", None),
+    ("GET", "/search/?q=argument", None),
+    ("GET", "/search/?q=argument&kind=message", None),
+    ("POST", "/forums/posts", {"content": "plan check", "thread_id": "{thread_id}"}),
+    ("POST", "/debate/{debate_id}/messages", {"content": "plan check"}),
+]
+
+
+def capture_statements(client, headers, ids) -> list:
+    """Calls every route and returns (route, statement, parameters) for each SELECT it ran."""
+    captured = []
+    current = {}
+
+    @event.listens_for(database.engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")) and not executemany:
+            captured.append((current["route"], statement, parameters))
+
+    for method, template, body in ROUTES:
+        path = template.format(**ids)
+        current["route"] = f"{method} {path}"
+        if body is not None:
+            body = {key: int(value.format(**ids)) if isinstance(value, str) and value.startswith("{") else value
+                    for key, value in body.items()}
+        response = client.request(method, path, headers=headers, json=body)
+        if response.status_code >= 400:
+            print(f"warning: {method} {path} returned {response.status_code}", file=sys.stderr)
+
+    event.remove(database.engine, "before_cursor_execute", _record)
+    return captured
+
+
+def _sqlite_full_scans(plan_rows) -> list:
+    scans = []
+    for row in plan_rows:
+        detail = row[-1]
+        match = re.match(r"SCAN (?:TABLE )?(\w+)", detail)
+        if match and "USING" not in detail and "VIRTUAL TABLE" not in detail and match.group(1) not in SMALL_TABLES:
+            scans.append(detail)
+    return scans
+
+
+def _postgres_full_scans(plan) -> list:
+    scans = []
+
+    def walk(node):
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") not in SMALL_TABLES:
+            scans.append(f'Seq Scan on {node.get("Relation Name")}')
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return scans
+
+
+def explain(connection, statement, parameters):
+    """Returns (plan text, full scans) for one captured statement."""
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        return "\n".join(row[-1] for row in rows), _sqlite_full_scans(rows)
+    connection.exec_driver_sql("SET enable_seqscan = off")
+    plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return json.dumps(plan, indent=1), _postgres_full_scans(plan)
+
+
+def main() -> int:
+    database.Base.metadata.create_all(database.engine)
+
+    with database.SessionLocal() as db:
+        ids = seed(db, args.messages)
+        user = db.get(models.User, ids["user_id"])
+        headers = {"Authorization": "Bearer " + auth.create_access_token({"sub": user.email, "uid": user.id})}
+    with database.engine.begin() as connection:
+        search.rebuild_index(connection)
+        connection.execute(text("ANALYZE"))
+
+    with TestClient(fastapi_app) as client:
+        captured = capture_statements(client, headers, ids)
+
+    regressions = 0
+    seen = set()
+    with database.engine.connect() as connection:
+        for route, statement, parameters in captured:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            plan, scans = explain(connection, statement, parameters)
+            if scans:
+                regressions += 1
+                print(f"FULL SCAN  {route}\n  {' '.join(statement.split())}\n  -> {'; '.join(scans)}\n")
+            elif args.show_plans:
+                print(f"ok         {route}\n  {' '.join(statement.split())}\n  {plan.replace(chr(10), chr(10) + '  ')}\n")
+
+    print(f"{len(seen)} distinct statements from {len(ROUTES)} routes; {regressions} full scan(s).")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+# tools/export_debates.py - Export debate transcripts to an NDJSON (or .gz) file
+#
+# Run from backend/ against the database in DATABASE_URL (the read replica is
+# used when DATABASE_REPLICA_URL is set and healthy):
+#     python -m tools.export_debates --out debates.ndjson.gz
+#     python -m tools.export_debates --out alice.ndjson --user 42 --since 2025-01-01 --until 2025-07-01
+#     python -m tools.export_debates --out debates.ndjson.gz --resume    # continue an interrupted export
+#
+# Output format is that of GET /export/debates (see app/export.py); a .gz
+# suffix selects gzip. Progress is checkpointed after every piece in
+# <out>.offset (last debate id, bytes written and the filters). --resume cuts
+# the file back to the last checkpoint, so a piece that was only partly written
+# is discarded, and continues after that debate id.
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from app import database, export
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Export debate transcripts as NDJSON")
+    parser.add_argument("--out", required=True, help="Output file; a .gz suffix writes gzip")
+    parser.add_argument("--user", type=int, help="Only debates this user took part in")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="Debates started at or after (ISO date/time, UTC)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="Debates started before (ISO date/time, UTC)")
+    parser.add_argument("--chunk", type=int, default=export.CHUNK_DEBATES, help="Debates read per query")
+    parser.add_argument("--resume", action="store_true", help="Continue from <out>.offset")
+    return parser.parse_args()
+
+
+def _write_checkpoint(path: str, checkpoint: dict):
+    with open(path + ".tmp", "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(path + ".tmp", path)
+
+
+def main() -> int:
+    args = _parse_args()
+    offset_path = args.out + ".offset"
+    filters = {"user": args.user, "since": args.since and args.since.isoformat(),
+               "until": args.until and args.until.isoformat()}
+    checkpoint = {"after_id": 0, "bytes": 0, "debates": 0, "filters": filters}
+    if args.resume:
+        if not os.path.exists(offset_path):
+            print(f"No checkpoint at {offset_path}; nothing to resume.", file=sys.stderr)
+            return 1
+        with open(offset_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint["filters"] != filters:
+            print(f"Checkpoint was written with different filters: {checkpoint['filters']}", file=sys.stderr)
+            return 1
+        print(f"Resuming after debate {checkpoint['after_id']} ({checkpoint['debates']:,} debates already written).")
+
+    compress = args.out.endswith(".gz")
+    transcripts = export.iter_transcripts(
+        database.read_session_factory(), args.user, args.since, args.until, checkpoint["after_id"], args.chunk)
+    started = time.monotonic()
+    written = 0
+    with open(args.out, "r+b" if args.resume else "wb") as f:
+        f.truncate(checkpoint["bytes"])
+        f.seek(checkpoint["bytes"])
+        for last_id, count, data in export.pieces(transcripts, compress):
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            checkpoint.update(after_id=last_id, bytes=checkpoint["bytes"] + len(data), debates=checkpoint["debates"] + count)
+            _write_checkpoint(offset_path, checkpoint)
+            written += count
+            if written // 10000 != (written - count) // 10000:
+                print(f"  {checkpoint['debates']:,} debates, {checkpoint['bytes'] / 2**20:.1f} MiB, "
+                      f"{written / (time.monotonic() - started):,.0f} debates/s", flush=True)
+
+    print(f"Exported {written:,} debates in {time.monotonic() - started:.1f}s "
+          f"({checkpoint['debates']:,} total, {checkpoint['bytes'] / 2**20:.1f} MiB) to {args.out}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+# tools/generate_data.py - Synthetic dataset generator for benchmarks
+#
+# Run from backend/ against the database in DATABASE_URL:
+#     python -m tools.generate_data --scale 100k --seed 7
+#     python -m tools.generate_data --messages 10000000 --users 200000
+#
+# Generates users, human and AI debates, transcripts, forums, threads and
+# posts, then derives streaks and badges with gamification.backfill and
+# rebuilds the search index (bulk rows bypass the ORM indexing hooks).
+# Rows are streamed in chunks: multi-row INSERTs on SQLite, COPY on Postgres.
+# The same --seed against an empty database produces the same data.
+#
+# Sizes are driven by --scale (the message count) unless given explicitly:
+#     1k, 10k, 100k, 1m, 10m
+
+import argparse
+import csv
+import io
+import itertools
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional
+
+from sqlalchemy import func, insert, text
+
+from app import database, gamification, models, search
+
+CHUNK = 10_000
+EPOCH = datetime(2025, 1, 1)
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+WORDS = (
+    "the a to of and that is in it for not this but be are as with you they on have if would more "
+    "people should society government argument evidence because however therefore policy freedom "
+    "economy education technology privacy rights future children energy climate health research "
+    "benefit cost risk moral ethical social public private market regulation innovation history "
+    "example study data point counter claim fair balance consider agree disagree clearly obviously"
+).split()
+TOPICS = [
+    "Should AI be regulated?", "Is social media harmful to society?", "Should college be free?",
+    "Is remote work better than office work?", "Should voting be mandatory?", "Is nuclear energy the future?",
+    "Should homework be banned?", "Is space exploration worth the investment?", "Should GMOs be labeled?",
+    "Does technology make people more isolated?", "Should plastic production be reduced?",
+]
+
+
+class TextSource:
+    """Cheap realistic text: random slices of one long pre-generated word stream."""
+
+    def __init__(self, rng: random.Random, size: int = 2_000_000):
+        self.rng = rng
+        self.corpus = " ".join(rng.choice(WORDS) for _ in range(size // 6))
+
+    def text(self, mean_words: float, sigma: float = 0.6, max_chars: int = 4000) -> str:
+        # Log-normal length: most replies are short, a few are essays
+        length = min(max_chars, max(8, int(self.rng.lognormvariate(0, sigma) * mean_words * 6)))
+        start = self.rng.randrange(0, len(self.corpus) - length)
+        return self.corpus[start:start + length].strip() or "ok"
+
+
+def _next_id(db, model) -> int:
+    return (db.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _chunks(rows: Iterator[dict]) -> Iterator[List[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _copy(db, model, chunk: List[dict]):
+    columns = list(chunk[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in chunk:
+        writer.writerow(["" if row[column] is None else row[column] for column in columns])
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    cursor.copy_expert(
+        f"COPY {model.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '')", buffer
+    )
+
+
+def bulk_load(db, model, rows: Iterator[dict]) -> int:
+    """Streams rows into the table in CHUNK-sized batches and commits each batch."""
+    use_copy = db.bind.dialect.name == "postgresql"
+    count = 0
+    for chunk in _chunks(rows):
+        if use_copy:
+            _copy(db, model, chunk)
+        else:
+            db.execute(insert(model), chunk)
+        db.commit()
+        count += len(chunk)
+    if use_copy: # Explicit ids were loaded; move the sequence past them
+        table = model.__tablename__
+        db.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"))
+        db.commit()
+    return count
+
+
+def generate(db, sizes: dict, seed: int) -> dict:
+    rng = random.Random(seed)
+    source = TextSource(rng)
+    counts = {}
+    timer = time.perf_counter()
+
+    def done(name, count):
+        counts[name] = count
+        print(f"  {name:<9} {count:>11,} rows  ({time.perf_counter() - timer:.1f}s)", flush=True)
+
+    # Ids continue after existing rows; the AI user is created only in an empty database
+    first_user = _next_id(db, models.User)
+    has_ai_user = first_user == models.AI_USER_ID or db.get(models.User, models.AI_USER_ID) is not None
+    n_users = sizes["users"]
+    user_ids = range(first_user, first_user + n_users)
+
+    def users():
+        for offset, user_id in enumerate(user_ids):
+            ai = user_id == models.AI_USER_ID
+            yield {
+                "id": user_id,
+                "username": "ArguMind AI" if ai else f"user{seed}_{user_id}",
+                "email": "ai@argumind.local" if ai else f"user{seed}_{user_id}@example.com",
+                "hashed_password": "!", # Not a valid bcrypt hash: generated users cannot log in
+                "elo": 1000 if ai else max(100, int(rng.gauss(1000, 180))),
+                "mind_tokens": int(rng.expovariate(1 / 40)),
+                "created_at": EPOCH + timedelta(minutes=offset),
+            }
+    done("users", bulk_load(db, models.User, users()))
+
+    usernames = {user_id: ("ArguMind AI" if user_id == models.AI_USER_ID else f"user{seed}_{user_id}") for user_id in user_ids}
+    humans = [user_id for user_id in user_ids if user_id != models.AI_USER_ID]
+    # A few very active users, a long tail of occasional ones
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(humans))))
+
+    def active_user():
+        return rng.choices(humans, cum_weights=cum_weights)[0]
+    span_minutes = 365 * 24 * 60
+
+    first_debate = _next_id(db, models.Debate)
+    n_debates = sizes["debates"]
+    debate_meta = [] # (debate id, player1, player2, start)
+
+    def debates():
+        players = rng.choices(humans, cum_weights=cum_weights, k=n_debates)
+        for offset in range(n_debates):
+            debate_id = first_debate + offset
+            player1 = players[offset]
+            kind = rng.random()
+            if kind < 0.35 and has_ai_user: # AI debate
+                player2 = models.AI_USER_ID
+            elif kind < 0.37: # Still searching for an opponent
+                player2 = None
+            else:
+                player2 = rng.choice(humans)
+                while player2 == player1 and len(humans) > 1:
+                    player2 = rng.choice(humans)
+            start = EPOCH + timedelta(minutes=span_minutes * offset / n_debates)
+            outcome = rng.random()
+            if player2 is None or outcome < 0.1:
+                winner = None # Unfinished
+            elif outcome < 0.18:
+                winner = "Draw"
+            elif player2 == models.AI_USER_ID:
+                winner = rng.choice(("User", "AI")) # As recorded by the AI debate evaluator
+            else:
+                winner = usernames[rng.choice((player1, player2))]
+            debate_meta.append((debate_id, player1, player2, start))
+            yield {"id": debate_id, "player1_id": player1, "player2_id": player2,
+                   "topic": rng.choice(TOPICS), "winner": winner, "timestamp": start}
+    done("debates", bulk_load(db, models.Debate, debates()))
+
+    first_message = _next_id(db, models.Message)
+    n_messages = sizes["messages"]
+
+    def messages():
+        # Debates get log-normal transcript lengths around the average; turns alternate
+        # between the players. Cycles over the debates until n_messages rows exist.
+        mean_length = max(1.0, n_messages / n_debates)
+        offset = 0
+        while offset < n_messages:
+            for debate_id, player1, player2, start in debate_meta:
+                length = 1 if player2 is None else max(2, int(rng.lognormvariate(0, 0.7) * mean_length))
+                for turn in range(min(length, n_messages - offset)):
+                    sender = player1 if turn % 2 == 0 or player2 is None else player2
+                    ai = sender == models.AI_USER_ID
+                    yield {
+                        "id": first_message + offset,
+                        "debate_id": debate_id,
+                        "sender_id": sender,
+                        "sender_type": "ai" if ai else "user",
+                        "content": source.text(mean_words=35 if ai else 25),
+                        "timestamp": start + timedelta(seconds=45 * turn),
+                    }
+                    offset += 1
+                if offset >= n_messages:
+                    return
+    done("messages", bulk_load(db, models.Message, messages()))
+
+    first_forum = _next_id(db, models.Forum)
+    n_forums = sizes["forums"]
+    forum_ids = range(first_forum, first_forum + n_forums)
+    done("forums", bulk_load(db, models.Forum, (
+        {"id": forum_id, "name": f"Forum {seed}-{forum_id}", "description": source.text(mean_words=12)}
+        for forum_id in forum_ids
+    )))
+
+    first_thread = _next_id(db, models.Thread)
+    n_threads = sizes["threads"]
+    done("threads", bulk_load(db, models.Thread, (
+        {"id": first_thread + offset, "title": source.text(mean_words=6, max_chars=120),
+         "forum_id": rng.choice(forum_ids), "user_id": active_user(),
+         "created_at": EPOCH + timedelta(minutes=span_minutes * offset / n_threads)}
+        for offset in range(n_threads)
+    )))
+
+    first_post = _next_id(db, models.Post)
+    n_posts = sizes["posts"]
+    done("posts", bulk_load(db, models.Post, (
+        {"id": first_post + offset, "content": source.text(mean_words=30),
+         "thread_id": first_thread + min(int(rng.expovariate(1 / (n_threads / 5))), n_threads - 1),
+         "user_id": active_user(),
+         "created_at": EPOCH + timedelta(minutes=span_minutes * offset / n_posts)}
+        for offset in range(n_posts)
+    )))
+
+    result = gamification.backfill(db)
+    done("streaks", result["users"])
+    done("badges", result["badges_awarded"])
+    return counts
+
+
+def sizes(messages: Optional[int] = None, users: Optional[int] = None, debates: Optional[int] = None,
+          forums: Optional[int] = None, threads: Optional[int] = None, posts: Optional[int] = None,
+          scale: str = "10k") -> dict:
+    """Row counts for generate(). Unset counts follow `messages`, which defaults to the `scale` preset."""
+    messages = messages or SCALES[scale]
+    return {
+        "messages": messages,
+        "users": users or max(50, messages // 50),
+        "debates": debates or max(20, messages // 8),
+        "forums": forums or max(5, min(200, messages // 5000)),
+        "threads": threads or max(20, messages // 40),
+        "posts": posts or max(100, messages // 4),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic MindDeploy dataset")
+    parser.add_argument("--scale", choices=SCALES, default="10k", help="Message count preset; other sizes follow")
+    parser.add_argument("--seed", type=int, default=1)
+    for name in ("users", "debates", "messages", "forums", "threads", "posts"):
+        parser.add_argument(f"--{name}", type=int, help=f"Override the number of {name}")
+    parser.add_argument("--no-search-index", action="store_true", help="Skip rebuilding the search index")
+    parser.add_argument("--create-tables", action="store_true", help="create_all() first (scratch databases)")
+    args = parser.parse_args()
+
+    counts = sizes(args.messages, args.users, args.debates, args.forums, args.threads, args.posts, args.scale)
+    if args.create_tables:
+        database.Base.metadata.create_all(database.engine)
+    print(f"Generating into {database.engine.url.render_as_string(hide_password=True)} (seed {args.seed}):")
+    started = time.perf_counter()
+    with database.SessionLocal() as db:
+        generate(db, counts, args.seed)
+    if not args.no_search_index:
+        with database.engine.begin() as connection:
+            search.rebuild_index(connection)
+        print("  search index rebuilt")
+    print(f"Done in {time.perf_counter() - started:.1f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+# tools/redeem_load_test.py - Concurrent redeem load test for the mind-token ledger
+#
+# Run from backend/ against the database in DATABASE_URL:
+#     python -m tools.redeem_load_test --users 50 --balance 200 --workers 1,4,16
+#
+# For every worker count it seeds fresh users, fires more redeems than their
+# balance allows from a thread pool (through app.tokens.debit, the same path as
+# POST /tokens/redeem), then checks that:
+#   * no balance went negative
+#   * each user got exactly balance // cost successful redeems
+#   * balance + sum(ledger) equals the starting balance
+# Finally it finishes one debate between two fresh users through
+# gamification.process_events and checks that both players were credited
+# tokens.debate_credits, with matching ledger rows, exactly once even when the
+# event is processed a second time (as after a restart).
+# A redeem that hits a database error (e.g. a SQLite lock timeout) is retried a
+# few times; if any still fail the invariants cannot be checked and the run
+# counts as failed. It prints throughput per worker count and exits non-zero on
+# any violation or unretried error.
+
+import argparse
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from app import database, gamification, models, tokens
+from app.routers.token_routes import REDEEM_COST
+
+RETRIES = 5
+
+
+def seed_users(count: int, balance: int) -> list:
+    run = uuid.uuid4().hex[:8]
+    with database.SessionLocal() as db:
+        users = [
+            models.User(username=f"loadtest_{run}_{i}", email=f"loadtest_{run}_{i}@example.com",
+                        hashed_password="!", elo=1000, mind_tokens=balance)
+            for i in range(count)
+        ]
+        db.add_all(users)
+        db.commit()
+        return [user.id for user in users]
+
+
+def redeem_once(user_id: int) -> str:
+    for attempt in range(RETRIES):
+        with database.SessionLocal() as db:
+            try:
+                balance = tokens.debit(db, user_id, REDEEM_COST, reason="loadtest")
+                if balance is None:
+                    db.rollback()
+                    return "rejected"
+                db.commit()
+                return "ok"
+            except OperationalError:
+                db.rollback()
+        time.sleep(0.01 * 2 ** attempt)
+    return "error"
+
+
+def check_invariants(user_ids: list, balance: int) -> list:
+    expected_redeems = balance // REDEEM_COST
+    problems = []
+    with database.SessionLocal() as db:
+        balances = dict(db.query(models.User.id, models.User.mind_tokens).filter(models.User.id.in_(user_ids)))
+        ledger = dict(
+            db.query(models.TokenTransaction.user_id, func.sum(models.TokenTransaction.amount))
+            .filter(models.TokenTransaction.user_id.in_(user_ids))
+            .group_by(models.TokenTransaction.user_id)
+        )
+        debits = dict(
+            db.query(models.TokenTransaction.user_id, func.count(models.TokenTransaction.id))
+            .filter(models.TokenTransaction.user_id.in_(user_ids))
+            .group_by(models.TokenTransaction.user_id)
+        )
+    for user_id in user_ids:
+        if balances[user_id] < 0:
+            problems.append(f"user {user_id}: negative balance {balances[user_id]}")
+        if balances[user_id] + -ledger.get(user_id, 0) != balance:
+            problems.append(f"user {user_id}: balance {balances[user_id]} does not match ledger {ledger.get(user_id, 0)}")
+        if debits.get(user_id, 0) != expected_redeems:
+            problems.append(f"user {user_id}: {debits.get(user_id, 0)} redeems, expected {expected_redeems}")
+    return problems
+
+
+def check_debate_credits() -> list:
+    seeded = seed_users(3, 0)
+    winner_id, loser_id = user_ids = [user_id for user_id in seeded if user_id != models.AI_USER_ID][:2]
+    with database.SessionLocal() as db:
+        debate = models.Debate(player1_id=winner_id, player2_id=loser_id, topic="loadtest", winner="User")
+        db.add(debate)
+        db.commit()
+        debate_id = debate.id
+    event = gamification.DebateFinished(debate_id, (winner_id, loser_id), winner_id)
+    gamification.process_events([event])
+    gamification.process_events([event]) # A replay must not pay again
+
+    problems = []
+    with database.SessionLocal() as db:
+        balances = dict(db.query(models.User.id, models.User.mind_tokens).filter(models.User.id.in_(user_ids)))
+        ledger = sorted(db.query(models.TokenTransaction.user_id, models.TokenTransaction.amount,
+                                 models.TokenTransaction.reason).filter(models.TokenTransaction.debate_id == debate_id))
+    for user_id in user_ids:
+        expected = tokens.debate_credits(debate_id, user_id, user_id == winner_id)
+        rows = [row for row in ledger if row.user_id == user_id]
+        if sorted((amount, reason) for _, amount, reason, _ in expected) != sorted((row.amount, row.reason) for row in rows):
+            problems.append(f"user {user_id}: ledger rows {rows} for debate {debate_id}, expected {expected}")
+        if balances[user_id] != sum(amount for _, amount, _, _ in expected):
+            problems.append(f"user {user_id}: balance {balances[user_id]} after debate {debate_id}, expected {expected}")
+    cleanup(seeded)
+    return problems
+
+
+def cleanup(user_ids: list):
+    with database.SessionLocal() as db:
+        for model in (models.Streak, models.UserBadge):
+            db.query(model).filter(model.user_id.in_(user_ids)).delete(synchronize_session=False)
+        db.query(models.TokenTransaction).filter(models.TokenTransaction.user_id.in_(user_ids)).delete(synchronize_session=False)
+        db.query(models.Debate).filter(models.Debate.player1_id.in_(user_ids)).delete(synchronize_session=False)
+        db.query(models.User).filter(models.User.id.in_(user_ids)).delete(synchronize_session=False)
+        db.commit()
+
+
+def run(users: int, balance: int, extra: int, workers: int) -> tuple:
+    user_ids = seed_users(users, balance)
+    attempts = [user_id for user_id in user_ids for _ in range(balance // REDEEM_COST + extra)]
+    random.shuffle(attempts)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(redeem_once, attempts))
+    elapsed = time.perf_counter() - started
+
+    problems = check_invariants(user_ids, balance) if outcomes.count("error") == 0 else []
+    cleanup(user_ids)
+    return len(attempts) / elapsed, outcomes, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent /tokens/redeem load test")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--balance", type=int, default=200, help="starting mind_tokens per user")
+    parser.add_argument("--extra", type=int, default=5, help="redeems per user beyond what the balance covers")
+    parser.add_argument("--workers", default="1,4,16", help="comma-separated thread counts")
+    args = parser.parse_args()
+
+    failed = False
+    baseline = None
+    print(f"{'workers':>8} {'ops/s':>10} {'speedup':>8} {'ok':>7} {'rejected':>9} {'errors':>7}")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        ops, outcomes, problems = run(args.users, args.balance, args.extra, workers)
+        baseline = baseline or ops
+        print(f"{workers:>8} {ops:>10.0f} {ops / baseline:>7.2f}x {outcomes.count('ok'):>7} "
+              f"{outcomes.count('rejected'):>9} {outcomes.count('error'):>7}")
+        for problem in problems[:10]:
+            print(f"  INVARIANT VIOLATED: {problem}")
+        if outcomes.count("error"):
+            print(f"  {outcomes.count('error')} redeems failed after {RETRIES} attempts; invariants not checked.")
+        failed = failed or bool(problems) or bool(outcomes.count("error"))
+
+    problems = check_debate_credits()
+    for problem in problems:
+        print(f"  DEBATE CREDIT MISSING: {problem}")
+    print(f"Finished-debate credits: {'FAILED' if problems else 'ok'}")
+    failed = failed or bool(problems)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# tools/route_bench.py - In-process micro-benchmarks for the hot HTTP routes
+#
+# Run from backend/:
+#     python -m tools.route_bench --save bench/baseline.json      # record a baseline
+#     python -m tools.route_bench --compare bench/baseline.json   # exit 1 on regressions
+#     python -m tools.route_bench --cold --routes dashboard       # caches cleared before every request
+#
+# Seeds a scratch SQLite database with tools.generate_data (fixed seed, so
+# runs are comparable) and drives each route through the FastAPI app with
+# TestClient as the most active seeded user. Per route it reports:
+#   ops/s      requests completed per second over the timed run
+#   p50, p99   per-request latency
+#   alloc      peak memory allocated while serving one request (tracemalloc,
+#              measured in a separate pass so tracing does not skew timings)
+#   retained   memory still held after the request returned
+# Compare mode flags a route when p50 or alloc grows, or ops/s drops, by more
+# than --threshold. p99 deltas are printed but not flagged (too noisy for a gate).
+# Baselines are only comparable on the same machine and Python version.
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="In-process micro-benchmarks for the hot HTTP routes")
+    parser.add_argument("--messages", type=int, default=100000, help="Dataset size (see tools.generate_data)")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Timed run per route")
+    parser.add_argument("--min-iterations", type=int, default=20)
+    parser.add_argument("--alloc-samples", type=int, default=20, help="Requests traced for allocations per route")
+    parser.add_argument("--routes", help="Only routes whose name contains one of these comma-separated strings")
+    parser.add_argument("--cold", action="store_true", help="Clear the in-process caches before every request")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative change counted as a regression")
+    return parser.parse_args()
+
+
+args = _parse_args()
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("GROQ_API_KEY", "unused") # app.ai requires it at import; no route here calls the LLM
+os.environ.setdefault("LOG_LEVEL", "WARNING") # Per-request access logs would be timed too
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, or_, text
+
+from app import auth, database, models, search
+from app.main import fastapi_app
+from app.routers import forum_routes
+from tools import generate_data
+
+PASSWORD = "bench-password"
+SEED = 42
+
+# (name, method, path template, form data); ids are filled from the seeded dataset
+ROUTES = [
+    ("token", "POST", "/token", {"username": "{username}", "password": PASSWORD}),
+    ("users/me", "GET", "/users/me", None),
+    ("dashboard/stats", "GET", "/dashboard/stats", None),
+    ("dashboard/history", "GET", "/dashboard/history", None),
+    ("leaderboard", "GET", "/leaderboard/", None),
+    ("forums", "GET", "/forums/", None),
+    ("forum threads", "GET", "/forums/{forum_id}/threads", None),
+    ("thread posts", "GET", "/forums/threads/{thread_id}/posts", None),
+    ("debate messages", "GET", "/debate/{debate_id}/messages", None),
+]
+
+CACHES = [forum_routes.listing_cache, auth._user_cache, auth._email_to_id]
+
+
+def seed(db) -> dict:
+    """Generates the dataset and picks the busiest user, debate, forum and thread."""
+    generate_data.generate(db, generate_data.sizes(messages=args.messages), seed=SEED)
+    user_id, _ = (
+        db.query(models.Debate.player1_id, func.count()).group_by(models.Debate.player1_id)
+        .order_by(func.count().desc(), models.Debate.player1_id).first()
+    )
+    user = db.get(models.User, user_id)
+    user.hashed_password = auth.get_password_hash(PASSWORD) # Generated users cannot log in otherwise
+    db.commit()
+    debate_id, _ = (
+        db.query(models.Message.debate_id, func.count()).join(models.Debate, models.Debate.id == models.Message.debate_id)
+        .filter(or_(models.Debate.player1_id == user_id, models.Debate.player2_id == user_id))
+        .group_by(models.Message.debate_id).order_by(func.count().desc(), models.Message.debate_id).first()
+    )
+    thread_id, forum_id = (
+        db.query(models.Post.thread_id, models.Thread.forum_id).join(models.Thread, models.Thread.id == models.Post.thread_id)
+        .group_by(models.Post.thread_id, models.Thread.forum_id).order_by(func.count().desc(), models.Post.thread_id).first()
+    )
+    return {"user_id": user.id, "username": user.username, "email": user.email,
+            "debate_id": debate_id, "forum_id": forum_id, "thread_id": thread_id}
+
+
+def _request_for(route, ids):
+    _, method, template, form = route
+    path = template.format(**ids)
+    data = {key: value.format(**ids) for key, value in form.items()} if form else None
+    return method, path, data
+
+
+def _call(client, headers, method, path, data):
+    if args.cold:
+        for cache in CACHES:
+            cache.clear()
+    response = client.request(method, path, headers=headers, data=data)
+    if response.status_code >= 400:
+        raise SystemExit(f"{method} {path} returned {response.status_code}: {response.text[:200]}")
+
+
+def bench_route(client, headers, route, ids) -> dict:
+    method, path, data = _request_for(route, ids)
+    for _ in range(3): # Warm up caches, prepared statements and lazy imports
+        _call(client, headers, method, path, data)
+
+    latencies = []
+    started = time.perf_counter()
+    deadline = started + args.seconds
+    while len(latencies) < args.min_iterations or time.perf_counter() < deadline:
+        tick = time.perf_counter()
+        _call(client, headers, method, path, data)
+        latencies.append(time.perf_counter() - tick)
+    elapsed = time.perf_counter() - started
+
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(args.alloc_samples):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            _call(client, headers, method, path, data)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "n": len(latencies),
+        "ops_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3),
+        "alloc_kib": round(statistics.median(peaks) / 1024, 1),
+        "retained_kib": round(statistics.median(retained) / 1024, 1),
+    }
+
+
+def compare(results: dict, baseline: dict) -> int:
+    """Prints the change per route against `baseline`; returns the number of regressions."""
+    threshold = args.threshold
+    regressions = 0
+    print(f"\nAgainst {args.compare} (threshold {threshold:.0%}):")
+    for name, current in results["routes"].items():
+        base = baseline["routes"].get(name)
+        if base is None:
+            print(f"  {name:<18} (not in baseline)")
+            continue
+        changes = {
+            "p50": current["p50_ms"] / base["p50_ms"] - 1,
+            "p99": current["p99_ms"] / base["p99_ms"] - 1,
+            "ops/s": current["ops_per_sec"] / base["ops_per_sec"] - 1,
+            "alloc": current["alloc_kib"] / base["alloc_kib"] - 1 if base["alloc_kib"] else 0.0,
+        }
+        flagged = [key for key in ("p50", "alloc") if changes[key] > threshold]
+        if changes["ops/s"] < -threshold:
+            flagged.append("ops/s")
+        regressions += bool(flagged)
+        summary = "  ".join(f"{key} {change:+.1%}" for key, change in changes.items())
+        print(f"  {name:<18} {summary}{'   REGRESSION: ' + ', '.join(flagged) if flagged else ''}")
+    return regressions
+
+
+def main() -> int:
+    routes = ROUTES
+    if args.routes:
+        wanted = [item.strip() for item in args.routes.split(",") if item.strip()]
+        routes = [route for route in ROUTES if any(item in route[0] for item in wanted)]
+
+    database.Base.metadata.create_all(database.engine)
+    print(f"Seeding {args.messages:,} messages (seed {SEED})...")
+    with database.SessionLocal() as db:
+        ids = seed(db)
+    with database.engine.begin() as connection:
+        search.rebuild_index(connection)
+        connection.execute(text("ANALYZE"))
+    headers = {"Authorization": "Bearer " + auth.create_access_token({"sub": ids["email"], "uid": ids["user_id"]})}
+
+    results = {
+        "meta": {
+            "python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "machine": platform.machine(),
+            "messages": args.messages, "seed": SEED, "cold": args.cold,
+        },
+        "routes": {},
+    }
+    print(f"\n  {'route':<18} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'alloc KiB':>10} {'retained':>9} {'n':>7}")
+    with TestClient(fastapi_app) as client:
+        for route in routes:
+            result = bench_route(client, headers, route, ids)
+            results["routes"][route[0]] = result
+            print(f"  {route[0]:<18} {result['ops_per_sec']:>9} {result['p50_ms']:>9} {result['p99_ms']:>9} "
+                  f"{result['alloc_kib']:>10} {result['retained_kib']:>9} {result['n']:>7}", flush=True)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if {key: baseline["meta"].get(key) for key in ("messages", "cold")} != {key: results["meta"][key] for key in ("messages", "cold")}:
+            print("warning: baseline was recorded with different --messages/--cold; deltas are not meaningful", file=sys.stderr)
+        regressions = compare(results, baseline)
+        print(f"{regressions} route(s) regressed.")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
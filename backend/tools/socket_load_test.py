@@ -0,0 +1,240 @@
+# tools/socket_load_test.py - End-to-end Socket.IO load test with simulated debaters
+#
+# Start the server with the LLM stubbed so AI debates cost no API calls:
+#     AI_STUB=1 AI_STUB_LATENCY_MS=800 gunicorn app.main:app -w 1 -k uvicorn.workers.UvicornWorker
+# then, from backend/ (needs aiohttp for socketio.AsyncClient: pip install aiohttp):
+#     python -m tools.socket_load_test --url http://127.0.0.1:8000 --clients 2000 --ramp 100 --duration 60
+#
+# Each simulated client logs in via /token (registering loadtest users on first
+# use), connects with its token and calls user_online. Human clients then
+# create a debate via POST /debate/start-human, join the matchmaking queue and,
+# once matched, send messages at --message-rate. AI clients (--ai-fraction)
+# start an AI debate and take turns through the HTTP route.
+# Message content carries the send time, so every new_message a client
+# receives gives one fan-out latency sample (sender and receivers share a clock).
+# Reports connect rate, time-to-match, fan-out and AI-turn latency percentiles
+# and errors; --json writes the same numbers to a file for release tracking.
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+import httpx
+import socketio
+
+MARKER = "lt|" # Content prefix: lt|<client>|<seq>|<sent at>
+
+
+class Stats:
+    def __init__(self):
+        self.samples = defaultdict(list) # {name: [seconds]}
+        self.errors = Counter()
+        self.counts = Counter()
+        self.first_connect = None
+        self.last_connect = None
+
+    def error(self, kind: str):
+        self.errors[kind] += 1
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def login(http: httpx.AsyncClient, username: str, password: str) -> str:
+    response = await http.post("/token", data={"username": username, "password": password})
+    if response.status_code == 401 or response.status_code == 400:
+        await http.post("/register", json={"username": username, "email": f"{username}@loadtest.example.com", "password": password})
+        response = await http.post("/token", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_client(index: int, args, http: httpx.AsyncClient, stats: Stats, login_slots: asyncio.Semaphore, deadline: float):
+    username = f"{args.prefix}{index}"
+    try:
+        async with login_slots:
+            started = time.monotonic()
+            token = await login(http, username, args.password)
+            stats.samples["login"].append(time.monotonic() - started)
+    except Exception:
+        stats.error("login")
+        return
+
+    headers = {"Authorization": f"Bearer {token}"}
+    sio = socketio.AsyncClient(reconnection=False)
+    matched = asyncio.get_running_loop().create_future()
+
+    @sio.on("new_message")
+    async def on_new_message(data):
+        content = data.get("content") or ""
+        if content.startswith(MARKER):
+            stats.samples["fanout"].append(time.time() - float(content.rsplit("|", 1)[1]))
+            stats.counts["messages_received"] += 1
+
+    @sio.on("match_found")
+    async def on_match_found(data):
+        if not matched.done():
+            matched.set_result(data)
+
+    @sio.on("error")
+    async def on_error(data):
+        stats.error(f"server: {data.get('detail') if isinstance(data, dict) else data}")
+
+    try:
+        started = time.monotonic()
+        await sio.connect(args.url, auth={"token": token}, transports=["websocket"], wait_timeout=30)
+        stats.samples["connect"].append(time.monotonic() - started)
+        now = time.monotonic()
+        stats.first_connect = stats.first_connect or started
+        stats.last_connect = now
+        stats.counts["connected"] += 1
+    except Exception:
+        stats.error("connect")
+        return
+
+    try:
+        await sio.emit("user_online", {})
+        if random.random() < args.ai_fraction:
+            await run_ai_debate(index, args, http, headers, sio, stats, deadline)
+        else:
+            await run_human_debate(index, args, http, headers, sio, stats, matched, deadline)
+    except Exception as e:
+        stats.error(f"client: {type(e).__name__}")
+    finally:
+        await sio.disconnect()
+
+
+async def _pace(args, deadline):
+    """Sleeps until the next message is due; False once the run is over."""
+    await asyncio.sleep(random.expovariate(args.message_rate))
+    return time.monotonic() < deadline
+
+
+async def run_human_debate(index, args, http, headers, sio, stats, matched, deadline):
+    response = await http.post("/debate/start-human", headers=headers)
+    if response.status_code != 200:
+        stats.error(f"start-human {response.status_code}")
+        return
+    started = time.monotonic()
+    await sio.emit("join_matchmaking_queue", {"debateId": response.json()["id"]})
+    try:
+        match = await asyncio.wait_for(matched, timeout=max(1.0, min(args.match_timeout, deadline - started)))
+    except asyncio.TimeoutError:
+        stats.error("match timeout")
+        return
+    stats.samples["time_to_match"].append(time.monotonic() - started)
+    stats.counts["matched"] += 1
+
+    seq = 0
+    while await _pace(args, deadline):
+        seq += 1
+        await sio.emit("send_message_to_human", {
+            "debateId": match["debate_id"], "content": f"{MARKER}{index}|{seq}|{time.time()}",
+        })
+        stats.counts["messages_sent"] += 1
+
+
+async def run_ai_debate(index, args, http, headers, sio, stats, deadline):
+    response = await http.post("/ai-debate/start", headers=headers)
+    if response.status_code != 200:
+        stats.error(f"ai start {response.status_code}")
+        return
+    debate = response.json()
+    await sio.emit("join_debate_room", {"debateId": debate["id"]})
+    stats.counts["ai_debates"] += 1
+
+    seq = 0
+    while await _pace(args, deadline):
+        seq += 1
+        started = time.monotonic()
+        response = await http.post(
+            f"/ai-debate/{debate['id']}/topic", headers=headers,
+            json={"content": f"{MARKER}{index}|{seq}|{time.time()}"}, timeout=120,
+        )
+        if response.status_code != 200:
+            stats.error(f"ai turn {response.status_code}")
+            continue
+        stats.samples["ai_turn"].append(time.monotonic() - started)
+        stats.counts["messages_sent"] += 1
+
+
+def report(args, stats: Stats, elapsed: float) -> dict:
+    connect_window = (stats.last_connect - stats.first_connect) if stats.first_connect else 0
+    result = {
+        "clients": args.clients,
+        "elapsed_seconds": round(elapsed, 1),
+        "connect_rate_per_second": round(stats.counts["connected"] / connect_window, 1) if connect_window else None,
+        "counts": dict(stats.counts),
+        "errors": dict(stats.errors),
+        "latency_ms": {
+            name: {"p50": round(percentile(values, 0.5) * 1000, 1), "p99": round(percentile(values, 0.99) * 1000, 1),
+                   "max": round(max(values) * 1000, 1), "n": len(values)}
+            for name, values in stats.samples.items() if values
+        },
+    }
+    print(f"\n{args.clients} clients, {result['elapsed_seconds']}s; connect rate {result['connect_rate_per_second']}/s")
+    for name, count in sorted(stats.counts.items()):
+        print(f"  {name:<20} {count}")
+    print(f"  {'latency (ms)':<20} {'p50':>9} {'p99':>9} {'max':>9} {'n':>8}")
+    for name, values in result["latency_ms"].items():
+        print(f"  {name:<20} {values['p50']:>9} {values['p99']:>9} {values['max']:>9} {values['n']:>8}")
+    if stats.errors:
+        print("  errors:")
+        for kind, count in stats.errors.most_common():
+            print(f"    {count:>6}  {kind}")
+    return result
+
+
+async def main_async(args) -> int:
+    stats = Stats()
+    login_slots = asyncio.Semaphore(args.login_concurrency)
+    limits = httpx.Limits(max_connections=args.http_connections)
+    started = time.monotonic()
+    ramp_seconds = args.clients / args.ramp
+    deadline = started + ramp_seconds + args.duration
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as http:
+        tasks = []
+        for index in range(args.clients):
+            tasks.append(asyncio.create_task(run_client(index, args, http, stats, login_slots, deadline)))
+            await asyncio.sleep(1 / args.ramp)
+        await asyncio.gather(*tasks)
+
+    result = report(args, stats, time.monotonic() - started)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    return 1 if sum(stats.errors.values()) > args.max_errors else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Socket.IO load test with simulated debaters")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--ramp", type=float, default=50, help="New clients per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to keep debating after the ramp")
+    parser.add_argument("--message-rate", type=float, default=0.2, help="Messages per second per client")
+    parser.add_argument("--ai-fraction", type=float, default=0.2, help="Share of clients debating the (stubbed) AI")
+    parser.add_argument("--match-timeout", type=float, default=30)
+    parser.add_argument("--prefix", default="loadtest")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--login-concurrency", type=int, default=20, help="Parallel /token calls (bcrypt is CPU-bound)")
+    parser.add_argument("--http-connections", type=int, default=200)
+    parser.add_argument("--max-errors", type=int, default=0, help="Exit non-zero above this many errors")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+    random.seed(args.seed)
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+# tools/ws_broadcast_bench.py - Broadcast latency of the /ws/{group_name} hub
+#
+# Start the server (one worker, as in production), then from backend/:
+#     python -m tools.ws_broadcast_bench --url ws://127.0.0.1:8000 --sockets 5000 --rounds 20
+#
+# Opens --sockets receivers in one group, then a sender posts --rounds
+# messages, each stamped with its send time. For every round it records how
+# long each receiver took to get the message; the report gives p50/p99/max
+# per delivery and the time until the last receiver had it (full fan-out).
+# Receivers that were closed by the server (slow-consumer drop, code 1013)
+# are counted. Receivers run in --processes client processes; on a small
+# machine they share the CPU with the server, so their own read loops are
+# part of the measured latency.
+# Needs an open-file limit above --sockets on both sides (ulimit -n).
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+import time
+
+import websockets
+
+MARKER = "bench|"
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def _receiver(url, received: dict, closed: list, ready: asyncio.Event, opened: list, target: int):
+    try:
+        async with websockets.connect(url, max_queue=None, open_timeout=60, ping_interval=None) as ws:
+            opened.append(1)
+            if len(opened) == target:
+                ready.set()
+            async for text in ws:
+                payload = text.split(": ", 1)[-1]
+                if payload.startswith(MARKER):
+                    _, round_no, sent = payload.split("|")
+                    received.setdefault(int(round_no), []).append(time.time() - float(sent))
+    except websockets.ConnectionClosed as e:
+        closed.append(e.rcvd.code if e.rcvd else None)
+    except Exception as e:
+        closed.append(type(e).__name__)
+
+
+async def _receivers(args, count: int, conn):
+    """Client process: opens `count` receivers, reports when connected, then streams latencies back."""
+    received, closed, opened = {}, [], []
+    ready = asyncio.Event()
+    url = f"{args.url}/ws/{args.group}?username=bench"
+    tasks = []
+    for index in range(count):
+        tasks.append(asyncio.create_task(_receiver(url, received, closed, ready, opened, count)))
+        if index % args.connect_batch == args.connect_batch - 1:
+            await asyncio.sleep(0.05)
+    await asyncio.wait_for(ready.wait(), timeout=300)
+    conn.send(("ready", len(opened)))
+    await asyncio.to_thread(conn.recv) # Sender finished; must not block the loop reading the sockets
+    await asyncio.sleep(args.settle)
+    conn.send(("done", received, closed))
+    for task in tasks:
+        task.cancel()
+
+
+def _receiver_process(args, count: int, conn):
+    asyncio.run(_receivers(args, count, conn))
+
+
+async def _send_rounds(args):
+    url = f"{args.url}/ws/{args.group}?username=sender"
+    async with websockets.connect(url, max_queue=None, ping_interval=None) as ws:
+        for round_no in range(args.rounds):
+            await ws.send(f"{MARKER}{round_no}|{time.time()}")
+            await asyncio.sleep(args.interval)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Broadcast latency of the /ws/{group_name} hub")
+    parser.add_argument("--url", default="ws://127.0.0.1:8000")
+    parser.add_argument("--group", default="bench")
+    parser.add_argument("--sockets", type=int, default=5000)
+    parser.add_argument("--processes", type=int, default=1, help="Client processes to spread receivers over")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.5, help="Seconds between rounds")
+    parser.add_argument("--connect-batch", type=int, default=200, help="Connections opened per 50ms")
+    parser.add_argument("--settle", type=float, default=3.0, help="Seconds to wait for stragglers after the last round")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    pipes, processes = [], []
+    per_process = [args.sockets // args.processes + (i < args.sockets % args.processes) for i in range(args.processes)]
+    for count in per_process:
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_receiver_process, args=(args, count, child), daemon=True)
+        process.start()
+        pipes.append(parent)
+        processes.append(process)
+    connected = sum(pipe.recv()[1] for pipe in pipes)
+    connect_seconds = time.monotonic() - started
+    print(f"{connected} receivers connected in {connect_seconds:.1f}s; sending {args.rounds} rounds...", flush=True)
+
+    asyncio.run(_send_rounds(args))
+    for pipe in pipes:
+        pipe.send("finished")
+    received, closed = {}, []
+    for pipe in pipes:
+        _, part, part_closed = pipe.recv()
+        for round_no, latencies in part.items():
+            received.setdefault(round_no, []).extend(latencies)
+        closed.extend(part_closed)
+    for process in processes:
+        process.join(timeout=5)
+
+    deliveries = [latency for latencies in received.values() for latency in latencies]
+    fan_out = [max(latencies) for latencies in received.values()]
+    complete_rounds = sum(len(latencies) >= connected for latencies in received.values())
+    result = {
+        "sockets": connected,
+        "connect_seconds": round(connect_seconds, 1),
+        "rounds": args.rounds,
+        "complete_rounds": complete_rounds,
+        "deliveries": len(deliveries),
+        "expected_deliveries": connected * args.rounds,
+        "closed_by_server": len(closed),
+        "delivery_ms": {"p50": round(percentile(deliveries, 0.5) * 1000, 1), "p99": round(percentile(deliveries, 0.99) * 1000, 1),
+                        "max": round(max(deliveries) * 1000, 1)} if deliveries else None,
+        "full_fan_out_ms": {"p50": round(percentile(fan_out, 0.5) * 1000, 1), "max": round(max(fan_out) * 1000, 1)} if fan_out else None,
+    }
+    print(f"  deliveries          {result['deliveries']} / {result['expected_deliveries']} "
+          f"({complete_rounds}/{args.rounds} rounds reached every receiver)")
+    if deliveries:
+        print(f"  per delivery (ms)   p50 {result['delivery_ms']['p50']}  p99 {result['delivery_ms']['p99']}  max {result['delivery_ms']['max']}")
+        print(f"  full fan-out (ms)   p50 {result['full_fan_out_ms']['p50']}  max {result['full_fan_out_ms']['max']}")
+    if closed:
+        print(f"  closed by server    {len(closed)} (codes: {sorted(set(map(str, closed)))})")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    return 0 if complete_rounds == args.rounds and not closed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -49,7 +49,7 @@ interface DebateDetails {
 const ChatRoom = () => {
     const location = useLocation();
     const navigate = useNavigate();
-    const { user } = useAuth();
+    const { user, token } = useAuth();
 
     const [messages, setMessages] = useState<Message[]>([]);
     const [messageInput, setMessageInput] = useState("");
@@ -84,7 +84,7 @@ const ChatRoom = () => {
 
     const connectAndFetchData = async () => {
         // Ensure user and opponent data is available before proceeding
-        if (!user || !opponent || !debateId) return;
+        if (!user || !token || !opponent || !debateId) return;
 
         const userId = parseInt(user.id, 10);
         // const opponentUserId = parseInt(opponent.id, 10); // Not directly used in fetches
@@ -136,7 +136,8 @@ const ChatRoom = () => {
             if (!socketRef.current) {
                 console.log("Initializing new socket instance for ChatRoom.");
                 socketRef.current = io(API_BASE, { // <-- CRITICAL FIX: Changed from "http://127.0.0.1:8000" to API_BASE
-                    query: { debateId: debateId, userId: userId },
+                    auth: { token: token }, // The server takes the sender's identity from this token
+                    query: { debateId: debateId },
                     // Added transport fix as well
                     transports: ['websocket', 'polling']
                 });
@@ -149,7 +150,6 @@ const ChatRoom = () => {
                     );
                     socketRef.current?.emit("join_debate_room", {
                         debateId: debateId,
-                        userId: userId,
                     });
                 });
 
@@ -317,7 +317,6 @@ const ChatRoom = () => {
         console.log("Sending message to human opponent via socket...");
         socketRef.current?.emit("send_message_to_human", {
             debateId: debateId,
-            senderId: senderId,
             content: newMessage.content,
             senderType: "user",
         });